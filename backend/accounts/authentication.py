@@ -0,0 +1,195 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone as dt_timezone
+from django.utils import timezone
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from .models import RevokedToken, User
+
+# Verified tokens kept per process, and how long a verification is trusted
+AUTH_CACHE_SIZE = int(os.environ.get('AUTH_CACHE_SIZE', 10000))
+AUTH_CACHE_TTL = float(os.environ.get('AUTH_CACHE_TTL', 300))
+# How stale the deny list (revoked tokens, deactivated or changed users) may get, in seconds
+AUTH_DENYLIST_TTL = float(os.environ.get('AUTH_DENYLIST_TTL', 30))
+
+
+class ClaimsUser:
+    """Request user built from the token claims alone; no database row is loaded."""
+    is_authenticated = True
+    is_anonymous = False
+    is_active = True
+    is_staff = False
+    is_superuser = False
+
+    def __init__(self, token):
+        # simplejwt issues the user id claim as a string
+        self.id = self.pk = int(token[api_settings.USER_ID_CLAIM])
+        self.branch_id = token.get('branch_id')
+        self.role = token.get('role')
+        self.jti = token.get(api_settings.JTI_CLAIM)
+        self.issued_at = token.get('iat')
+
+    def __str__(self):
+        return f"user {self.id} ({self.role}, branch {self.branch_id})"
+
+
+# The longest any token lives, so older tokens_valid_after values need no checking
+TOKEN_LIFETIME = max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME)
+
+
+def issued_too_early(issued_at, valid_after):
+    """Whether a token's iat predates its user's tokens_valid_after (epoch seconds)."""
+    return valid_after is not None and (issued_at or 0) < valid_after
+
+
+class DenyList:
+    """
+    Revoked token ids, deactivated user ids and each changed user's tokens_valid_after,
+    reloaded from the database at most once every `ttl` seconds per process, so
+    revocation costs no query per request.
+    """
+
+    def __init__(self, ttl=AUTH_DENYLIST_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self._jtis = frozenset()
+        self._user_ids = frozenset()
+        self._valid_after = {}
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._loaded_at is not None and now - self._loaded_at < self.ttl:
+            return
+        with self._lock:
+            if self._loaded_at is not None and now - self._loaded_at < self.ttl:
+                return
+            self._jtis = frozenset(
+                RevokedToken.objects.filter(expires_at__gt=timezone.now()).values_list('jti', flat=True)
+            )
+            self._user_ids = frozenset(User.objects.filter(is_active=False).values_list('id', flat=True))
+            # Older changes outlive every token issued before them
+            self._valid_after = {
+                user_id: valid_after.timestamp()
+                for user_id, valid_after in User.objects.filter(
+                    tokens_valid_after__gt=timezone.now() - TOKEN_LIFETIME
+                ).values_list('id', 'tokens_valid_after')
+            }
+            self._loaded_at = now
+
+    def denies(self, user):
+        self._refresh()
+        return (
+            user.id in self._user_ids
+            or (user.jti is not None and user.jti in self._jtis)
+            or issued_too_early(user.issued_at, self._valid_after.get(user.id))
+        )
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+
+class TokenCache:
+    """Bounded LRU of token hash -> (ClaimsUser, validated token, trusted until)."""
+
+    def __init__(self, maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, user, token):
+        # Never trust a verification past the token's own expiry
+        until = min(time.time() + self.ttl, token.get('exp', 0))
+        with self._lock:
+            self._entries[key] = (user, token, until)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+                'entries': len(self._entries),
+                'maxsize': self.maxsize,
+            }
+
+
+token_cache = TokenCache()
+deny_list = DenyList()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    Stateless JWT authentication: the signature is verified once per token and the
+    request user is built from its user_id/branch_id/role claims. Verified tokens are
+    cached by hash until min(AUTH_CACHE_TTL, expiry); revocation is checked against
+    the in-memory deny list on every request.
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        key = hashlib.sha256(raw_token).hexdigest()
+        entry = token_cache.get(key)
+        if entry is not None:
+            user, validated_token, _ = entry
+        else:
+            validated_token = self.get_validated_token(raw_token)
+            user = self.get_user(validated_token)
+            token_cache.put(key, user, validated_token)
+
+        if deny_list.denies(user):
+            raise AuthenticationFailed("Token has been revoked", code="token_revoked")
+        return user, validated_token
+
+    def get_user(self, validated_token):
+        try:
+            return ClaimsUser(validated_token)
+        except (KeyError, TypeError, ValueError):
+            raise InvalidToken("Token contained no recognizable user identification")
+
+
+def revoke_token(validated_token):
+    """Deny a token until it expires; takes effect in every worker within AUTH_DENYLIST_TTL."""
+    RevokedToken.objects.get_or_create(
+        jti=validated_token[api_settings.JTI_CLAIM],
+        defaults={
+            'user_id': validated_token.get(api_settings.USER_ID_CLAIM),
+            'expires_at': datetime.fromtimestamp(validated_token['exp'], tz=dt_timezone.utc),
+        },
+    )
+    RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+    deny_list.invalidate()
@@ -16,10 +16,19 @@ class User(AbstractUser):
     role = models.CharField(max_length=10, choices=ROLE_CHOICES)
     branch = models.ForeignKey(Branch, on_delete=models.CASCADE, null=True, blank=True)
     is_active = models.BooleanField(default=True)
+    # Tokens issued before this lost their claims' authority (role, branch or is_active changed)
+    tokens_valid_after = models.DateTimeField(null=True, blank=True)
     class Meta:
         unique_together = ('branch', 'role')  # Only one admin and one superadmin per branch
 class Classroom(models.Model):
     name = models.CharField(max_length=100)
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+class RevokedToken(models.Model):
+    """Access and refresh tokens revoked before expiry (logout); read in bulk by the JWT deny list."""
+    jti = models.CharField(max_length=255, unique=True)
+    user_id = models.IntegerField(null=True, blank=True)
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
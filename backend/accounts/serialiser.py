@@ -18,3 +18,29 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
             'email': self.user.email
         })
         return data
+
+
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from .authentication import issued_too_early
+from .models import RevokedToken, User
+
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refuse revoked or outdated refresh tokens; claims come from the user as it is now."""
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.filter(pk=refresh.payload.get(api_settings.USER_ID_CLAIM)).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+
+        valid_after = user.tokens_valid_after.timestamp() if user.tokens_valid_after else None
+        if (RevokedToken.objects.filter(jti=refresh.payload.get(api_settings.JTI_CLAIM)).exists()
+                or issued_too_early(refresh.payload.get('iat'), valid_after)):
+            raise InvalidToken("Token has been revoked")
+
+        access = refresh.access_token
+        access['branch_id'] = user.branch_id
+        access['role'] = user.role
+        return {'access': str(access)}
@@ -0,0 +1,27 @@
+from django.db.models.signals import post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from .authentication import deny_list
+from .models import User
+
+
+def _claims(values):
+    # What the token claims and the deny list rely on
+    return values.get('role'), values.get('branch_id'), values.get('is_active')
+
+
+@receiver(post_init, sender=User)
+def remember_claims(sender, instance, **kwargs):
+    # Read __dict__ directly so deferred fields are not fetched here
+    instance._loaded_claims = _claims(instance.__dict__)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    current = _claims(instance.__dict__)
+    if not created and current != getattr(instance, '_loaded_claims', current):
+        # Whole seconds, like the tokens' iat claim, so a token issued right after still passes
+        instance.tokens_valid_after = timezone.now().replace(microsecond=0)
+        User.objects.filter(pk=instance.pk).update(tokens_valid_after=instance.tokens_valid_after)
+        deny_list.invalidate()
+    instance._loaded_claims = current
@@ -1,3 +1,91 @@
-from django.test import TestCase
+from datetime import timedelta
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from accounts.models import Branch, RevokedToken
+from accounts.serialiser import CustomTokenObtainPairSerializer
+from core.testing import QueryBudgetTestCase, make_school
 
-# Create your tests here.
+
+def issue_tokens(user, age=timedelta(seconds=10)):
+    """An (access, refresh) pair for `user` as if issued `age` ago."""
+    issued = timezone.now() - age
+    refresh = CustomTokenObtainPairSerializer.get_token(user)
+    refresh.set_iat(at_time=issued)
+    access = refresh.access_token
+    access.set_iat(at_time=issued)
+    return str(access), str(refresh)
+
+
+class TokenInvalidationTests(QueryBudgetTestCase):
+    def client_for(self, access):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        return client
+
+    def dashboard(self, client):
+        return client.get(reverse('attendance-dashboard'), {'date': '2025-09-10'})
+
+    def test_role_change_rejects_older_tokens(self):
+        school = make_school(self.small)
+        access, refresh = issue_tokens(school.user)
+        client = self.client_for(access)
+        self.assertEqual(self.dashboard(client).status_code, 200)
+
+        school.user.role = 'teacher'
+        school.user.save()
+        self.assertEqual(self.dashboard(client).status_code, 401)
+        response = APIClient().post(reverse('token_refresh'), {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+        # A token issued after the change carries the new role
+        fresh, _ = issue_tokens(school.user, age=timedelta(0))
+        self.assertEqual(self.dashboard(self.client_for(fresh)).status_code, 403)
+
+    def test_branch_move_and_deactivation_reject_older_tokens(self):
+        for change in ('branch', 'is_active'):
+            school = make_school(self.small)
+            access, _ = issue_tokens(school.user)
+            if change == 'branch':
+                school.user.branch = Branch.objects.create(name=f'Moved {school.branch.pk}', location='x')
+            else:
+                school.user.is_active = False
+            school.user.save()
+            self.assertEqual(self.dashboard(self.client_for(access)).status_code, 401, change)
+
+    def test_unrelated_save_keeps_tokens(self):
+        school = make_school(self.small)
+        access, _ = issue_tokens(school.user)
+        school.user.email = 'admin@example.com'
+        school.user.save()
+        school.user.refresh_from_db()
+        self.assertIsNone(school.user.tokens_valid_after)
+        self.assertEqual(self.dashboard(self.client_for(access)).status_code, 200)
+
+    def test_refresh_uses_current_claims(self):
+        school = make_school(self.small)
+        _, refresh = issue_tokens(school.user)
+        response = APIClient().post(reverse('token_refresh'), {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.dashboard(self.client_for(response.data['access'])).status_code, 200)
+
+    def test_logout_revokes_refresh_token(self):
+        school = make_school(self.small)
+        access, refresh = issue_tokens(school.user)
+        client = self.client_for(access)
+        response = client.post(reverse('logout'), {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(RevokedToken.objects.count(), 2)
+
+        self.assertEqual(self.dashboard(client).status_code, 401)
+        response = APIClient().post(reverse('token_refresh'), {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_logout_rejects_foreign_refresh_token(self):
+        school = make_school(self.small)
+        other = make_school(self.small)
+        access, _ = issue_tokens(school.user)
+        _, refresh = issue_tokens(other.user)
+        response = self.client_for(access).post(reverse('logout'), {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(RevokedToken.objects.exists())
@@ -10,8 +10,41 @@ class ClassroomViewSet(viewsets.ModelViewSet):
     serializer_class = ClassroomSerializer
 
 # views.py
-from rest_framework_simplejwt.views import TokenObtainPairView
-from .serialiser import CustomTokenObtainPairSerializer
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from .serialiser import CustomTokenObtainPairSerializer, CustomTokenRefreshSerializer
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
+
+
+class CustomTokenRefreshView(TokenRefreshView):
+    serializer_class = CustomTokenRefreshSerializer
+
+
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from .authentication import revoke_token
+
+class LogoutAPIView(APIView):
+    """Revoke the access token used for this request, and the session's refresh token if sent."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        refresh = None
+        if request.data.get('refresh'):
+            try:
+                refresh = RefreshToken(request.data['refresh'])
+            except TokenError:
+                return Response({"detail": "Invalid refresh token"}, status=status.HTTP_400_BAD_REQUEST)
+            if str(refresh.payload.get(api_settings.USER_ID_CLAIM)) != str(request.user.id):
+                return Response({"detail": "Refresh token belongs to another user"}, status=status.HTTP_400_BAD_REQUEST)
+
+        revoke_token(request.auth)
+        if refresh is not None:
+            revoke_token(refresh)
+        return Response({"detail": "Logged out"})
@@ -0,0 +1,92 @@
+"""
+Conditional GET (ETag / Last-Modified) for reference lists and rosters.
+
+Validators come from change counters bumped on writes, never from the response body:
+TableVersion for whole reference tables (classrooms, houses, exams) and RosterVersion
+for the students of one classroom or house. A request whose If-None-Match (or
+If-Modified-Since) matches is answered with 304 after reading that one counter row,
+before the view touches its own tables.
+"""
+from functools import wraps
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from .models import RosterVersion, TableVersion
+
+
+def bump_table_versions(names):
+    """Invalidate every client copy of these reference tables."""
+    names = set(names)
+    if not names:
+        return
+    TableVersion.objects.bulk_create([TableVersion(name=name) for name in names], ignore_conflicts=True)
+    TableVersion.objects.filter(name__in=names).update(version=F('version') + 1, updated_at=timezone.now())
+
+
+def table_state(*names):
+    """(etag, last_modified) of some reference tables, from one read of their counters."""
+    rows = {
+        name: (version, updated_at)
+        for name, version, updated_at in TableVersion.objects.filter(name__in=names).values_list(
+            'name', 'version', 'updated_at',
+        )
+    }
+    etag = 'W/"%s"' % '.'.join(f'{name}-{rows.get(name, (0, None))[0]}' for name in names)
+    stamps = [updated_at for _, updated_at in rows.values() if updated_at is not None]
+    # A table never written since the counters were added has no known modification time
+    return etag, max(stamps) if len(stamps) == len(names) else None
+
+
+def roster_state(branch_id, scope_type, scope_id):
+    """
+    (etag, last_modified, version) of one roster. Students without a branch have no
+    counter, so their rosters get no validators: (None, None, None).
+    """
+    if branch_id is None:
+        return None, None, None
+    version, updated_at = RosterVersion.objects.filter(
+        branch_id=branch_id, scope_type=scope_type, scope_id=scope_id,
+    ).values_list('version', 'updated_at').first() or (0, None)
+    return f'W/"roster-{branch_id}-{scope_type}-{scope_id}-{version}"', updated_at, version
+
+
+def set_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    # Per-user data (rosters depend on the caller's branch): clients revalidate, shared caches keep out
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Authorization'])
+    return response
+
+
+def not_modified(request, etag, last_modified=None):
+    """The 304 response when the client's copy is current, else None."""
+    if etag is None:
+        return None
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+    return set_validators(response, etag, last_modified) if response is not None else None
+
+
+def conditional(*tables, state=None):
+    """
+    Decorator for GET handlers of API views. Validators are table_state(*tables), or
+    `state(view, request, *args, **kwargs)` returning (etag, last_modified). Runs after
+    DRF authentication and permissions, so a 304 is never served to a rejected caller.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            etag, last_modified = state(self, request, *args, **kwargs) if state else table_state(*tables)
+            response = not_modified(request, etag, last_modified)
+            if response is not None:
+                return response
+            response = method(self, request, *args, **kwargs)
+            if response.status_code == 200 and etag is not None:
+                set_validators(response, etag, last_modified)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,88 @@
+import csv
+import json
+from itertools import islice
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.db.models import Q
+from .models import Attendance
+from .summary import ATTENDANCE_FIELDS
+
+EXPORT_COLUMNS = [
+    ('date', 'date'),
+    ('student_id', 'student_id'),
+    ('roll_number', 'student__roll_number'),
+    ('student_name', 'student__name'),
+    ('classroom', 'student__classroom__name'),
+    ('house', 'student__house__name'),
+] + [(field, field) for field in ATTENDANCE_FIELDS]
+
+CHUNK_SIZE = 2000
+# Lines pulled per thread hop when streaming from the event loop
+ASYNC_STREAM_BATCH = 500
+
+
+def register_rows(attendance_qs, chunk_size=CHUNK_SIZE):
+    """
+    Yield export tuples ordered by (date, student_id) with at most `chunk_size` rows in memory.
+    Uses a server-side cursor (iterator) where the connection allows it; behind a
+    transaction-mode pooler (DISABLE_SERVER_SIDE_CURSORS) it walks the
+    (student, date) unique key in keyset batches instead.
+    """
+    lookups = [lookup for _, lookup in EXPORT_COLUMNS]
+    attendance_qs = attendance_qs.order_by('date', 'student_id')
+    if not connections[attendance_qs.db].settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+        yield from attendance_qs.values_list(*lookups).iterator(chunk_size=chunk_size)
+        return
+
+    last = None
+    while True:
+        batch_qs = attendance_qs
+        if last is not None:
+            batch_qs = batch_qs.filter(Q(date__gt=last[0]) | Q(date=last[0], student_id__gt=last[1]))
+        batch = list(batch_qs.values_list(*lookups)[:chunk_size])
+        if not batch:
+            return
+        yield from batch
+        last = batch[-1]
+
+
+class _Echo:
+    """File-like object whose write() returns the line, for streaming csv.writer output."""
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_ndjson(rows):
+    names = [name for name, _ in EXPORT_COLUMNS]
+    for row in rows:
+        record = dict(zip(names, row))
+        record['date'] = record['date'].isoformat()
+        yield json.dumps(record, separators=(',', ':')) + '\n'
+
+
+async def stream_async(lines, batch_size=None):
+    """
+    Serve a sync line iterator from an async StreamingHttpResponse. Under ASGI Django
+    would read a sync iterator to the end before sending anything, so batches of lines
+    are pulled in the request's database thread and sent as they come.
+    """
+    lines, batch_size = iter(lines), batch_size or ASYNC_STREAM_BATCH
+    next_batch = sync_to_async(lambda: ''.join(islice(lines, batch_size)))
+    while batch := await next_batch():
+        yield batch
+
+
+def export_queryset(branch_id, date_from, date_to, classroom_id=None, house_id=None):
+    attendance_qs = Attendance.objects.filter(student__branch_id=branch_id, date__range=(date_from, date_to))
+    if classroom_id is not None:
+        attendance_qs = attendance_qs.filter(student__classroom_id=classroom_id)
+    if house_id is not None:
+        attendance_qs = attendance_qs.filter(student__house_id=house_id)
+    return attendance_qs
@@ -0,0 +1,138 @@
+import statistics
+import time
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+SESSION_COLUMNS = [
+    'morning_attendance',
+    'evening_class_attendance',
+    'morning_pt_attendance',
+    'games_attendance',
+    'night_dorm_attendance',
+]
+# Status strings the dashboard counts, with their ATTENDANCE_STATUS_CODES code
+DASHBOARD_STATUSES = [('present', 1), ('absent', 2), ('leave', 3), ('on_duty', 4), ('leave_sw', 5), ('NOT_MARKED', 0)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare varchar vs smallint-coded session columns: builds two scratch copies of the "
+        "attendance table with the same generated rows, reports their on-disk size and the "
+        "dashboard's 30-way conditional aggregate time, then drops them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=2740, help="Students per day (default 2740)")
+        parser.add_argument('--days', type=int, default=365, help="Days of attendance (default 365, ~1M rows)")
+        parser.add_argument('--repeat', type=int, default=5, help="Timed runs per query")
+        parser.add_argument('--keep', action='store_true', help="Keep the scratch tables")
+
+    def handle(self, *args, **options):
+        students, days = options['students'], options['days']
+        vendor = connection.vendor
+        if vendor not in ('postgresql', 'sqlite'):
+            self.stderr.write(f"Unsupported database vendor {vendor}")
+            return
+
+        layouts = {
+            'bench_att_varchar': ('varchar(100)', self._status_as_text),
+            'bench_att_smallint': ('smallint', self._status_as_code),
+        }
+        self.stdout.write(f"Generating {students * days:,} rows per layout on {vendor}...")
+        results = {}
+        for table, (column_type, status_expr) in layouts.items():
+            self._create(table, column_type, students, days, status_expr, vendor)
+            day_agg = self._aggregate_sql(table, column_type, where=True)
+            full_agg = self._aggregate_sql(table, column_type, where=False)
+            results[table] = {
+                'size': self._table_size(table, vendor),
+                'day': self._time(day_agg, [(date(2025, 1, 1) + timedelta(days=days // 2)).isoformat()], options['repeat']),
+                'full': self._time(full_agg, [], max(1, options['repeat'] // 2)),
+            }
+            if not options['keep']:
+                with connection.cursor() as cursor:
+                    cursor.execute(f"DROP TABLE {table}")
+
+        self.stdout.write(f"{'layout':<20}{'table+indexes':>16}{'1-day aggregate':>18}{'full-scan aggregate':>22}")
+        for table, res in results.items():
+            self.stdout.write(
+                f"{table:<20}{res['size'] / 1024 / 1024:>13.1f} MB{res['day'] * 1000:>15.2f} ms{res['full'] * 1000:>19.1f} ms"
+            )
+
+    @staticmethod
+    def _status_as_text(seed):
+        whens = ' '.join(f"WHEN {idx} THEN '{value}'" for idx, (value, _) in enumerate(DASHBOARD_STATUSES))
+        return f"CASE ({seed}) % {len(DASHBOARD_STATUSES)} {whens} END"
+
+    @staticmethod
+    def _status_as_code(seed):
+        whens = ' '.join(f"WHEN {idx} THEN {code}" for idx, (_, code) in enumerate(DASHBOARD_STATUSES))
+        return f"CASE ({seed}) % {len(DASHBOARD_STATUSES)} {whens} END"
+
+    def _create(self, table, column_type, students, days, status_expr, vendor):
+        columns = ', '.join(f"{name} {column_type}" for name in SESSION_COLUMNS)
+        statuses = ', '.join(status_expr(f"s * 7 + d * 13 + {k} * 5") for k in range(len(SESSION_COLUMNS)))
+        if vendor == 'postgresql':
+            source = (
+                f"SELECT s, DATE '2025-01-01' + d, {statuses} "
+                f"FROM generate_series(1, {students}) s CROSS JOIN generate_series(0, {days - 1}) d"
+            )
+        else:
+            source = (
+                f"WITH RECURSIVE st(s) AS (SELECT 1 UNION ALL SELECT s + 1 FROM st WHERE s < {students}), "
+                f"dy(d) AS (SELECT 0 UNION ALL SELECT d + 1 FROM dy WHERE d < {days - 1}) "
+                f"SELECT s, date('2025-01-01', '+' || d || ' days'), {statuses} FROM st CROSS JOIN dy"
+            )
+        pk = 'bigserial PRIMARY KEY' if vendor == 'postgresql' else 'integer PRIMARY KEY AUTOINCREMENT'
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            cursor.execute(f"CREATE TABLE {table} (id {pk}, student_id integer NOT NULL, date date NOT NULL, {columns})")
+            cursor.execute(f"INSERT INTO {table} (student_id, date, {', '.join(SESSION_COLUMNS)}) {source}")
+            # Same indexes as attendance_attendance: unique (student, date) and date
+            cursor.execute(f"CREATE UNIQUE INDEX {table}_student_date ON {table} (student_id, date)")
+            cursor.execute(f"CREATE INDEX {table}_date ON {table} (date)")
+            if vendor == 'postgresql':
+                cursor.execute(f"VACUUM ANALYZE {table}")
+            else:
+                cursor.execute(f"ANALYZE {table}")
+
+    @staticmethod
+    def _aggregate_sql(table, column_type, where):
+        # The dashboard's aggregate: COUNT(id) FILTER per (session, status)
+        quoted = column_type != 'smallint'
+        counts = []
+        for column in SESSION_COLUMNS:
+            for value, code in DASHBOARD_STATUSES:
+                match = f"'{value}'" if quoted else str(code)
+                counts.append(f"COUNT(CASE WHEN {column} = {match} THEN id END)")
+        sql = f"SELECT {', '.join(counts)} FROM {table}"
+        if where:
+            sql += " WHERE date = %s"
+        return sql
+
+    @staticmethod
+    def _table_size(table, vendor):
+        with connection.cursor() as cursor:
+            if vendor == 'postgresql':
+                cursor.execute("SELECT pg_total_relation_size(%s)", [table])
+            else:
+                cursor.execute(
+                    "SELECT SUM(pgsize) FROM dbstat WHERE name IN (%s, %s, %s)",
+                    [table, f'{table}_student_date', f'{table}_date'],
+                )
+            return cursor.fetchone()[0] or 0
+
+    @staticmethod
+    def _time(sql, params, repeat):
+        timings = []
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)  # warm-up
+            cursor.fetchall()
+            for _ in range(repeat):
+                start = time.perf_counter()
+                cursor.execute(sql, params)
+                cursor.fetchall()
+                timings.append(time.perf_counter() - start)
+        return statistics.median(timings)
+
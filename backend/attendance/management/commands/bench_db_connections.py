@@ -0,0 +1,73 @@
+import time
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import RequestFactory
+from django.test.utils import setup_test_environment
+from django.urls import reverse
+from attendance.push import percentile
+from core.metrics import pools
+
+
+class Command(BaseCommand):
+    help = (
+        "Per-request database connection overhead: a connection opened for every request "
+        "(CONN_MAX_AGE=0, the old DEBUG behaviour) against the configured pooling mode "
+        "(core.db_pool). Point DATABASE_URL at the real database to include its TLS handshake."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        alias = options['database']
+        config = connections[alias].settings_dict
+        configured = {'CONN_MAX_AGE': config['CONN_MAX_AGE'], 'OPTIONS': dict(config.get('OPTIONS', {}))}
+        per_request = {'CONN_MAX_AGE': 0, 'OPTIONS': {k: v for k, v in configured['OPTIONS'].items() if k != 'pool'}}
+
+        host = config.get('HOST') or config.get('NAME')
+        self.stdout.write(f"{connections[alias].vendor} {host}, {config.get('POOL_MODE', 'persistent')} mode")
+        self.stdout.write(f"{'mode':<14}{'connect p50':>13}{'request p50':>13}{'request p95':>13}{'connects/req':>14}")
+        try:
+            for name, overrides in [('per-request', per_request), ('configured', configured)]:
+                config.update(overrides)
+                self._report(name, alias, options)
+        finally:
+            config.update(configured)
+        for pool_alias, pool in pools():
+            self.stdout.write(f"pool {pool_alias}: {pool.get_stats()}")
+
+    def _report(self, name, alias, options):
+        connection = connections[alias]
+        connection.close()
+        connect_ms = []
+        for _ in range(5):
+            start = time.perf_counter()
+            connection.ensure_connection()
+            connect_ms.append((time.perf_counter() - start) * 1000)
+            connection.close()
+
+        connects = []
+        counter = lambda sender, connection, **kwargs: connects.append(connection.alias)
+        connection_created.connect(counter, weak=False)
+        # The full WSGI cycle: unlike the test Client, it closes or keeps connections at request end
+        handler, timings = WSGIHandler(), []
+        environ = RequestFactory()._base_environ(PATH_INFO=reverse('list-exams'), REQUEST_METHOD='GET')
+        try:
+            for run in range(options['warmup'] + options['requests']):
+                if run == options['warmup']:
+                    connects.clear()
+                start = time.perf_counter()
+                handler(dict(environ), lambda status, headers, exc_info=None: None).close()
+                if run >= options['warmup']:
+                    timings.append((time.perf_counter() - start) * 1000)
+        finally:
+            connection_created.disconnect(counter)
+        self.stdout.write(
+            f"{name:<14}{percentile(sorted(connect_ms), 50):>10.2f} ms{percentile(sorted(timings), 50):>10.2f} ms"
+            f"{percentile(sorted(timings), 95):>10.2f} ms{connects.count(alias) / len(timings):>14.2f}"
+        )
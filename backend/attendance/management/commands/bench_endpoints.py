@@ -0,0 +1,189 @@
+import json
+import os
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+from django.urls import reverse
+import attendance.urls
+import students.urls
+from accounts.models import Branch, User
+from accounts.serialiser import CustomTokenObtainPairSerializer
+from attendance.models import Attendance, Student
+from attendance.push import percentile
+from students.models import Results
+
+CRON_KEY = 'bench-cron-key'
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every endpoint of attendance/urls.py and students/urls.py in-process (no network) "
+        "against a generated dataset and report p50/p95 latency and queries per request. "
+        "Write endpoints run inside a rolled-back transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--branch', type=int, help="Branch id (default: first generated branch)")
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--only', help="Run only cases whose name contains this text")
+        parser.add_argument('--json', dest='json_path', help="Also write the results to this file")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        os.environ['CRON_SECRET'] = CRON_KEY
+        branch = self._branch(options['branch'])
+        fixture = self._fixture(branch)
+        cases = self._cases(fixture)
+        self._check_coverage(cases)
+        if options['only']:
+            cases = [case for case in cases if options['only'] in case[0]]
+
+        # A crashing view is reported as a 500 instead of aborting the run
+        client = Client(raise_request_exception=False)
+        token = CustomTokenObtainPairSerializer.get_token(fixture['admin']).access_token
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {token}', 'HTTP_X_CRON_KEY': CRON_KEY}
+
+        self.stdout.write(
+            f"{branch.name}: classroom {fixture['classroom_id']} ({len(fixture['students'])} students), "
+            f"date {fixture['date']}, exam {fixture['exam_id']}, {connection.vendor}"
+        )
+        self.stdout.write(f"{'case':<34}{'status':>7}{'p50 ms':>10}{'p95 ms':>10}{'queries':>9}")
+        report = []
+        for name, method, url, payload in cases:
+            timings, queries, status_code = [], [], None
+            for run in range(options['warmup'] + options['iterations']):
+                with transaction.atomic():
+                    with CaptureQueriesContext(connection) as captured:
+                        start = time.perf_counter()
+                        response = self._request(client, method, url, payload, headers)
+                        elapsed = (time.perf_counter() - start) * 1000
+                    transaction.set_rollback(method != 'get')
+                status_code = response.status_code
+                if run >= options['warmup']:
+                    timings.append(elapsed)
+                    queries.append(len(captured))
+            timings.sort()
+            row = {
+                'case': name, 'status': status_code,
+                'p50_ms': round(percentile(timings, 50), 2), 'p95_ms': round(percentile(timings, 95), 2),
+                'queries': max(queries),
+            }
+            report.append(row)
+            flag = '' if status_code < 400 else '  <-- error'
+            self.stdout.write(
+                f"{name:<34}{status_code:>7}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['queries']:>9}{flag}"
+            )
+        if options['json_path']:
+            with open(options['json_path'], 'w') as fh:
+                json.dump({'vendor': connection.vendor, 'branch': branch.id, 'results': report}, fh, indent=2)
+
+    @staticmethod
+    def _request(client, method, url, payload, headers):
+        if method == 'get':
+            response = client.get(url, payload, **headers)
+        elif method == 'delete':
+            response = client.delete(url, **headers)
+        else:
+            response = getattr(client, method)(url, json.dumps(payload), content_type='application/json', **headers)
+        # Streaming responses (export) are consumed so their queries and time are counted
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    @staticmethod
+    def _branch(branch_id):
+        branches = Branch.objects.filter(name__startswith='Bench Branch').order_by('id')
+        if branch_id:
+            branches = Branch.objects.filter(id=branch_id)
+        branch = branches.first()
+        if branch is None:
+            raise CommandError("No generated branch found; run manage.py generate_dataset first")
+        return branch
+
+    @staticmethod
+    def _fixture(branch):
+        admin = User.objects.filter(branch=branch, role='admin').first()
+        if admin is None:
+            raise CommandError(f"Branch {branch.id} has no admin user")
+        classroom_id = (
+            Student.objects.filter(branch=branch).values('classroom_id')
+            .annotate(n=Count('id')).order_by('-n', 'classroom_id').values_list('classroom_id', flat=True).first()
+        )
+        students = list(
+            Student.objects.filter(branch=branch, classroom_id=classroom_id)
+            .values('id', 'name', 'roll_number', 'classroom_id', 'house_id', 'course')
+        )
+        day = Attendance.objects.filter(student__branch=branch).order_by('-date').values_list('date', flat=True).first()
+        exam_id = Results.objects.filter(student__classroom_id=classroom_id).values_list('exam_id', flat=True).first()
+        if not students or day is None or exam_id is None:
+            raise CommandError("Branch has no students, attendance or results; run manage.py generate_dataset")
+        return {
+            'admin': admin, 'branch_id': branch.id, 'classroom_id': classroom_id, 'students': students,
+            'house_id': students[0]['house_id'], 'date': day.isoformat(), 'exam_id': exam_id,
+            'month_from': (day - timedelta(days=29)).isoformat(),
+        }
+
+    @staticmethod
+    def _cases(f):
+        day, classroom_id, exam_id = f['date'], f['classroom_id'], f['exam_id']
+        student = f['students'][0]
+        month_from = f['month_from']
+        endpoint = 'https://push.example.invalid/bench'
+        # (name, method, url, query params or JSON body)
+        return [
+            ('attendance-api GET class', 'get', reverse('attendance-api'), {'classroom': classroom_id, 'date': day, 'att_type': 'morning'}),
+            ('attendance-api GET house', 'get', reverse('attendance-api'), {'house': f['house_id'], 'date': day, 'att_type': 'games'}),
+            ('attendance-api POST', 'post', reverse('attendance-api'), [
+                {'student': s['id'], 'date': day, 'status': 'present', 'att_type': 'morning'} for s in f['students']
+            ]),
+            ('attendance-dashboard', 'get', reverse('attendance-dashboard'), {'date': day}),
+            ('attendance-trend 30d', 'get', reverse('attendance-trend'), {'from': month_from, 'to': day}),
+            ('attendance-export 30d', 'get', reverse('attendance-export'), {'from': month_from, 'to': day, 'classroom': classroom_id}),
+            ('all-student-attendance', 'get', reverse('all-student-attendance'), {'date': day, 'attendance_type': 'morning', 'status_value': 'absent'}),
+            ('all-student-attendance search', 'get', reverse('all-student-attendance'), {'date': day, 'status_value': 'present', 'search': student['name'][:4]}),
+            ('student-attendance GET', 'get', reverse('student-attendance'), {}),
+            ('student-attendance GET page', 'get', reverse('student-attendance'), {'page_size': 50}),
+            ('student-attendance search', 'get', reverse('student-attendance'), {'search': student['name']}),
+            ('student-attendance POST', 'post', reverse('student-attendance'), {
+                'name': 'Bench Student', 'roll_number': 9999, 'classroom': classroom_id, 'house': f['house_id'],
+            }),
+            ('student-attendance-detail PATCH', 'patch', reverse('student-attendance-detail', args=[student['id']]), {'name': student['name']}),
+            ('student-attendance-detail DELETE', 'delete', reverse('student-attendance-detail', args=[student['id']]), None),
+            ('bulk-add-students', 'post', reverse('bulk-add-students'), {'students': [
+                {'name': s['name'], 'roll_number': s['roll_number'], 'classroom_id': s['classroom_id'],
+                 'house_id': s['house_id'], 'course': s['course']} for s in f['students']
+            ]}),
+            ('roster-cache-stats', 'get', reverse('roster-cache-stats'), {}),
+            ('push-subscribe', 'post', reverse('push-subscribe'), {'endpoint': endpoint, 'keys': {'p256dh': 'bench', 'auth': 'bench'}}),
+            ('push-unsubscribe', 'post', reverse('push-unsubscribe'), {'endpoint': endpoint}),
+            ('push-trigger-unmarked', 'post', reverse('push-trigger-unmarked'), {'date': day, 'attendance_type': 'morning'}),
+            ('results-list POST', 'post', reverse('results-list'), {
+                'student_roll': student['roll_number'], 'classroom_id': classroom_id, 'exam': exam_id, 'subject': 'MATHS', 'score': 75,
+            }),
+            ('class-results', 'get', reverse('class-results'), {'classroom_id': classroom_id, 'exam_id': exam_id, 'branch_id': f['branch_id']}),
+            ('student-results', 'get', reverse('student-results', args=[student['id']]), {'exam_id': exam_id}),
+            ('subject-results', 'get', reverse('subject-results'), {'subject': 'MATHS', 'classroom_id': classroom_id, 'exam_id': exam_id}),
+            ('subject-results-detail', 'get', reverse('subject-results-detail'), {'exam_id': exam_id}),
+            ('list-subjects', 'get', reverse('list-subjects'), {'class_type': 'Secondary'}),
+            ('list-exams', 'get', reverse('list-exams'), {}),
+            ('list-students', 'get', reverse('list-students'), {'subject': 'MATHS', 'classroom_id': classroom_id, 'exam_id': exam_id}),
+            ('report-cards', 'get', reverse('report-cards'), {'exam_id': exam_id, 'classroom_id': classroom_id, 'branch_id': f['branch_id']}),
+            ('report-cards POST', 'post', reverse('report-cards'), {'exam_id': exam_id}),
+            ('report-card', 'get', reverse('report-card', args=[student['id']]), {'exam_id': exam_id}),
+            ('bulk-results', 'post', reverse('bulk-results'), {'results': [
+                {'student_roll': s['roll_number'], 'classroom_id': classroom_id, 'subject': 'MATHS', 'score': 70, 'exam': exam_id}
+                for s in f['students']
+            ]}),
+        ]
+
+    def _check_coverage(self, cases):
+        covered = {case[0].split(' ')[0] for case in cases}
+        names = [p.name for p in attendance.urls.urlpatterns + students.urls.urlpatterns if p.name]
+        missing = [name for name in names if name not in covered]
+        if missing:
+            self.stderr.write(f"Endpoints without a benchmark case: {', '.join(missing)}")
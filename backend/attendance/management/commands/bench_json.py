@@ -0,0 +1,106 @@
+import io
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.translation import gettext_lazy
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from core.renderers import FastJSONParser, FastJSONRenderer, orjson
+
+HOUSES = ['ARAVALI_JR', 'NILGIRI_JR', 'SHIVALIK_JR', 'UDAIGIRI_JR']
+
+
+def student_list(count):
+    """StudentAPIView's branch-wide response."""
+    return {
+        'total_students': count,
+        'branch_id': 1,
+        'students': [
+            {'id': i, 'name': f'Student {i}', 'roll_number': i % 60 + 1,
+             'classroom__name': f'Class {i % 12 + 1}', 'house__name': HOUSES[i % 4]}
+            for i in range(1, count + 1)
+        ],
+    }
+
+
+def attendance_list(count):
+    """AllStudentAttendanceAPIView's response."""
+    return {
+        'total_students': count,
+        'date': '2025-09-10',
+        'branch_id': 1,
+        'students': [
+            {'roll_number': i % 60 + 1, 'name': f'Student {i}',
+             'classroom__name': f'Class {i % 12 + 1}', 'house__name': HOUSES[i % 4]}
+            for i in range(1, count + 1)
+        ],
+    }
+
+
+def typed_rows(count):
+    """Rows carrying the types the encoder must special-case: dates, datetimes, Decimals, lazy strings."""
+    start = datetime(2025, 9, 10, 8, 30, 15, 123456, tzinfo=dt_timezone.utc)
+    present = gettext_lazy('present')
+    return [
+        {'id': i, 'date': date(2025, 9, 10) - timedelta(days=i % 30), 'marked_at': start + timedelta(seconds=i),
+         'percentage': Decimal(i % 1000) / 10, 'status': present}
+        for i in range(1, count + 1)
+    ]
+
+
+def bulk_results(count, subjects=7):
+    """A BulkResultsAPI body: a whole exam for `count` students."""
+    return {'results': [
+        {'student_roll': i % 60 + 1, 'classroom_id': i % 12 + 1, 'subject': f'SUBJECT {s}',
+         'score': (i * 7 + s) % 101, 'exam': 1}
+        for i in range(1, count + 1) for s in range(subjects)
+    ]}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare DRF's stdlib JSON renderer/parser with core.renderers (orjson) on branch-wide "
+        "payloads, and check both produce the same output. Needs no database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            raise CommandError("orjson is not installed; FastJSONRenderer is using the stdlib codec")
+        count, repeat = options['students'], options['repeat']
+        self.stdout.write(f"{count} students, median of {repeat} runs")
+        self.stdout.write(f"{'case':<28}{'bytes':>10}{'stdlib ms':>12}{'orjson ms':>12}{'speedup':>9}")
+
+        for name, data in [
+            ('render students', student_list(count)),
+            ('render all-attendance', attendance_list(count)),
+            ('render typed rows', typed_rows(count)),
+        ]:
+            expected = JSONRenderer().render(data)
+            if FastJSONRenderer().render(data) != expected:
+                raise CommandError(f"{name}: output differs from JSONRenderer")
+            self._report(name, len(expected), repeat,
+                         lambda: JSONRenderer().render(data), lambda: FastJSONRenderer().render(data))
+
+        body = JSONRenderer().render(bulk_results(count))
+        if FastJSONParser().parse(io.BytesIO(body)) != JSONParser().parse(io.BytesIO(body)):
+            raise CommandError("parse bulk results: output differs from JSONParser")
+        self._report('parse bulk results', len(body), repeat,
+                     lambda: JSONParser().parse(io.BytesIO(body)), lambda: FastJSONParser().parse(io.BytesIO(body)))
+
+    def _report(self, name, size, repeat, stdlib, fast):
+        slow_ms, fast_ms = self._median_ms(stdlib, repeat), self._median_ms(fast, repeat)
+        self.stdout.write(f"{name:<28}{size:>10}{slow_ms:>12.2f}{fast_ms:>12.2f}{slow_ms / fast_ms:>8.1f}x")
+
+    @staticmethod
+    def _median_ms(call, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            call()
+            timings.append((time.perf_counter() - start) * 1000)
+        return sorted(timings)[len(timings) // 2]
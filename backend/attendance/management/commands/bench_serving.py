@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db.backends.signals import connection_created
+from django.db.backends.utils import CursorWrapper
+from django.test import RequestFactory
+from django.test.utils import setup_test_environment
+from django.urls import reverse
+from accounts.models import User
+from accounts.serialiser import CustomTokenObtainPairSerializer
+from attendance.models import Student
+from attendance.push import percentile
+from core.db_pool import worker_threads
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the sync deployment (core.wsgi on a gunicorn worker with --threads threads) "
+        "against the async one (core.asgi, DJANGO_ASYNC_VIEWS) in one process: concurrent "
+        "clients call the attendance and dashboard endpoints, every query delayed by --db-latency "
+        "to stand in for the remote database. Uses the first admin user whose branch has students."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=['both', 'sync', 'async'], default='both')
+        parser.add_argument('--concurrency', default='1,10,50,200', help="comma-separated client counts")
+        parser.add_argument('--requests', type=int, default=400, help="requests per concurrency level")
+        parser.add_argument('--threads', type=int, default=worker_threads(), help="sync worker threads")
+        parser.add_argument('--db-latency', type=float, default=20, help="milliseconds added to every query")
+
+    def handle(self, *args, **options):
+        if options['mode'] == 'both':
+            for mode in ('sync', 'async'):
+                self._run_mode(mode, options)
+            return
+        if (options['mode'] == 'async') != settings.ASYNC_VIEWS:
+            raise CommandError(f"--mode {options['mode']} needs DJANGO_ASYNC_VIEWS={options['mode'] == 'async'}")
+
+        setup_test_environment()
+        # Queueing past the worker's capacity is the point here, not a slow endpoint
+        logging.getLogger('core.middlewares').setLevel(logging.ERROR)
+        targets = self._targets()
+        levels = [int(level) for level in options['concurrency'].split(',')]
+        latency = options['db_latency'] / 1000
+        original_execute = CursorWrapper._execute
+        self.peak_threads = 0
+
+        def remote_execute(cursor, *execute_args):
+            self.peak_threads = max(self.peak_threads, threading.active_count())
+            time.sleep(latency)
+            return original_execute(cursor, *execute_args)
+
+        connects = []
+        counter = lambda sender, connection, **kwargs: connects.append(connection.alias)
+        connection_created.connect(counter, weak=False)
+        try:
+            with mock.patch.object(CursorWrapper, '_execute', remote_execute):
+                self._report(options, targets, levels, connects)
+        finally:
+            connection_created.disconnect(counter)
+
+    def _run_mode(self, mode, options):
+        command = [
+            sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'), 'bench_serving', '--mode', mode,
+            '--concurrency', options['concurrency'], '--requests', str(options['requests']),
+            '--threads', str(options['threads']), '--db-latency', str(options['db_latency']),
+        ]
+        env = {**os.environ, 'DJANGO_ASYNC_VIEWS': 'true' if mode == 'async' else 'false'}
+        self.stdout.flush()
+        if subprocess.run(command, env=env).returncode:
+            raise CommandError(f"{mode} run failed")
+
+    def _targets(self):
+        user = User.objects.filter(
+            role='admin', branch__isnull=False, branch__student__classroom__isnull=False
+        ).order_by('id').first()
+        if user is None:
+            raise CommandError("needs an admin user whose branch has students in a classroom")
+        classroom_id = Student.objects.filter(branch_id=user.branch_id, classroom__isnull=False).values_list(
+            'classroom_id', flat=True).first()
+        day = '2025-09-10'
+        auth = f'Bearer {CustomTokenObtainPairSerializer.get_token(user).access_token}'
+        return auth, [
+            (reverse('attendance-api'), urlencode({'classroom': classroom_id, 'date': day, 'att_type': 'morning'})),
+            (reverse('attendance-dashboard'), urlencode({'date': day})),
+        ]
+
+    def _report(self, options, targets, levels, connects):
+        mode = options['mode']
+        serving = (
+            'core.asgi: async views on the event loop' if mode == 'async'
+            else f"core.wsgi: {options['threads']} worker thread(s)"
+        )
+        self.stdout.write(f"{mode} - {serving}, {options['db_latency']:g} ms per query, {options['requests']} requests per level")
+        self.stdout.write(
+            f"{'clients':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}{'connects/req':>14}{'db threads':>12}"
+        )
+        run = self._run_async if mode == 'async' else self._run_sync
+        run(options, targets, levels[0])  # warm up caches and the token verification
+        for clients in levels:
+            connects.clear()
+            self.peak_threads = 0
+            elapsed, timings, errors = run(options, targets, clients)
+            # Threads waiting on a query at the busiest moment, without the main and client threads
+            db_threads = self.peak_threads - 1 - (clients if mode == 'sync' else 0)
+            self.stdout.write(
+                f"{clients:>8}{len(timings) / elapsed:>10.1f}{percentile(sorted(timings), 50):>10.1f}"
+                f"{percentile(sorted(timings), 95):>10.1f}{errors:>8}{len(connects) / len(timings):>14.2f}{db_threads:>12}"
+            )
+
+    @staticmethod
+    def _plan(options, targets):
+        auth, paths = targets
+        return auth, [paths[n % len(paths)] for n in range(options['requests'])]
+
+    def _run_sync(self, options, targets, clients):
+        auth, plan = self._plan(options, targets)
+        handler, timings, statuses = WSGIHandler(), [], []
+        base = RequestFactory()._base_environ(REQUEST_METHOD='GET', HTTP_AUTHORIZATION=auth)
+
+        def serve(path, query):
+            status = []
+            environ = {**base, 'PATH_INFO': path, 'QUERY_STRING': query}
+            handler(environ, lambda line, headers, exc_info=None: status.append(line)).close()
+            return int(status[0].split()[0])
+
+        # A gunicorn worker: its threads serve the clients' requests, the rest wait in its queue
+        with ThreadPoolExecutor(options['threads']) as worker, ThreadPoolExecutor(clients) as client_pool:
+            def client(path, query):
+                start = time.perf_counter()
+                statuses.append(worker.submit(serve, path, query).result())
+                timings.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            list(client_pool.map(lambda target: client(*target), plan))
+            elapsed = time.perf_counter() - start
+        return elapsed, timings, sum(status != 200 for status in statuses)
+
+    def _run_async(self, options, targets, clients):
+        auth, plan = self._plan(options, targets)
+        handler, timings, statuses = ASGIHandler(), [], []
+
+        async def serve(path, query):
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+                'root_path': '', 'headers': [(b'host', b'testserver'), (b'authorization', auth.encode())],
+                'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+            }
+            messages = iter([{'type': 'http.request', 'body': b'', 'more_body': False}])
+            status = []
+
+            async def receive():
+                message = next(messages, None)
+                if message is None:
+                    await asyncio.Event().wait()  # the client never disconnects
+                return message
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(message['status'])
+
+            await handler(scope, receive, send)
+            return status[0]
+
+        async def main():
+            queue = iter(plan)
+
+            async def client():
+                for path, query in queue:
+                    start = time.perf_counter()
+                    statuses.append(await serve(path, query))
+                    timings.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(client() for _ in range(clients)))
+            return time.perf_counter() - start
+
+        elapsed = asyncio.run(main())
+        return elapsed, timings, sum(status != 200 for status in statuses)
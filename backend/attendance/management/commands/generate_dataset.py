@@ -0,0 +1,160 @@
+import random
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from accounts.models import Branch, User
+from attendance.models import Attendance, Classroom, HouseTypes, Houses, Student
+from attendance.roster import bump_roster_versions, student_scopes
+from attendance.search import index_students
+from attendance.summary import ATTENDANCE_FIELDS, refresh_summary
+from students.models import Exam, Results
+from students.stats import refresh_classrooms
+from students.views import ListSubjectsAPI
+
+BRANCH_PREFIX = 'Bench Branch'
+CLASSROOM_NAMES = [f'Class {grade} {section}' for grade in range(6, 13) for section in ('A', 'B')]
+EXAM_NAMES = ['PWT 1', 'PWT 2', 'PWT 3', 'PWT 4', 'MID TERM', 'FINAL EXAM']
+# Relative frequency of each stored status for one session of one student-day
+STATUS_WEIGHTS = {'present': 90, 'absent': 3, 'leave': 2, 'leave-sw': 1, 'on_duty': 2, 'NOT_MARKED': 2}
+FIRST_NAMES = ['Aarav', 'Aditi', 'Arjun', 'Diya', 'Ishaan', 'Kavya', 'Krishna', 'Meera', 'Nikhil', 'Priya',
+               'Rahul', 'Riya', 'Rohan', 'Saanvi', 'Sai', 'Sneha', 'Tanvi', 'Varun', 'Vihaan', 'Zara']
+LAST_NAMES = ['Sharma', 'Verma', 'Reddy', 'Nair', 'Iyer', 'Patel', 'Gupta', 'Kumar', 'Singh', 'Das',
+              'Rao', 'Menon', 'Joshi', 'Mehta', 'Pillai', 'Bose', 'Chopra', 'Kulkarni', 'Naidu', 'Yadav']
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic school for benchmarks: branches with an admin and a teacher, "
+        "the HouseTypes houses, classrooms 6-12, students, a range of five-session attendance, "
+        "exams and results. Branches are named '%s N'; re-running with --reset replaces them." % BRANCH_PREFIX
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--branches', type=int, default=2)
+        parser.add_argument('--students', type=int, default=1400, help="Students per branch")
+        parser.add_argument('--days', type=int, default=365, help="Days of attendance ending at --end")
+        parser.add_argument('--end', default='2025-12-31', help="Last attendance day, YYYY-MM-DD")
+        parser.add_argument('--exams', type=int, default=len(EXAM_NAMES), help="Exams with results")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--password', default='bench', help="Password of the generated users")
+        parser.add_argument('--reset', action='store_true', help="Delete previously generated branches first")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        if options['reset']:
+            deleted, _ = Branch.objects.filter(name__startswith=BRANCH_PREFIX).delete()
+            self.stdout.write(f"Deleted {deleted} rows of earlier generated data")
+
+        houses = self._houses()
+        classrooms = self._classrooms()
+        exams = self._exams(options['exams'])
+        end = date.fromisoformat(options['end'])
+        start = end - timedelta(days=options['days'] - 1)
+
+        for number in range(1, options['branches'] + 1):
+            branch, _ = Branch.objects.get_or_create(name=f'{BRANCH_PREFIX} {number}', defaults={'location': 'Synthetic'})
+            self._users(branch, options['password'])
+            students = self._students(branch, options['students'], classrooms, houses, rng)
+            attendance = self._attendance(students, start, end, rng)
+            results = self._results(students, classrooms, exams, rng)
+            refresh_summary(start, end, branch.id)
+            refresh_classrooms([classroom.id for classroom in classrooms])
+            self.stdout.write(
+                f"{branch.name} (id {branch.id}): {len(students)} students, {attendance:,} attendance rows, "
+                f"{results:,} results; login bench-admin-{branch.id} / {options['password']}"
+            )
+
+    @staticmethod
+    def _houses():
+        existing = {house.name: house for house in Houses.objects.all()}
+        for value in HouseTypes.values:
+            if value not in existing:
+                existing[value] = Houses.objects.create(name=value)
+        return {
+            'JR': [existing[value] for value in HouseTypes.values if value.endswith('_JR')],
+            'SR': [existing[value] for value in HouseTypes.values if value.endswith('_SR')],
+        }
+
+    @staticmethod
+    def _classrooms():
+        existing = {classroom.name: classroom for classroom in Classroom.objects.filter(name__in=CLASSROOM_NAMES)}
+        return [existing.get(name) or Classroom.objects.create(name=name) for name in CLASSROOM_NAMES]
+
+    @staticmethod
+    def _exams(count):
+        existing = {exam.name: exam for exam in Exam.objects.filter(name__in=EXAM_NAMES)}
+        return [existing.get(name) or Exam.objects.create(name=name) for name in EXAM_NAMES[:count]]
+
+    @staticmethod
+    def _users(branch, password):
+        for role in ('admin', 'teacher'):
+            user, created = User.objects.get_or_create(
+                username=f'bench-{role}-{branch.id}', defaults={'role': role, 'branch': branch},
+            )
+            if created:
+                user.set_password(password)
+                user.save(update_fields=['password'])
+
+    @staticmethod
+    def _students(branch, count, classrooms, houses, rng):
+        students = []
+        for index in range(count):
+            class_index = index % len(classrooms)
+            senior = class_index >= 6
+            students.append(Student(
+                name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                roll_number=index // len(classrooms) + 1,
+                classroom=classrooms[class_index],
+                house=rng.choice(houses['SR' if senior else 'JR']),
+                branch=branch,
+                course=rng.choice(['PCMC', 'PCMB']) if class_index >= 10 else 'NA',
+                parent_name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                parent_phone=f'9{rng.randrange(10 ** 9):09d}',
+            ))
+        with transaction.atomic():
+            Student.objects.bulk_create(students, batch_size=1000)
+            # bulk_create skips the Student signals
+            index_students(students)
+            bump_roster_versions(set().union(*(
+                student_scopes(branch.id, s.classroom_id, s.house_id) for s in students
+            )))
+        return students
+
+    @staticmethod
+    def _attendance(students, start, end, rng):
+        statuses, weights = list(STATUS_WEIGHTS), list(STATUS_WEIGHTS.values())
+        total, batch = 0, []
+        day = start
+        while day <= end:
+            for student in students:
+                marks = rng.choices(statuses, weights, k=len(ATTENDANCE_FIELDS))
+                batch.append(Attendance(student_id=student.id, date=day, **dict(zip(ATTENDANCE_FIELDS, marks))))
+            if len(batch) >= 20000:
+                Attendance.objects.bulk_create(batch, batch_size=5000)
+                total += len(batch)
+                batch = []
+            day += timedelta(days=1)
+        Attendance.objects.bulk_create(batch, batch_size=5000)
+        return total + len(batch)
+
+    @staticmethod
+    def _results(students, classrooms, exams, rng):
+        subjects = ListSubjectsAPI.subject_mappings
+        senior_ids = {classroom.id for classroom in classrooms[10:]}
+        rows = []
+        for student in students:
+            if student.classroom_id in senior_ids:
+                student_subjects = [
+                    s for s in subjects['Secondary']
+                    if not (s == 'BIOLOGY' and student.course == 'PCMC')
+                    and not (s in ('IT', 'COMPUTER SCIENCE') and student.course == 'PCMB')
+                ]
+            else:
+                student_subjects = subjects['Primary']
+            ability = rng.gauss(65, 12)
+            for exam in exams:
+                for subject in student_subjects:
+                    score = int(min(100, max(0, rng.gauss(ability, 10))))
+                    rows.append(Results(student_id=student.id, subject=subject, score=score, exam=exam))
+        Results.objects.bulk_create(rows, batch_size=5000)
+        return len(rows)
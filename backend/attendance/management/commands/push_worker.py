@@ -0,0 +1,44 @@
+import signal
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from core.settings import logger
+from attendance.push import OUTBOX_BATCH_SIZE, claim_jobs, deliver_jobs, purge_outbox
+
+
+class Command(BaseCommand):
+    help = "Deliver queued web pushes from the PushOutbox table; safe to run several workers side by side."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=OUTBOX_BATCH_SIZE)
+        parser.add_argument('--idle-sleep', type=float, default=2.0, help="Seconds to wait when nothing is due")
+        parser.add_argument('--retention-days', type=int, default=7, help="Delete finished jobs older than this")
+        parser.add_argument('--once', action='store_true', help="Exit once no job is due")
+
+    def handle(self, *args, **options):
+        self._stopping = False
+        # Finish the current batch on SIGTERM/SIGINT instead of dying mid-send
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        purged = purge_outbox(options['retention_days'])
+        last_purge = time.monotonic()
+        self.stdout.write(f"Push worker started (purged {purged} finished jobs)")
+
+        while not self._stopping:
+            close_old_connections()
+            jobs = claim_jobs(options['batch_size'])
+            if jobs:
+                report = deliver_jobs(jobs)
+                logger.info("Push worker delivered %d jobs: %s", len(jobs), report.as_dict())
+                continue
+            if options['once']:
+                break
+            if time.monotonic() - last_purge > 3600:
+                purge_outbox(options['retention_days'])
+                last_purge = time.monotonic()
+            time.sleep(options['idle_sleep'])
+        self.stdout.write(self.style.SUCCESS("Push worker stopped"))
+
+    def _stop(self, signum, frame):
+        self._stopping = True
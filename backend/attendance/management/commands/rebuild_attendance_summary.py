@@ -0,0 +1,45 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from attendance.summary import refresh_summary, verify_summary
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f"Invalid date {value!r}. Use YYYY-MM-DD.")
+
+
+class Command(BaseCommand):
+    help = "Recompute AttendanceDailySummary from Attendance for a date range, or verify it with --verify."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', help="First day (YYYY-MM-DD), defaults to today")
+        parser.add_argument('--to', dest='date_to', help="Last day (YYYY-MM-DD), defaults to --from")
+        parser.add_argument('--branch', type=int, help="Only this branch id")
+        parser.add_argument('--verify', action='store_true', help="Report mismatches without writing")
+
+    def handle(self, *args, **options):
+        date_from = parse_date(options['date_from']) if options['date_from'] else timezone.localdate()
+        date_to = parse_date(options['date_to']) if options['date_to'] else date_from
+        if date_to < date_from:
+            raise CommandError("--to must not be before --from")
+        branch_id = options['branch']
+
+        if options['verify']:
+            mismatches = verify_summary(date_from, date_to, branch_id)
+            for (branch, day, session, status_value), expected, stored in mismatches:
+                self.stdout.write(
+                    f"branch={branch} date={day} session={session} status={status_value}: "
+                    f"expected {expected}, stored {stored}"
+                )
+            if mismatches:
+                raise CommandError(f"{len(mismatches)} summary rows out of date")
+            self.stdout.write(self.style.SUCCESS(f"Summary matches Attendance for {date_from}..{date_to}"))
+            return
+
+        upserted, deleted = refresh_summary(date_from, date_to, branch_id)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt summary for {date_from}..{date_to}: {upserted} rows written, {deleted} stale rows removed"
+        ))
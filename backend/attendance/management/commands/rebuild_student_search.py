@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from attendance.models import Student
+from attendance.search import index_students
+
+
+class Command(BaseCommand):
+    help = "Rebuild the student search index (StudentSearchGram) for one branch or all branches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--branch', type=int, help="Only this branch id")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        students = Student.objects.filter(branch__isnull=False).only('id', 'name', 'roll_number', 'branch_id')
+        if options['branch']:
+            students = students.filter(branch_id=options['branch'])
+
+        batch, total = [], 0
+        for student in students.order_by('id').iterator(chunk_size=options['batch_size']):
+            batch.append(student)
+            if len(batch) >= options['batch_size']:
+                index_students(batch)
+                total += len(batch)
+                batch = []
+        index_students(batch)
+        total += len(batch)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} students"))
@@ -0,0 +1,24 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from attendance.sms import notify_absentees
+from attendance.summary import ATTENDANCE_FIELDS
+
+
+class Command(BaseCommand):
+    help = "Text the parents of students marked absent; run after each marking window (safe to re-run, sends once per day and session)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="YYYY-MM-DD, defaults to today")
+        parser.add_argument('--session', action='append', choices=ATTENDANCE_FIELDS, help="Attendance field; repeatable, defaults to all")
+        parser.add_argument('--branch', type=int, help="Only this branch id")
+
+    def handle(self, *args, **options):
+        try:
+            day = datetime.strptime(options['date'], '%Y-%m-%d').date() if options['date'] else timezone.localdate()
+        except ValueError:
+            raise CommandError("Invalid --date, expected YYYY-MM-DD")
+
+        for session in options['session'] or ATTENDANCE_FIELDS:
+            report = notify_absentees(day, session, options['branch'])
+            self.stdout.write(f"{day} {session}: {report.as_dict()}")
@@ -0,0 +1,31 @@
+from django.db import migrations
+from django.db.models import Count, Max
+
+
+def remove_duplicate_attendance(apps, schema_editor):
+    """Keep only the latest row per (student, date) so the unique constraint can be added."""
+    Attendance = apps.get_model('attendance', 'Attendance')
+    duplicates = (
+        Attendance.objects.values('student_id', 'date')
+        .annotate(row_count=Count('id'), keep_id=Max('id'))
+        .filter(row_count__gt=1)
+    )
+    for dup in duplicates:
+        Attendance.objects.filter(
+            student_id=dup['student_id'], date=dup['date']
+        ).exclude(id=dup['keep_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0014_merge_20250813_0030'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_attendance, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='attendance',
+            unique_together={('student', 'date')},
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_summary(apps, schema_editor):
+    Attendance = apps.get_model('attendance', 'Attendance')
+    AttendanceDailySummary = apps.get_model('attendance', 'AttendanceDailySummary')
+    fields = ['morning_attendance', 'evening_class_attendance', 'morning_pt_attendance',
+              'games_attendance', 'night_dorm_attendance']
+    rows = []
+    for field in fields:
+        grouped = (
+            Attendance.objects.filter(student__branch_id__isnull=False, **{f'{field}__isnull': False})
+            .values('student__branch_id', 'date', field)
+            .annotate(n=Count('id'))
+            .order_by()
+        )
+        rows.extend(
+            AttendanceDailySummary(branch_id=row['student__branch_id'], date=row['date'],
+                                   session=field, status=row[field], count=row['n'])
+            for row in grouped
+        )
+    AttendanceDailySummary.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_branch_alter_user_options_alter_user_is_active_and_more'),
+        ('attendance', '0015_attendance_unique_student_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceDailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('session', models.CharField(max_length=50)),
+                ('status', models.CharField(max_length=100)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='accounts.branch')),
+            ],
+            options={
+                'unique_together': {('branch', 'date', 'session', 'status')},
+            },
+        ),
+        migrations.RunPython(backfill_summary, migrations.RunPython.noop),
+    ]
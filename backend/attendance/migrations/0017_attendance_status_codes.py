@@ -0,0 +1,97 @@
+import attendance.models
+from django.db import migrations, models
+
+SESSION_FIELDS = [
+    'morning_attendance',
+    'evening_class_attendance',
+    'morning_pt_attendance',
+    'games_attendance',
+    'night_dorm_attendance',
+]
+
+# Frozen copy of attendance.models.ATTENDANCE_STATUS_CODES at the time of this migration
+STATUS_CODES = {
+    'NOT_MARKED': 0,
+    'present': 1,
+    'absent': 2,
+    'leave': 3,
+    'on_duty': 4,
+    'leave_sw': 5,
+    'leave-sw': 6,
+    'not_marked': 7,
+    'PRESENT': 8,
+    'ABSENT': 9,
+    'ON_DUTY': 10,
+    'LEAVE': 11,
+    'LEAVE_SW': 12,
+}
+
+STATUS_CHOICES = [
+    ('PRESENT', 'present'), ('ABSENT', 'absent'), ('ON_DUTY', 'on_duty'),
+    ('LEAVE', 'leave'), ('LEAVE_SW', 'leave_sw'), ('NOT_MARKED', 'not_marked'),
+]
+
+
+def _copy_column(schema_editor, source, target, mapping):
+    quote = schema_editor.quote_name
+    cases = ' '.join(f"WHEN %s THEN %s" for _ in mapping)
+    params = [item for pair in mapping.items() for item in pair]
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {quote('attendance_attendance')} SET {quote(target)} = CASE {quote(source)} {cases} END",
+            params,
+        )
+
+
+def encode_statuses(apps, schema_editor):
+    quote = schema_editor.quote_name
+    with schema_editor.connection.cursor() as cursor:
+        for field in SESSION_FIELDS:
+            cursor.execute(f"SELECT DISTINCT {quote(field)} FROM {quote('attendance_attendance')}")
+            unknown = {row[0] for row in cursor.fetchall()} - set(STATUS_CODES) - {None}
+            if unknown:
+                raise RuntimeError(
+                    f"Attendance.{field} holds statuses without a storage code: {sorted(unknown)}. "
+                    "Add them to ATTENDANCE_STATUS_CODES and this migration before migrating."
+                )
+    for field in SESSION_FIELDS:
+        _copy_column(schema_editor, field, f'{field}_code', STATUS_CODES)
+
+
+def decode_statuses(apps, schema_editor):
+    for field in SESSION_FIELDS:
+        _copy_column(schema_editor, f'{field}_code', field, {code: value for value, code in STATUS_CODES.items()})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0016_attendancedailysummary'),
+    ]
+
+    operations = (
+        [
+            migrations.AddField(
+                model_name='attendance',
+                name=f'{field}_code',
+                field=attendance.models.AttendanceStatusField(null=True),
+            )
+            for field in SESSION_FIELDS
+        ]
+        + [migrations.RunPython(encode_statuses, decode_statuses)]
+        + [migrations.RemoveField(model_name='attendance', name=field) for field in SESSION_FIELDS]
+        + [
+            migrations.RenameField(model_name='attendance', old_name=f'{field}_code', new_name=field)
+            for field in SESSION_FIELDS
+        ]
+        + [
+            migrations.AlterField(
+                model_name='attendance',
+                name=field,
+                field=attendance.models.AttendanceStatusField(
+                    choices=STATUS_CHOICES, default='NOT_MARKED', null=True
+                ),
+            )
+            for field in SESSION_FIELDS
+        ]
+    )
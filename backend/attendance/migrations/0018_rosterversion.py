@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_branch_alter_user_options_alter_user_is_active_and_more'),
+        ('attendance', '0017_attendance_status_codes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RosterVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope_type', models.CharField(max_length=20)),
+                ('scope_id', models.IntegerField()),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='accounts.branch')),
+            ],
+            options={
+                'unique_together': {('branch', 'scope_type', 'scope_id')},
+            },
+        ),
+    ]
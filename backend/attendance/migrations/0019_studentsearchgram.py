@@ -0,0 +1,68 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:12
+
+import re
+import unicodedata
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Frozen copy of attendance.search's gram functions at the time of this migration
+ROLL_PREFIX = 'r:'
+_diacritics = re.compile('[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]')
+
+
+def normalize(text):
+    text = _diacritics.sub('', unicodedata.normalize('NFKD', str(text).casefold()))
+    text = ''.join(char if unicodedata.category(char)[0] in 'LMN' else ' ' for char in text)
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+def word_trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def student_grams(name, roll_number):
+    grams = set()
+    for word in normalize(name).split():
+        grams |= word_trigrams(word)
+    roll = str(roll_number) if roll_number is not None else ''
+    grams |= {ROLL_PREFIX + roll[:i] for i in range(1, len(roll) + 1)}
+    return grams
+
+
+def index_existing_students(apps, schema_editor):
+    Student = apps.get_model('attendance', 'Student')
+    StudentSearchGram = apps.get_model('attendance', 'StudentSearchGram')
+    StudentSearchGram.objects.bulk_create(
+        (
+            StudentSearchGram(branch_id=branch_id, gram=gram, student_id=pk)
+            for pk, name, roll_number, branch_id in Student.objects.filter(branch__isnull=False)
+            .values_list('id', 'name', 'roll_number', 'branch_id').iterator()
+            for gram in student_grams(name, roll_number)
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_branch_alter_user_options_alter_user_is_active_and_more'),
+        ('attendance', '0018_rosterversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentSearchGram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gram', models.CharField(max_length=32)),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='accounts.branch')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_grams', to='attendance.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['branch', 'gram'], name='attendance__branch__d300f2_idx')],
+            },
+        ),
+        migrations.RunPython(index_existing_students, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_branch_alter_user_options_alter_user_is_active_and_more'),
+        ('attendance', '0019_studentsearchgram'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['branch', 'name', 'id'], name='attendance__branch__f7219e_idx'),
+        ),
+    ]
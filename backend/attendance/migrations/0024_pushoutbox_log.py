@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0023_tableversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pushoutbox',
+            name='log',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='outbox', to='attendance.notificationlog'),
+        ),
+        migrations.AddConstraint(
+            model_name='pushoutbox',
+            constraint=models.UniqueConstraint(fields=('log', 'subscription'), name='pushoutbox_unique_log_subscription'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+import re
+import unicodedata
+from django.db import migrations
+
+# Frozen copy of attendance.search's gram functions at the time of this migration:
+# names are case-folded and stripped of accents, and letters of every script are kept
+ROLL_PREFIX = 'r:'
+_diacritics = re.compile('[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]')
+
+
+def normalize(text):
+    text = _diacritics.sub('', unicodedata.normalize('NFKD', str(text).casefold()))
+    text = ''.join(char if unicodedata.category(char)[0] in 'LMN' else ' ' for char in text)
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+def word_trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def student_grams(name, roll_number):
+    grams = set()
+    for word in normalize(name).split():
+        grams |= word_trigrams(word)
+    roll = str(roll_number) if roll_number is not None else ''
+    grams |= {ROLL_PREFIX + roll[:i] for i in range(1, len(roll) + 1)}
+    return grams
+
+
+def reindex_students(apps, schema_editor):
+    """Names outside a-z (accents, Devanagari, Kannada) had no or wrong grams: rebuild them all."""
+    Student = apps.get_model('attendance', 'Student')
+    StudentSearchGram = apps.get_model('attendance', 'StudentSearchGram')
+    StudentSearchGram.objects.all().delete()
+    StudentSearchGram.objects.bulk_create(
+        (
+            StudentSearchGram(branch_id=branch_id, gram=gram, student_id=pk)
+            for pk, name, roll_number, branch_id in Student.objects.filter(branch__isnull=False)
+            .values_list('id', 'name', 'roll_number', 'branch_id').iterator()
+            for gram in student_grams(name, roll_number)
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0024_pushoutbox_log'),
+    ]
+
+    operations = [
+        migrations.RunPython(reindex_students, migrations.RunPython.noop),
+    ]
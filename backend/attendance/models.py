@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from accounts.models import User, Branch
 
 
@@ -34,10 +35,45 @@ class Student(models.Model):
     house = models.ForeignKey(Houses, on_delete=models.SET_NULL, null=True, blank=True, db_index=True)
     branch = models.ForeignKey(Branch, on_delete=models.CASCADE, null=True, blank=True, db_index=True)
     course = models.CharField(default='NA', max_length=100, null=True, blank=True)
+    parent_name = models.CharField(max_length=100, blank=True, default='')
+    parent_phone = models.CharField(max_length=15, blank=True, default='')  # 10-digit mobile, used for absentee SMS
     def __str__(self):
         return f"{self.name} ({self.roll_number})"
     class Meta:
         unique_together = ('roll_number', 'classroom', 'branch')  # Ensure unique roll number per classroom and branch
+        indexes = [models.Index(fields=['branch', 'name', 'id'])]  # Keyset pagination of branch listings
+
+class RosterVersion(models.Model):
+    """Change counter for the students of one (branch, classroom|house) roster.
+    Bumped on every Student write so cached rosters in all workers notice the change.
+    """
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE)
+    scope_type = models.CharField(max_length=20)   # 'class' | 'house'
+    scope_id = models.IntegerField()
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(null=True, blank=True)  # Last-Modified of the roster
+
+    class Meta:
+        unique_together = ('branch', 'scope_type', 'scope_id')
+
+class TableVersion(models.Model):
+    """Change counter for a whole reference table (classrooms, houses, exams).
+    Bumped on every write so list endpoints can answer conditional GETs from one row.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(null=True, blank=True)
+
+class StudentSearchGram(models.Model):
+    """Inverted index for student search: name trigrams and roll number prefixes.
+    Maintained on Student writes by attendance.search.
+    """
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE)
+    gram = models.CharField(max_length=32)
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='search_grams')
+
+    class Meta:
+        indexes = [models.Index(fields=['branch', 'gram'])]
 
 class AttendanceTypes(models.TextChoices):
     PRESENT = 'PRESENT', 'present'
@@ -48,43 +84,103 @@ class AttendanceTypes(models.TextChoices):
     NOT_MARKED = 'NOT_MARKED', 'not_marked'
 
 
+# Storage codes for attendance status strings. Lower-case values are what the
+# frontend posts, upper-case ones are the AttendanceTypes values. Append only:
+# the codes are persisted (see migration 0017).
+ATTENDANCE_STATUS_CODES = {
+    'NOT_MARKED': 0,
+    'present': 1,
+    'absent': 2,
+    'leave': 3,
+    'on_duty': 4,
+    'leave_sw': 5,
+    'leave-sw': 6,
+    'not_marked': 7,
+    'PRESENT': 8,
+    'ABSENT': 9,
+    'ON_DUTY': 10,
+    'LEAVE': 11,
+    'LEAVE_SW': 12,
+}
+ATTENDANCE_STATUS_BY_CODE = {code: value for value, code in ATTENDANCE_STATUS_CODES.items()}
+
+
+class AttendanceStatusField(models.Field):
+    """
+    Attendance status stored as a smallint code instead of a varchar.
+    Python code, ORM filters, values() and serializers keep working with the
+    status strings; only the column type changes.
+    """
+    description = "Attendance status stored as a small integer code"
+
+    def get_internal_type(self):
+        return 'PositiveSmallIntegerField'
+
+    def from_db_value(self, value, expression, connection):
+        return self.to_python(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, str):
+            return value
+        return ATTENDANCE_STATUS_BY_CODE[value]
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        if value is None or isinstance(value, int):
+            return value
+        try:
+            return ATTENDANCE_STATUS_CODES[str(value)]
+        except KeyError:
+            raise ValueError(f"Unknown attendance status {value!r}")
+
+
 class Attendance(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='student_attendance', db_index=True)
     date = models.DateField(db_index=True)
-    morning_attendance = models.CharField(
-        max_length=100,
+    morning_attendance = AttendanceStatusField(
         null=True,
         choices=AttendanceTypes.choices,
         default=AttendanceTypes.NOT_MARKED
     )
-    evening_class_attendance = models.CharField(
-        max_length=100,
+    evening_class_attendance = AttendanceStatusField(
         null=True,
         choices=AttendanceTypes.choices,
         default=AttendanceTypes.NOT_MARKED
     )
-    morning_pt_attendance = models.CharField(
-        max_length=100,
+    morning_pt_attendance = AttendanceStatusField(
         null=True,
         choices=AttendanceTypes.choices,
         default=AttendanceTypes.NOT_MARKED
     )
-    games_attendance = models.CharField(
-        max_length=100,
+    games_attendance = AttendanceStatusField(
         null=True,
         choices=AttendanceTypes.choices,
         default=AttendanceTypes.NOT_MARKED
     )
-    night_dorm_attendance = models.CharField(
-        max_length=100,
+    night_dorm_attendance = AttendanceStatusField(
         null=True,
         choices=AttendanceTypes.choices,
         default=AttendanceTypes.NOT_MARKED
     )
 
-class Meta:
-    unique_together = ('student', 'date')  # Prevent duplicate entries
-    
+    class Meta:
+        unique_together = ('student', 'date')  # Prevent duplicate entries, also the ON CONFLICT target for bulk upserts
+
+
+class AttendanceDailySummary(models.Model):
+    """Per-branch count of each status for each session on a day.
+    Kept up to date by attendance writes (see attendance.summary) so the dashboard
+    reads a handful of rows instead of aggregating every Attendance row.
+    """
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE)
+    date = models.DateField()
+    session = models.CharField(max_length=50)  # Attendance field name, e.g. morning_attendance
+    status = models.CharField(max_length=100)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('branch', 'date', 'session', 'status')
+
 
 class PushSubscription(models.Model):
     """Web Push subscription
@@ -117,3 +213,55 @@ class NotificationLog(models.Model):
 
     class Meta:
         unique_together = ('branch', 'date', 'session_key', 'scope_type', 'scope_id')
+
+
+class PushOutbox(models.Model):
+    """Durable queue of web pushes, delivered by the `push_worker` command.
+    """
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    DEAD = 'dead'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (SENT, 'Sent'), (FAILED, 'Failed'), (DEAD, 'Dead')]
+
+    subscription = models.ForeignKey(PushSubscription, on_delete=models.SET_NULL, null=True, blank=True, related_name='outbox')
+    # The notification this push announces; one push per subscription for it
+    log = models.ForeignKey(NotificationLog, on_delete=models.SET_NULL, null=True, blank=True, related_name='outbox')
+    title = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='pushoutbox_due_index'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['log', 'subscription'], name='pushoutbox_unique_log_subscription'),
+        ]
+
+
+class AbsenteeSmsLog(models.Model):
+    """One absentee SMS per student, day and session; also the claim used while sending.
+    """
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (SENT, 'Sent'), (FAILED, 'Failed')]
+
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    date = models.DateField()
+    session = models.CharField(max_length=50)  # Attendance field name, e.g. morning_attendance
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    claim = models.UUIDField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('student', 'date', 'session')
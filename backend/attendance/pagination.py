@@ -0,0 +1,120 @@
+import base64
+import json
+from django.db import connections
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class InvalidPageSize(ValueError):
+    pass
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def encode_cursor(sort_field, descending, value, last_id):
+    payload = json.dumps({'f': sort_field, 'd': descending, 'v': value, 'id': last_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort_field, descending):
+    """
+    Return (value, last_id) from an opaque cursor issued for the same sort. Cursors come
+    back from clients, so anything but a str/int/None value and an int id is rejected.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if payload['f'] != sort_field or payload['d'] != descending:
+            raise InvalidCursor("Cursor was issued for a different sort order")
+        value, last_id = payload['v'], payload['id']
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(str(e))
+    if not (value is None or isinstance(value, str) or _is_int(value)) or not _is_int(last_id):
+        raise InvalidCursor("Cursor position is malformed")
+    return value, last_id
+
+
+def page_size_param(request):
+    try:
+        size = int(request.query_params.get('page_size', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise InvalidPageSize("page_size must be an integer")
+    return min(max(size, 1), MAX_PAGE_SIZE)
+
+
+def wants_pagination(request):
+    return 'page_size' in request.query_params or 'cursor' in request.query_params
+
+
+def keyset_page(queryset, request, sort_field, descending, fields):
+    """
+    Fetch one page of `queryset` ordered by (sort_field, id) using a keyset
+    (WHERE (sort_field, id) > cursor) instead of OFFSET, so every page costs
+    the same no matter how deep it is.
+    Returns (rows, next_cursor); rows are dicts of `fields` (id and sort_field are
+    always fetched). next_cursor is None on the last page.
+    """
+    size = page_size_param(request)
+    cursor = request.query_params.get('cursor')
+    prefix = '-' if descending else ''
+    queryset = queryset.order_by(f'{prefix}{sort_field}', f'{prefix}id')
+
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort_field, descending)
+        op = 'lt' if descending else 'gt'
+        if sort_field == 'id':
+            queryset = queryset.filter(**{f'id__{op}': last_id})
+        elif value is None:
+            raise InvalidCursor("Cursor has no position for this sort")
+        else:
+            queryset = queryset.filter(
+                Q(**{f'{sort_field}__{op}': value}) | Q(**{sort_field: value, f'id__{op}': last_id})
+            )
+
+    extra = [f for f in ('id', sort_field) if f not in fields]
+    rows = list(queryset.values(*fields, *extra)[:size + 1])
+    next_cursor = None
+    if len(rows) > size:
+        rows = rows[:size]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort_field, descending, last[sort_field], last['id'])
+    for row in rows:
+        for field in extra:
+            row.pop(field)
+    return rows, next_cursor
+
+
+def total_param(request):
+    """?total=exact|estimate|none; paginated listings skip the count unless asked."""
+    return request.query_params.get('total', 'none')
+
+
+def estimate_count(queryset):
+    """Planner row estimate on PostgreSQL (no table scan); None where no estimate is available."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    # The driver decodes the json column unless it is registered as text
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def count_for(queryset, mode):
+    """Return (total, is_estimate) for the requested ?total= mode."""
+    if mode == 'exact':
+        return queryset.count(), False
+    if mode == 'estimate':
+        return estimate_count(queryset), True
+    return None, False
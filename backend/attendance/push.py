@@ -0,0 +1,244 @@
+import json
+import os
+import random
+import time
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor, wait
+import requests
+from requests.adapters import HTTPAdapter
+from pywebpush import webpush, WebPushException
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Value
+from django.utils import timezone
+from core.settings import logger
+from .models import Attendance, NotificationLog, PushOutbox, PushSubscription, Student
+from .roster import SCOPE_FIELDS
+
+# Concurrency and time limits for one fan-out, overridable from the environment
+PUSH_MAX_WORKERS = int(os.environ.get('PUSH_MAX_WORKERS', 16))
+PUSH_REQUEST_TIMEOUT = float(os.environ.get('PUSH_REQUEST_TIMEOUT', 5))
+PUSH_DEADLINE = float(os.environ.get('PUSH_DEADLINE', 20))
+# Push services answer these for subscriptions that will never work again
+DEAD_SUBSCRIPTION_STATUSES = {404, 410}
+# Outbox delivery: jobs claimed per round, attempts before giving up, retry backoff in seconds
+OUTBOX_BATCH_SIZE = int(os.environ.get('PUSH_OUTBOX_BATCH_SIZE', 100))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get('PUSH_OUTBOX_MAX_ATTEMPTS', 5))
+OUTBOX_BACKOFF_BASE = 30
+OUTBOX_BACKOFF_MAX = 3600
+# A claimed job becomes due again after this many seconds if its worker dies mid-send
+OUTBOX_LEASE = PUSH_DEADLINE + 40
+
+
+def vapid_settings():
+    vapid_private = os.environ.get('VAPID_PRIVATE_KEY', 'IrPD0MjfOewL70dJrICeQLY4h_JVdJPKwC-4SbM3vA8')
+    vapid_email = os.environ.get('VAPID_EMAIL', 'mailto:gautam@superadmin.com')
+    return vapid_private, vapid_email
+
+
+def branch_admin_subscriptions(branch_ids):
+    """Push subscriptions of the active admins of the given branches."""
+    return PushSubscription.objects.filter(branch_id__in=branch_ids, user__role='admin', user__is_active=True)
+
+
+def unmarked_scopes(day, field_name, session_key, scope_types=('class', 'house'), scope_id=None):
+    """
+    Return (branch_id, scope_type, scope_id, unmarked_count) for every branch/class and
+    branch/house that still has unmarked students for `day` and has not been notified
+    for this session yet. A student is unmarked when their row for the day is NOT_MARKED
+    or missing. Runs as a single grouped query however many scopes and branches exist.
+    """
+    marked = Attendance.objects.filter(student_id=OuterRef('pk'), date=day).exclude(**{field_name: 'NOT_MARKED'})
+    unmarked = Student.objects.filter(branch_id__isnull=False).filter(~Exists(marked))
+
+    parts = []
+    for scope_type in scope_types:
+        scope_field = SCOPE_FIELDS[scope_type]
+        already_notified = NotificationLog.objects.filter(
+            branch_id=OuterRef('branch_id'), date=day, session_key=session_key,
+            scope_type=scope_type, scope_id=OuterRef(scope_field),
+        )
+        qs = unmarked.filter(**{f'{scope_field}__isnull': False}).filter(~Exists(already_notified))
+        if scope_id is not None:
+            qs = qs.filter(**{scope_field: scope_id})
+        parts.append(
+            qs.values('branch_id', scope_type=Value(scope_type), scope_id=F(scope_field))
+            .annotate(unmarked_count=Count('id'))
+            .order_by()
+        )
+    if not parts:
+        return []
+    grouped = parts[0].union(*parts[1:], all=True) if len(parts) > 1 else parts[0]
+    rows = [(row['branch_id'], row['scope_type'], row['scope_id'], row['unmarked_count']) for row in grouped]
+    return sorted(rows, key=lambda row: (row[1], row[2], row[0]))
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class PushReport:
+    """Outcome of one fan-out: counts plus per-request latency percentiles in ms."""
+
+    def __init__(self):
+        self.sent = 0
+        self.failed = 0
+        self.pruned = 0
+        self.timed_out = 0
+        self.latencies = []
+        self.dead_endpoints = []
+        # Per message, in input order: (ok, status_code, error), or None when it did not finish
+        self.results = []
+
+    def as_dict(self):
+        latencies = sorted(self.latencies)
+        return {
+            'sent': self.sent,
+            'failed': self.failed,
+            'timed_out': self.timed_out,
+            'pruned': self.pruned,
+            'latency_ms': {
+                'p50': percentile(latencies, 50),
+                'p95': percentile(latencies, 95),
+                'p99': percentile(latencies, 99),
+                'max': latencies[-1] if latencies else None,
+            },
+        }
+
+
+def _deliver(session, subscription_info, payload, vapid_private, vapid_email, timeout):
+    """Send one push; returns (ok, status_code, error, latency_ms)."""
+    start = time.perf_counter()
+    try:
+        webpush(
+            subscription_info=subscription_info, data=payload,
+            vapid_private_key=vapid_private, vapid_claims={"sub": vapid_email},
+            timeout=timeout, requests_session=session,
+        )
+        return True, None, '', (time.perf_counter() - start) * 1000
+    except WebPushException as e:
+        status_code = e.response.status_code if e.response is not None else None
+        logger.warning("Push send failed for %s: %s", subscription_info['endpoint'], str(e))
+        return False, status_code, str(e), (time.perf_counter() - start) * 1000
+    except Exception as e:
+        # Timeouts, connection errors or a malformed subscription must not abort the fan-out
+        logger.warning("Push send failed for %s: %s", subscription_info['endpoint'], str(e))
+        return False, None, str(e), (time.perf_counter() - start) * 1000
+
+
+def fan_out(messages, max_workers=PUSH_MAX_WORKERS, timeout=PUSH_REQUEST_TIMEOUT, deadline=PUSH_DEADLINE):
+    """
+    Deliver (subscription_info, title, body) messages through a bounded thread pool.
+    Each request has its own timeout and the whole fan-out a total deadline; sends
+    still pending at the deadline are cancelled and counted as timed out.
+    Subscriptions answered with 404/410 are deleted.
+    """
+    report = PushReport()
+    report.results = [None] * len(messages)
+    if not messages:
+        return report
+    vapid_private, vapid_email = vapid_settings()
+    if not vapid_private:
+        logger.warning("VAPID_PRIVATE_KEY not set; skipping push send")
+        return report
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    pool = ThreadPoolExecutor(max_workers=min(max_workers, len(messages)))
+    try:
+        futures = {
+            pool.submit(
+                _deliver, session, info, json.dumps({"title": title, "body": body}),
+                vapid_private, vapid_email, timeout,
+            ): (index, info['endpoint'])
+            for index, (info, title, body) in enumerate(messages)
+        }
+        done, pending = wait(futures, timeout=deadline)
+        for future in pending:
+            future.cancel()
+            report.timed_out += 1
+        for future in done:
+            index, endpoint = futures[future]
+            ok, status_code, error, latency = future.result()
+            report.results[index] = (ok, status_code, error)
+            report.latencies.append(round(latency, 1))
+            if ok:
+                report.sent += 1
+            else:
+                report.failed += 1
+                if status_code in DEAD_SUBSCRIPTION_STATUSES:
+                    report.dead_endpoints.append(endpoint)
+    finally:
+        # Do not block the request on sends that overran the deadline
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    if report.dead_endpoints:
+        report.pruned, _ = PushSubscription.objects.filter(endpoint__in=report.dead_endpoints).delete()
+    logger.info("Push fan-out: %s", report.as_dict())
+    return report
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter, in seconds, after the given number of attempts."""
+    delay = min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE * 2 ** max(attempts - 1, 0))
+    return delay * random.uniform(0.9, 1.1)
+
+
+def claim_jobs(batch_size=OUTBOX_BATCH_SIZE, lease=OUTBOX_LEASE):
+    """
+    Claim up to `batch_size` due outbox jobs. Rows are locked with FOR UPDATE SKIP LOCKED,
+    so concurrent workers never pick the same job, and leased by pushing next_attempt_at
+    forward; the lock is released before any network call is made.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            PushOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status=PushOutbox.PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+        PushOutbox.objects.filter(id__in=ids).update(
+            attempts=F('attempts') + 1, next_attempt_at=now + timedelta(seconds=lease), updated_at=now,
+        )
+    return list(PushOutbox.objects.filter(id__in=ids).select_related('subscription').order_by('id'))
+
+
+def deliver_jobs(jobs, max_attempts=OUTBOX_MAX_ATTEMPTS, **fan_out_options):
+    """Send claimed jobs and record the outcome: sent, retry later, failed or dead."""
+    sendable = [job for job in jobs if job.subscription is not None]
+    report = fan_out(
+        [(job.subscription.as_webpush_dict(), job.title, job.body) for job in sendable], **fan_out_options
+    )
+    now = timezone.now()
+    for job in jobs:
+        job.updated_at = now
+        if job.subscription is None:
+            job.status, job.last_error = PushOutbox.DEAD, 'Subscription removed'
+    for job, result in zip(sendable, report.results):
+        ok, status_code, error = result or (False, None, 'Deadline exceeded')
+        if ok:
+            job.status, job.last_error = PushOutbox.SENT, ''
+        elif status_code in DEAD_SUBSCRIPTION_STATUSES:
+            job.status, job.last_error = PushOutbox.DEAD, error
+        elif job.attempts >= max_attempts:
+            job.status, job.last_error = PushOutbox.FAILED, error
+        else:
+            job.last_error = error
+            job.next_attempt_at = now + timedelta(seconds=retry_delay(job.attempts))
+    PushOutbox.objects.bulk_update(jobs, ['status', 'last_error', 'next_attempt_at', 'updated_at'])
+    return report
+
+
+def purge_outbox(retention_days):
+    """Delete finished jobs older than `retention_days`."""
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    deleted, _ = PushOutbox.objects.exclude(status=PushOutbox.PENDING).filter(updated_at__lt=cutoff).delete()
+    return deleted
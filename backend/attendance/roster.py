@@ -0,0 +1,133 @@
+import threading
+from collections import OrderedDict
+from functools import reduce
+from operator import or_
+from asgiref.sync import sync_to_async
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import Student, RosterVersion
+
+# Fields cached per student, in tuple order: every Student field the rosters serve
+ROSTER_FIELDS = ('id', 'name', 'roll_number', 'course', 'classroom_id', 'house_id', 'parent_name', 'parent_phone')
+SCOPE_FIELDS = {'class': 'classroom_id', 'house': 'house_id'}
+
+
+def student_scopes(branch_id, classroom_id, house_id):
+    """Roster scopes a student with these attributes belongs to."""
+    if branch_id is None:
+        return set()
+    scopes = set()
+    if classroom_id is not None:
+        scopes.add((branch_id, 'class', classroom_id))
+    if house_id is not None:
+        scopes.add((branch_id, 'house', house_id))
+    return scopes
+
+
+def bump_roster_versions(scopes):
+    """Invalidate cached rosters for the given (branch_id, scope_type, scope_id) scopes in every worker."""
+    scopes = set(scopes)
+    if not scopes:
+        return
+    RosterVersion.objects.bulk_create(
+        [RosterVersion(branch_id=b, scope_type=t, scope_id=i) for b, t, i in scopes],
+        ignore_conflicts=True,
+    )
+    match = reduce(or_, (Q(branch_id=b, scope_type=t, scope_id=i) for b, t, i in scopes))
+    RosterVersion.objects.filter(match).update(version=F('version') + 1, updated_at=timezone.now())
+
+
+class RosterCache:
+    """
+    Per-process LRU of student rosters keyed by (branch, scope_type, scope_id).
+    Each lookup reads the scope's RosterVersion (one indexed row) and reuses the
+    cached tuples only if the version is unchanged, so workers stay coherent
+    without a shared cache server.
+    """
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, branch_id, scope_type, scope_id, version=None):
+        """
+        Return the roster as a list of ROSTER_FIELDS tuples, ordered by roll number and name.
+        Pass the scope's `version` when already read (see roster_state) to skip re-reading it.
+        """
+        scope_id = int(scope_id)
+        if branch_id is None:
+            # Students without a branch have no RosterVersion to validate against
+            with self._lock:
+                self.misses += 1
+            return self._load(branch_id, scope_type, scope_id)
+
+        key = (branch_id, scope_type, scope_id)
+        if version is None:
+            version = self._version_query(key).first() or 0
+        rows = self._cached(key, version)
+        return rows if rows is not None else self._fill(key, version)
+
+    async def aget(self, branch_id, scope_type, scope_id):
+        """get() for async views: the version is read with the async ORM and only a miss loads in a thread."""
+        scope_id = int(scope_id)
+        if branch_id is None:
+            return await sync_to_async(self.get)(branch_id, scope_type, scope_id)
+        key = (branch_id, scope_type, scope_id)
+        version = await self._version_query(key).afirst() or 0
+        rows = self._cached(key, version)
+        return rows if rows is not None else await sync_to_async(self._fill)(key, version)
+
+    @staticmethod
+    def _version_query(key):
+        branch_id, scope_type, scope_id = key
+        return RosterVersion.objects.filter(
+            branch_id=branch_id, scope_type=scope_type, scope_id=scope_id
+        ).values_list('version', flat=True)
+
+    def _cached(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def _fill(self, key, version):
+        rows = self._load(*key)
+        with self._lock:
+            self._entries[key] = (version, rows)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return rows
+
+    @staticmethod
+    def _load(branch_id, scope_type, scope_id):
+        return list(
+            Student.objects.filter(branch_id=branch_id, **{SCOPE_FIELDS[scope_type]: scope_id})
+            .order_by('roll_number', 'name', 'id')
+            .values_list(*ROSTER_FIELDS)
+        )
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+                'entries': len(self._entries),
+                'maxsize': self.maxsize,
+            }
+
+
+roster_cache = RosterCache()
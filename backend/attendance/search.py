@@ -0,0 +1,173 @@
+import math
+import re
+import unicodedata
+from django.db import transaction
+from django.db.models import Case, Count, IntegerField, Value, When
+from .models import Student, StudentSearchGram
+
+ROLL_PREFIX = 'r:'
+# Ranked candidates fetched from the index before scoring in Python
+CANDIDATE_LIMIT = 200
+# What normalize() turns into spaces, for SQL regexes. Vowel signs of the Indic scripts
+# are marks, not \w, but belong to the word
+_NON_WORD = '[^\\w\u0900-\u0dff]'
+# Share of query trigrams a name must contain to count as a typo-tolerant match
+FUZZY_MIN_SIMILARITY = 0.5
+
+# Accents: the combining diacritics that NFKD splits off Latin, Greek and Cyrillic letters
+_diacritics = re.compile('[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]')
+
+
+def _accented_letters():
+    """Base letter -> its accented forms in the Latin blocks, for accent-blind SQL regexes."""
+    forms = {}
+    for code in range(0xC0, 0x250):
+        char = chr(code)
+        base = _diacritics.sub('', unicodedata.normalize('NFKD', char)).casefold()
+        if len(base) == 1 and base.isascii() and base.isalpha():
+            forms[base] = forms.get(base, '') + char
+    return forms
+
+
+_ACCENTED = _accented_letters()
+
+
+def normalize(text):
+    """
+    Case-fold, strip accents and collapse everything except letters, marks and digits
+    (of any script) into single spaces.
+    """
+    text = _diacritics.sub('', unicodedata.normalize('NFKD', str(text).casefold()))
+    text = ''.join(char if unicodedata.category(char)[0] in 'LMN' else ' ' for char in text)
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+def word_trigrams(word, pad_end=True):
+    """Trigrams of one word padded like pg_trgm: two spaces in front, one behind."""
+    padded = f"  {word} " if pad_end else f"  {word}"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def student_grams(name, roll_number):
+    """All index grams for a student: name trigrams plus every prefix of the roll number."""
+    grams = set()
+    for word in normalize(name).split():
+        grams |= word_trigrams(word)
+    roll = str(roll_number) if roll_number is not None else ''
+    grams |= {ROLL_PREFIX + roll[:i] for i in range(1, len(roll) + 1)}
+    return grams
+
+
+def index_students(students):
+    """(Re)build the search grams of the given Student instances."""
+    students = [s for s in students if s.pk is not None]
+    if not students:
+        return
+    with transaction.atomic():
+        StudentSearchGram.objects.filter(student_id__in=[s.pk for s in students]).delete()
+        StudentSearchGram.objects.bulk_create(
+            [
+                StudentSearchGram(branch_id=s.branch_id, gram=gram, student_id=s.pk)
+                for s in students if s.branch_id is not None
+                for gram in student_grams(s.name, s.roll_number)
+            ],
+            batch_size=1000,
+        )
+
+
+def _rank(query, name, roll_number, student_id, hits, gram_count):
+    """Higher is better: exact > prefix > word prefix > substring > trigram similarity (below 1)."""
+    name = normalize(name)
+    roll = str(roll_number)
+    if query == roll or query == str(student_id) or query == name:
+        return 5.0
+    if roll.startswith(query) or name.startswith(query):
+        return 4.0
+    if any(word.startswith(query) for word in name.split()):
+        return 3.0
+    if query in name:
+        return 2.0
+    return hits / gram_count if gram_count else 0.0
+
+
+def _accent_blind(word):
+    """Regex for a normalized word that also matches the accented spellings in the stored name."""
+    return ''.join(f'[{char}{_ACCENTED[char]}]' if char in _ACCENTED else char for char in word)
+
+
+def _name_match(words):
+    """
+    SQL version of _rank's name tiers for the student of a gram row, so the candidate
+    limit keeps the best names: 5 exact, 4 prefix, 3 word prefix, 2 substring, else 0.
+    """
+    # normalize() leaves only letters, marks and digits, none of them special in a regex
+    phrase = f'{_NON_WORD}+'.join(_accent_blind(word) for word in words)
+    return Case(
+        When(student__name__iregex=f'^{_NON_WORD}*{phrase}{_NON_WORD}*$', then=Value(5)),
+        When(student__name__iregex=f'^{_NON_WORD}*{phrase}', then=Value(4)),
+        When(student__name__iregex=f'(^|{_NON_WORD}){phrase}', then=Value(3)),
+        When(student__name__iregex=phrase, then=Value(2)),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def search_students(branch_id, query, limit=20, fuzzy=False):
+    """
+    Return up to `limit` student ids of a branch ranked by relevance to `query`.
+    Names match by word prefix, or by substring once the query has 3+ characters,
+    in any script and regardless of case and accents. Roll numbers match exactly or
+    by prefix, student ids exactly: an id substring would need a scan of the branch,
+    and the ids users see and type are whole ones. With fuzzy=True, names that
+    share most of their trigrams with the query also match (typos). Only index
+    postings for the query's grams are read, so the cost does not grow with the
+    size of the branch.
+    """
+    query = normalize(query)
+    if not query or branch_id is None:
+        return []
+    numeric = query.replace(' ', '') if query.replace(' ', '').isdigit() else None
+
+    words = query.split()
+    # Front-padded only: the last query word may be an unfinished prefix
+    query_grams = set()
+    for idx, word in enumerate(words):
+        query_grams |= word_trigrams(word, pad_end=idx < len(words) - 1)
+    if fuzzy:
+        required = query_grams
+        min_hits = max(1, math.ceil(len(required) * FUZZY_MIN_SIMILARITY))
+    else:
+        # Unpadded grams must all be present for a substring match; short queries fall back to word
+        # prefixes. Words after the first must also start a word in the name.
+        required = {gram for gram in query_grams if ' ' not in gram}
+        for word in words[1:]:
+            required |= word_trigrams(word, pad_end=False)
+        required = required or query_grams
+        min_hits = len(required)
+
+    grams = StudentSearchGram.objects.filter(branch_id=branch_id)
+    # Every non-fuzzy candidate has all the required grams: the name tier decides which are kept
+    hit_counts = dict(
+        grams.filter(gram__in=required)
+        .values('student_id').annotate(hits=Count('gram', distinct=True), match=_name_match(words))
+        .filter(hits__gte=min_hits).order_by('-match', '-hits', 'student_id')
+        .values_list('student_id', 'hits')[:CANDIDATE_LIMIT]
+    )
+    if numeric:
+        roll_ids = grams.filter(gram=ROLL_PREFIX + numeric).values_list('student_id', flat=True)[:CANDIDATE_LIMIT]
+        exact_ids = Student.objects.filter(branch_id=branch_id, id=int(numeric)).values_list('id', flat=True)
+        for student_id in [*roll_ids, *exact_ids]:
+            hit_counts.setdefault(student_id, 0)
+    if not hit_counts:
+        return []
+
+    ranked = []
+    candidates = Student.objects.filter(id__in=list(hit_counts)).values_list('id', 'name', 'roll_number')
+    for student_id, name, roll_number in candidates:
+        score = _rank(numeric or query, name, roll_number, student_id, hit_counts[student_id], len(required))
+        # Without fuzzy matching, trigram overlap alone is not a match
+        if not fuzzy and score < 2.0:
+            continue
+        ranked.append((-score, normalize(name), student_id))
+    ranked.sort()
+    return [student_id for _, _, student_id in ranked[:limit]]
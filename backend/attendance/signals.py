@@ -0,0 +1,63 @@
+from django.db.models.signals import post_init, post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from .conditional import bump_table_versions
+from .models import Classroom, Houses, RosterVersion, Student
+from .roster import student_scopes, bump_roster_versions
+from .search import index_students
+from .summary import move_student_counts
+
+
+@receiver(post_init, sender=Student)
+def remember_roster_scopes(sender, instance, **kwargs):
+    # Scopes as loaded, so a save that moves the student invalidates the old rosters too.
+    # Read __dict__ directly so deferred fields are not fetched here.
+    values = instance.__dict__
+    instance._loaded_roster_scopes = student_scopes(
+        values.get('branch_id'), values.get('classroom_id'), values.get('house_id')
+    )
+    instance._loaded_search_key = (values.get('name'), values.get('roll_number'), values.get('branch_id'))
+
+
+@receiver(post_save, sender=Student)
+def student_saved(sender, instance, **kwargs):
+    current = student_scopes(instance.branch_id, instance.classroom_id, instance.house_id)
+    bump_roster_versions(current | getattr(instance, '_loaded_roster_scopes', set()))
+    instance._loaded_roster_scopes = current
+
+    search_key = (instance.name, instance.roll_number, instance.branch_id)
+    loaded_key = getattr(instance, '_loaded_search_key', None)
+    if kwargs.get('created') or search_key != loaded_key:
+        index_students([instance])
+    # A branch move takes the student's attendance out of one branch's summary into the other's
+    if not kwargs.get('created') and loaded_key is not None and loaded_key[2] != instance.branch_id:
+        move_student_counts(instance.pk, loaded_key[2], instance.branch_id)
+    instance._loaded_search_key = search_key
+
+
+@receiver(pre_delete, sender=Student)
+def student_deleting(sender, instance, **kwargs):
+    # Runs inside the delete's transaction, before its Attendance rows cascade away
+    if instance.branch_id is not None:
+        move_student_counts(instance.pk, instance.branch_id, None)
+
+
+@receiver(post_delete, sender=Student)
+def student_deleted(sender, instance, **kwargs):
+    bump_roster_versions(student_scopes(instance.branch_id, instance.classroom_id, instance.house_id))
+
+
+@receiver(post_save, sender=Classroom)
+@receiver(post_delete, sender=Classroom)
+def classroom_changed(sender, **kwargs):
+    bump_table_versions(['classrooms'])
+
+
+@receiver(post_save, sender=Houses)
+@receiver(post_delete, sender=Houses)
+def house_changed(sender, instance, signal, **kwargs):
+    bump_table_versions(['houses'])
+    if signal is post_delete:
+        # Deleting a house nulls Student.house with a bulk UPDATE that sends no signals
+        bump_roster_versions(RosterVersion.objects.filter(
+            scope_type='house', scope_id=instance.id,
+        ).values_list('branch_id', 'scope_type', 'scope_id'))
@@ -0,0 +1,217 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+import requests
+from requests.adapters import HTTPAdapter
+from core.settings import logger
+from .models import AbsenteeSmsLog, Attendance
+
+# Stored statuses that mean the student was absent for the session
+ABSENT_STATUSES = ('absent', 'ABSENT')
+
+SMS_TRANSPORT = os.environ.get('SMS_TRANSPORT', 'attendance.sms.Msg91Transport')
+SMS_BATCH_SIZE = int(os.environ.get('SMS_BATCH_SIZE', 100))
+SMS_MAX_WORKERS = int(os.environ.get('SMS_MAX_WORKERS', 4))
+SMS_REQUEST_TIMEOUT = float(os.environ.get('SMS_REQUEST_TIMEOUT', 10))
+SMS_MAX_RETRIES = int(os.environ.get('SMS_MAX_RETRIES', 3))
+# Failed messages are picked up again by later runs of the same day up to this many times
+SMS_MAX_ATTEMPTS = int(os.environ.get('SMS_MAX_ATTEMPTS', 3))
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+# Claims of a run that died mid-send are released after this long
+CLAIM_TIMEOUT = timedelta(minutes=15)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class SmsError(Exception):
+    def __init__(self, message, retryable=False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def sms_session():
+    """Process-wide keep-alive session sized for SMS_MAX_WORKERS concurrent batches."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=SMS_MAX_WORKERS, pool_maxsize=SMS_MAX_WORKERS)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+        return _session
+
+
+class SmsTransport:
+    """Sends batches of recipients. Subclasses implement send_batch; select one with SMS_TRANSPORT."""
+    batch_size = SMS_BATCH_SIZE
+
+    def send_batch(self, session, recipients):
+        """Deliver one batch or raise SmsError(retryable=...); returns the provider response."""
+        raise NotImplementedError
+
+
+class Msg91Transport(SmsTransport):
+    """MSG91 flow API: one request carries a whole batch of recipients with their template variables."""
+
+    def __init__(self, url=None, auth_key=None, flow_id=None, sender=None, timeout=SMS_REQUEST_TIMEOUT):
+        self.url = url or os.environ.get('MSG91_URL', 'https://control.msg91.com/api/v5/flow/')
+        self.auth_key = auth_key or os.environ.get('MSG91_AUTH_KEY', '')
+        self.flow_id = flow_id or os.environ.get('MSG91_FLOW_ID', '')
+        self.sender = sender or os.environ.get('MSG91_SENDER', 'SCHOOL')
+        self.timeout = timeout
+
+    def send_batch(self, session, recipients):
+        if not self.auth_key or not self.flow_id:
+            raise SmsError("MSG91_AUTH_KEY / MSG91_FLOW_ID not set")
+        payload = {"flow_id": self.flow_id, "sender": self.sender, "recipients": recipients}
+        headers = {"authkey": self.auth_key, "Content-Type": "application/json"}
+        try:
+            response = session.post(self.url, json=payload, headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise SmsError(str(e), retryable=True)
+        if response.status_code in RETRYABLE_STATUSES:
+            raise SmsError(f"MSG91 returned {response.status_code}", retryable=True)
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        if response.status_code >= 400 or body.get('type') == 'error':
+            raise SmsError(f"MSG91 rejected batch ({response.status_code}): {body.get('message', response.text[:200])}")
+        return body
+
+
+def get_transport():
+    return import_string(SMS_TRANSPORT)()
+
+
+def absent_sms_recipient(to_number, parent_name, student_name, roll_number, date, school_name):
+    """Template variables of one absentee message, as MSG91 expects them per recipient."""
+    return {
+        "mobiles": f"91{to_number}",
+        "parent_name": parent_name,
+        "student_name": student_name,
+        "roll_number": roll_number,
+        "date": date,
+        "school_name": school_name,
+    }
+
+
+def send_with_retries(transport, session, recipients, max_retries=SMS_MAX_RETRIES):
+    """Send one batch, retrying transient failures with exponential backoff."""
+    for attempt in range(max_retries + 1):
+        try:
+            return transport.send_batch(session, recipients)
+        except SmsError as e:
+            if not e.retryable or attempt == max_retries:
+                raise
+            time.sleep(0.5 * 2 ** attempt)
+
+
+class SmsReport:
+    def __init__(self):
+        self.sent = 0
+        self.failed = 0
+        self.batches = 0
+        self.elapsed = 0.0
+
+    def as_dict(self):
+        return {
+            'sent': self.sent,
+            'failed': self.failed,
+            'batches': self.batches,
+            'elapsed_s': round(self.elapsed, 3),
+            'per_second': round(self.sent / self.elapsed, 1) if self.elapsed else None,
+        }
+
+
+def claim_absentees(day, session, branch_id=None, max_attempts=SMS_MAX_ATTEMPTS):
+    """
+    Claim the absentees of one day and session that have not been texted yet.
+    New students get a log row tagged with this run's claim id (the unique key makes
+    concurrent runs skip each other's rows); failed rows under the attempt limit and
+    abandoned claims are re-claimed. Returns the claimed logs with their students.
+    """
+    claim = uuid.uuid4()
+    absent = Attendance.objects.filter(date=day, **{f'{session}__in': ABSENT_STATUSES}).exclude(student__parent_phone='')
+    if branch_id is not None:
+        absent = absent.filter(student__branch_id=branch_id)
+    already_logged = AbsenteeSmsLog.objects.filter(student_id=OuterRef('student_id'), date=day, session=session)
+    student_ids = list(absent.filter(~Exists(already_logged)).values_list('student_id', flat=True))
+
+    AbsenteeSmsLog.objects.bulk_create(
+        [AbsenteeSmsLog(student_id=student_id, date=day, session=session, claim=claim) for student_id in student_ids],
+        ignore_conflicts=True,
+        batch_size=1000,
+    )
+    now = timezone.now()
+    retry = AbsenteeSmsLog.objects.filter(date=day, session=session, attempts__lt=max_attempts).filter(
+        Q(status=AbsenteeSmsLog.FAILED) | Q(status=AbsenteeSmsLog.PENDING, updated_at__lt=now - CLAIM_TIMEOUT)
+    )
+    if branch_id is not None:
+        retry = retry.filter(student__branch_id=branch_id)
+    retry.update(claim=claim, status=AbsenteeSmsLog.PENDING, updated_at=now)
+    return list(
+        AbsenteeSmsLog.objects.filter(claim=claim, status=AbsenteeSmsLog.PENDING)
+        .select_related('student__branch').order_by('id')
+    )
+
+
+def notify_absentees(day, session, branch_id=None, transport=None, max_workers=SMS_MAX_WORKERS):
+    """
+    Text the parents of every student marked absent for `session` on `day`, once per
+    student, day and session. Messages go out in transport-sized batches over a pooled
+    keep-alive session, at most `max_workers` batches at a time.
+    """
+    report = SmsReport()
+    logs = claim_absentees(day, session, branch_id)
+    if not logs:
+        return report
+    transport = transport or get_transport()
+    session_http = sms_session()
+    batch_size = transport.batch_size
+    batches = [logs[i:i + batch_size] for i in range(0, len(logs), batch_size)]
+
+    def send(batch):
+        recipients = [
+            absent_sms_recipient(
+                log.student.parent_phone, log.student.parent_name, log.student.name, log.student.roll_number,
+                day.strftime('%d-%m-%Y'), log.student.branch.name if log.student.branch else '',
+            )
+            for log in batch
+        ]
+        try:
+            send_with_retries(transport, session_http, recipients)
+            return batch, ''
+        except SmsError as e:
+            logger.warning("Absentee SMS batch of %d failed: %s", len(batch), str(e))
+            return batch, str(e)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as pool:
+        results = list(pool.map(send, batches))
+    report.elapsed = time.perf_counter() - start
+    report.batches = len(batches)
+
+    now = timezone.now()
+    sent_ids = []
+    for batch, error in results:
+        if error:
+            report.failed += len(batch)
+            AbsenteeSmsLog.objects.filter(id__in=[log.id for log in batch]).update(
+                status=AbsenteeSmsLog.FAILED, attempts=F('attempts') + 1, last_error=error, updated_at=now,
+            )
+        else:
+            report.sent += len(batch)
+            sent_ids.extend(log.id for log in batch)
+    AbsenteeSmsLog.objects.filter(id__in=sent_ids).update(
+        status=AbsenteeSmsLog.SENT, attempts=F('attempts') + 1, last_error='', updated_at=now,
+    )
+    logger.info("Absentee SMS for %s %s: %s", day, session, report.as_dict())
+    return report
@@ -0,0 +1,212 @@
+from collections import Counter
+from django.db import transaction
+from django.db.models import Count
+from accounts.models import Branch
+from .models import Attendance, AttendanceDailySummary
+from .utils import upsert_attendance_session
+
+# Session columns on Attendance, in dashboard order
+ATTENDANCE_FIELDS = [
+    'morning_attendance',
+    'evening_class_attendance',
+    'morning_pt_attendance',
+    'games_attendance',
+    'night_dorm_attendance',
+]
+
+
+def compute_summary(date_from, date_to, branch_id=None, fields=ATTENDANCE_FIELDS):
+    """
+    Count Attendance rows per (branch, date, session, status) straight from the raw table.
+    Runs one GROUP BY query per session field.
+    """
+    attendance_qs = Attendance.objects.filter(date__range=(date_from, date_to), student__branch_id__isnull=False)
+    if branch_id is not None:
+        attendance_qs = attendance_qs.filter(student__branch_id=branch_id)
+
+    counts = {}
+    for field in fields:
+        grouped = attendance_qs.values('student__branch_id', 'date', field).annotate(n=Count('id')).order_by()
+        for row in grouped:
+            if row[field] is None:
+                continue
+            counts[(row['student__branch_id'], row['date'], field, row[field])] = row['n']
+    return counts
+
+
+def stored_summary(date_from, date_to, branch_id=None, fields=ATTENDANCE_FIELDS):
+    """Return the summary table contents as {(branch, date, session, status): (row id, count)}."""
+    summary_qs = AttendanceDailySummary.objects.filter(date__range=(date_from, date_to), session__in=fields)
+    if branch_id is not None:
+        summary_qs = summary_qs.filter(branch_id=branch_id)
+    return {
+        (branch, day, session, status_value): (pk, count)
+        for pk, branch, day, session, status_value, count in summary_qs.values_list(
+            'id', 'branch_id', 'date', 'session', 'status', 'count'
+        )
+    }
+
+
+def lock_branches(branch_ids=None):
+    """
+    Row-lock the given branches (all of them for None) in id order, until the end of the
+    transaction. Every summary writer holds its branches' locks while it reads and
+    writes, so no two of them work from the same stale snapshot. The locks are
+    FOR NO KEY UPDATE, so rows that reference a branch can still be written meanwhile.
+    """
+    branches = Branch.objects.select_for_update(no_key=True).order_by('id')
+    if branch_ids is not None:
+        branches = branches.filter(id__in=branch_ids)
+    list(branches.values_list('id', flat=True))
+
+
+def refresh_summary(date_from, date_to, branch_id=None, fields=ATTENDANCE_FIELDS):
+    """
+    Recompute the summary for a date range (optionally one branch / some sessions).
+    Counts are computed and written under the branch locks, so marks saved meanwhile
+    are neither lost nor counted twice; keys that no longer occur are removed.
+    Returns (upserted, deleted).
+    """
+    with transaction.atomic():
+        lock_branches(None if branch_id is None else [branch_id])
+        counts = compute_summary(date_from, date_to, branch_id, fields)
+        stale_ids = [
+            pk for key, (pk, _) in stored_summary(date_from, date_to, branch_id, fields).items()
+            if key not in counts
+        ]
+        if stale_ids:
+            AttendanceDailySummary.objects.filter(id__in=stale_ids).delete()
+        if counts:
+            AttendanceDailySummary.objects.bulk_create(
+                [
+                    AttendanceDailySummary(branch_id=branch, date=day, session=session, status=status_value, count=n)
+                    for (branch, day, session, status_value), n in counts.items()
+                ],
+                update_conflicts=True,
+                unique_fields=['branch', 'date', 'session', 'status'],
+                update_fields=['count'],
+                batch_size=1000,
+            )
+    return len(counts), len(stale_ids)
+
+
+def apply_deltas(deltas):
+    """
+    Add {(branch, date, session, status): n} to the summary. Call inside a transaction
+    holding the branches' locks (lock_branches). Keys that drop to zero keep a zero row.
+    """
+    deltas = {key: n for key, n in deltas.items() if n}
+    if not deltas:
+        return
+    current = {
+        (branch, day, session, status_value): count
+        for branch, day, session, status_value, count in AttendanceDailySummary.objects.filter(
+            branch_id__in={key[0] for key in deltas}, date__in={key[1] for key in deltas},
+        ).values_list('branch_id', 'date', 'session', 'status', 'count')
+    }
+    AttendanceDailySummary.objects.bulk_create(
+        [
+            AttendanceDailySummary(
+                branch_id=branch, date=day, session=session, status=status_value,
+                count=max(current.get((branch, day, session, status_value), 0) + n, 0),
+            )
+            for (branch, day, session, status_value), n in deltas.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['branch', 'date', 'session', 'status'],
+        update_fields=['count'],
+    )
+
+
+def record_marks(field_name, marks, student_branches):
+    """
+    Write-path hook: upsert one session's marks ({(student_id, date): status}, see
+    upsert_attendance_session) and apply their effect to the summary in one transaction.
+    A new row also counts the default status of the other sessions; an existing row
+    moves one count from its previous status to the new one.
+    """
+    default = Attendance._meta.get_field(field_name).get_default()
+    index = ATTENDANCE_FIELDS.index(field_name)
+    with transaction.atomic():
+        lock_branches({student_branches[pk] for pk, _ in marks} - {None})
+        previous = {
+            (student_id, day): values
+            for student_id, day, *values in Attendance.objects.filter(
+                student_id__in={pk for pk, _ in marks}, date__in={day for _, day in marks},
+            ).values_list('student_id', 'date', *ATTENDANCE_FIELDS)
+        }
+        upsert_attendance_session(field_name, marks)
+
+        deltas = Counter()
+        for (pk, day), status_value in marks.items():
+            branch_id = student_branches[pk]
+            if branch_id is None:
+                continue
+            values = previous.get((pk, day))
+            if values is None:
+                for field in ATTENDANCE_FIELDS:
+                    deltas[(branch_id, day, field, status_value if field == field_name else default)] += 1
+            elif values[index] != status_value:
+                if values[index] is not None:
+                    deltas[(branch_id, day, field_name, values[index])] -= 1
+                deltas[(branch_id, day, field_name, status_value)] += 1
+        apply_deltas(deltas)
+
+
+def move_student_counts(student_id, from_branch, to_branch):
+    """
+    Move a student's attendance rows from one branch's summary to another's; None on
+    either side only removes or only adds them (deletion, a branch newly set).
+    """
+    with transaction.atomic():
+        lock_branches({from_branch, to_branch} - {None})
+        deltas = Counter()
+        for day, *values in Attendance.objects.filter(student_id=student_id).values_list('date', *ATTENDANCE_FIELDS):
+            for field, value in zip(ATTENDANCE_FIELDS, values):
+                if value is None:
+                    continue
+                if from_branch is not None:
+                    deltas[(from_branch, day, field, value)] -= 1
+                if to_branch is not None:
+                    deltas[(to_branch, day, field, value)] += 1
+        apply_deltas(deltas)
+
+
+def verify_summary(date_from, date_to, branch_id=None):
+    """Return [(key, expected, stored)] for every summary row that disagrees with Attendance."""
+    expected = compute_summary(date_from, date_to, branch_id)
+    stored = {key: count for key, (_, count) in stored_summary(date_from, date_to, branch_id).items()}
+    mismatches = []
+    for key in sorted(set(expected) | set(stored), key=str):
+        if expected.get(key, 0) != stored.get(key, 0):
+            mismatches.append((key, expected.get(key, 0), stored.get(key, 0)))
+    return mismatches
+
+
+def daily_counts(branch_id, date_from, date_to, classroom_id=None, house_id=None):
+    """
+    Return {(date, session, status): count} for a branch over a date range in one query.
+    Branch-wide requests read the summary table; classroom/house scopes are grouped
+    straight from Attendance by (date, five session columns) and folded per session here.
+    """
+    if classroom_id is None and house_id is None:
+        summary_qs = AttendanceDailySummary.objects.filter(branch_id=branch_id, date__range=(date_from, date_to))
+        return {
+            (day, session, status_value): count
+            for day, session, status_value, count in summary_qs.values_list('date', 'session', 'status', 'count')
+        }
+
+    attendance_qs = Attendance.objects.filter(student__branch_id=branch_id, date__range=(date_from, date_to))
+    if classroom_id is not None:
+        attendance_qs = attendance_qs.filter(student__classroom_id=classroom_id)
+    if house_id is not None:
+        attendance_qs = attendance_qs.filter(student__house_id=house_id)
+
+    counts = {}
+    for row in attendance_qs.values('date', *ATTENDANCE_FIELDS).annotate(n=Count('id')).order_by():
+        for field in ATTENDANCE_FIELDS:
+            if row[field] is None:
+                continue
+            key = (row['date'], field, row[field])
+            counts[key] = counts.get(key, 0) + row['n']
+    return counts
@@ -1,23 +1,38 @@
+from django.conf import settings
 from django.urls import path
 from .views import (
+    AsyncAttendanceAPIView,
+    AsyncDashboardAPIView,
+    AsyncTriggerUnmarkedPushAPIView,
     AttendanceAPIView,
     DashboardAPIView,
+    AttendanceTrendAPIView,
+    AttendanceExportAPIView,
     AllStudentAttendanceAPIView,
     StudentAPIView,
     BulkAddStudentsAPIView,
+    RosterCacheStatsAPIView,
     SavePushSubscriptionAPIView,
     TriggerUnmarkedPushAPIView,
     UnsubscribePushAPIView,
 )
+
+# The ASGI deployment (core.asgi) serves the hot endpoints from their async views
 urlpatterns = [
     # Other paths ...
-    path('', AttendanceAPIView.as_view(), name='attendance-api'),
-    path('dashboard/', DashboardAPIView.as_view(), name='attendance-dashboard'),
+    path('', (AsyncAttendanceAPIView if settings.ASYNC_VIEWS else AttendanceAPIView).as_view(), name='attendance-api'),
+    path('dashboard/', (AsyncDashboardAPIView if settings.ASYNC_VIEWS else DashboardAPIView).as_view(),
+         name='attendance-dashboard'),
+    path('trend/', AttendanceTrendAPIView.as_view(), name='attendance-trend'),
+    path('export/', AttendanceExportAPIView.as_view(), name='attendance-export'),
     path('get-all-attendance/', AllStudentAttendanceAPIView.as_view(), name='all-student-attendance'),
     path('students/', StudentAPIView.as_view(), name='student-attendance'),
     path('students/<int:student_id>/', StudentAPIView.as_view(), name='student-attendance-detail'),
     path('students/bulk-add/', BulkAddStudentsAPIView.as_view(), name='bulk-add-students'),
+    path('roster-cache/stats/', RosterCacheStatsAPIView.as_view(), name='roster-cache-stats'),
     path('push/subscribe/', SavePushSubscriptionAPIView.as_view(), name='push-subscribe'),
-    path('push/trigger-unmarked/', TriggerUnmarkedPushAPIView.as_view(), name='push-trigger-unmarked'),
+    path('push/trigger-unmarked/',
+         (AsyncTriggerUnmarkedPushAPIView if settings.ASYNC_VIEWS else TriggerUnmarkedPushAPIView).as_view(),
+         name='push-trigger-unmarked'),
     path('push/unsubscribe/', UnsubscribePushAPIView.as_view(), name='push-unsubscribe'),
 ]
@@ -1,24 +1,28 @@
-import requests
-import json
+from .models import Attendance
+from .sms import absent_sms_recipient, get_transport, send_with_retries, sms_session
 
 def send_absent_sms(to_number, parent_name, student_name, roll_number, date, school_name):
-    url = "https://control.msg91.com/api/v5/flow/"
+    """Send one absentee SMS through the configured transport; bulk sends go through sms.notify_absentees."""
+    recipient = absent_sms_recipient(to_number, parent_name, student_name, roll_number, date, school_name)
+    return send_with_retries(get_transport(), sms_session(), [recipient])
 
-    payload = {
-        "flow_id": "YOUR_FLOW_ID",           # Use your actual Flow ID
-        "sender": "SCHOOL",                  # Approved Sender ID (6 characters)
-        "mobiles": f"91{to_number}",
-        "parent_name": parent_name,
-        "student_name": student_name,
-        "roll_number": roll_number,
-        "date": date,
-        "school_name": school_name
-    }
 
-    headers = {
-        "authkey": "YOUR_AUTH_KEY",          # Replace with your MSG91 Auth Key
-        "Content-Type": "application/json"
-    }
-
-    response = requests.post(url, data=json.dumps(payload), headers=headers)
-    return response.json()
+def upsert_attendance_session(field_name, marks):
+    """
+    Write one session's marks in a single INSERT ... ON CONFLICT (student_id, date) DO UPDATE.
+    marks: {(student_id, date): status_value}. New rows get NOT_MARKED for the other
+    sessions; existing rows only have `field_name` overwritten.
+    """
+    if not marks:
+        return 0
+    rows = [
+        Attendance(student_id=student_id, date=att_date, **{field_name: status_value})
+        for (student_id, att_date), status_value in marks.items()
+    ]
+    Attendance.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['student', 'date'],
+        update_fields=[field_name],
+    )
+    return len(rows)
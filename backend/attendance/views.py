@@ -1,39 +1,161 @@
 from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from .models import Classroom, Student, Attendance, Houses, AttendanceTypes, PushSubscription, NotificationLog
+from .models import Classroom, Student, Attendance, Houses, AttendanceTypes, PushSubscription, NotificationLog, PushOutbox, AttendanceDailySummary, ATTENDANCE_STATUS_CODES
 from .serializers import ClassroomSerializer, StudentSerializer,StudentAPISerializer, AttendanceSerializer, HouseSerializer, PushSubscriptionSerializer
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from asgiref.sync import sync_to_async
+from core.async_views import AsyncAPIView
+from django.db import transaction
 from django.db.models import Q
 from .models import Attendance, Student
 from .serializers import AttendanceSerializer
-from datetime import datetime
+from .summary import ATTENDANCE_FIELDS, record_marks, daily_counts
+from .roster import roster_cache, student_scopes, bump_roster_versions
+from .conditional import conditional, not_modified, roster_state, set_validators
+from .search import search_students, index_students, CANDIDATE_LIMIT
+from .pagination import InvalidCursor, InvalidPageSize, keyset_page, wants_pagination, total_param, count_for
+from .export import export_queryset, register_rows, stream_async, stream_csv, stream_ndjson
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from .push import branch_admin_subscriptions, unmarked_scopes
+from datetime import datetime, timedelta
 from rest_framework.parsers import JSONParser
 from django.db.models import OuterRef, Subquery
 from accounts.permisions import IsAdminUser, isCron
 from django.db.models import Case, When, Count, Value, Q        
 import json, os
 from django.utils import timezone
-from pywebpush import webpush, WebPushException
 # import logging
 from core.settings import logger
 
+def roster_as_student_data(roster, branch_id):
+    """Shape cached roster tuples like StudentSerializer output."""
+    return [
+        {
+            'id': student_id,
+            'name': name,
+            'roll_number': roll_number,
+            'classroom': classroom_id,
+            'house': house_id,
+            'branch': branch_id,
+            'course': course,
+            'parent_name': parent_name,
+            'parent_phone': parent_phone,
+        }
+        for student_id, name, roll_number, course, classroom_id, house_id, parent_name, parent_phone in roster
+    ]
+
+
+def roster_response(view, request, scope_type):
+    """
+    Roster of the classroom or house in the URL for the caller's branch. Its RosterVersion
+    is the ETag: a matching If-None-Match gets a 304 from that one row.
+    """
+    branch_id = request.user.branch_id
+    scope_id = view.kwargs['id']
+    # Anything but an id is left to get_object's 404
+    etag, last_modified, version = (
+        roster_state(branch_id, scope_type, int(scope_id)) if scope_id.isdigit() else (None, None, None)
+    )
+    response = not_modified(request, etag, last_modified)
+    if response is not None:
+        return response
+    scope = view.get_object()
+    roster = roster_cache.get(branch_id, scope_type, scope.id, version=version)
+    response = Response(roster_as_student_data(roster, branch_id))
+    return set_validators(response, etag, last_modified) if etag else response
+
+
+def parse_range_params(request, max_days=None):
+    """
+    Parse from/to (YYYY-MM-DD) and optional classroom/house ids from the query string.
+    Returns ((date_from, date_to, classroom_id, house_id), None) or (None, error Response).
+    """
+    def bad_request(detail):
+        return None, Response({"detail": detail}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        date_from = datetime.strptime(request.query_params.get('from', ''), '%Y-%m-%d').date()
+        date_to = datetime.strptime(request.query_params.get('to', ''), '%Y-%m-%d').date()
+    except ValueError:
+        return bad_request("from and to are required. Use YYYY-MM-DD.")
+    if date_to < date_from:
+        return bad_request("to must be on or after from.")
+    if max_days and (date_to - date_from).days >= max_days:
+        return bad_request(f"to must be at most {max_days} days after from.")
+    try:
+        classroom_id = int(request.query_params['classroom']) if request.query_params.get('classroom') else None
+        house_id = int(request.query_params['house']) if request.query_params.get('house') else None
+    except ValueError:
+        return bad_request("classroom and house must be ids.")
+    return (date_from, date_to, classroom_id, house_id), None
+
+
+def search_limit(request, default=20, maximum=100):
+    try:
+        return min(max(int(request.query_params.get('limit', default)), 1), maximum)
+    except ValueError:
+        return default
+
+
+def ranked_search(students, request, branch_id, search_query, limit=None):
+    """
+    Narrow `students` to the indexed search matches for `search_query`, ordered by relevance.
+    Supports ?fuzzy=1 for typo-tolerant name matching and ?limit= (default 20, max 100).
+    """
+    fuzzy = request.query_params.get('fuzzy', '').lower() in ('1', 'true')
+    ranked_ids = search_students(branch_id, search_query, limit or search_limit(request), fuzzy)
+    if not ranked_ids:
+        return students.none()
+    return students.filter(id__in=ranked_ids).order_by(
+        Case(*[When(id=pk, then=Value(pos)) for pos, pk in enumerate(ranked_ids)])
+    )
+
+
+def paginated_students(request, students, sort_field, sort_order, fields, extra):
+    """
+    Keyset-paginated student listing (?page_size=, ?cursor=) sorted by name or id.
+    The total is skipped unless ?total=exact or ?total=estimate is passed.
+    """
+    if sort_field not in ('name', 'id'):
+        sort_field = 'name'
+    try:
+        rows, next_cursor = keyset_page(students, request, sort_field, sort_order == 'desc', fields)
+    except InvalidCursor as e:
+        return Response({"detail": f"Invalid cursor: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+    except InvalidPageSize as e:
+        return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    total, is_estimate = count_for(students, total_param(request))
+    return Response({
+        'total_students': total,
+        'total_is_estimate': is_estimate,
+        **extra,
+        'students': rows,
+        'next_cursor': next_cursor,
+    }, status=status.HTTP_200_OK)
+
+
 class ClassroomViewSet(viewsets.ModelViewSet):
     queryset = Classroom.objects.all()
     serializer_class = ClassroomSerializer
     permission_classes = [IsAuthenticated]
     lookup_field = 'id'
 
+    @conditional('classrooms')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional('classrooms')
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     @action(detail=True, methods=['get'], url_path='students')
     def students(self, request, id=None):
-        classroom = self.get_object()
-        branch_id = request.user.branch_id
-        students = Student.objects.filter(classroom=classroom, branch_id=branch_id)
-        serializer = StudentSerializer(students, many=True)
-        return Response(serializer.data)
+        return roster_response(self, request, 'class')
 
 class StudentViewSet(viewsets.ModelViewSet):
     queryset = Student.objects.all()
@@ -63,13 +185,17 @@ class HouseViewSet(viewsets.ModelViewSet):
     serializer_class = HouseSerializer
     lookup_field = 'id'
 
+    @conditional('houses')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional('houses')
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     @action(detail=True, methods=['get'], url_path='students')
     def students(self, request, id=None):
-        house = self.get_object()
-        branch_id = request.user.branch_id
-        students = Student.objects.filter(house=house, branch_id=branch_id)
-        serializer = StudentSerializer(students, many=True)
-        return Response(serializer.data)
+        return roster_response(self, request, 'house')
 
 
 
@@ -91,65 +217,89 @@ class AttendanceAPIView(APIView):
     }
 
     def get(self, request, *args, **kwargs):
+        params, error = self.parse_query(request)
+        if error:
+            return error
+        branch_id, scope_type, scope_id, field_name, query_date = params
+
+        # Get students of this classroom/house from the roster cache
+        try:
+            roster = roster_cache.get(branch_id, scope_type, scope_id)
+        except ValueError:
+            return self.invalid_scope()
+
+        # Fetch only the requested session's status for those students and date
+        att_map = dict(self.marks(branch_id, scope_type, scope_id, field_name, query_date))
+        return Response(self.roster_marks(roster, att_map), status=status.HTTP_200_OK)
+
+    def parse_query(self, request):
+        """((branch_id, scope_type, scope_id, field_name, date), None) or (None, error Response)."""
         classroom_id = request.query_params.get('classroom')
         att_type = request.query_params.get('att_type', 'morning')
         date_str = request.query_params.get('date')
         house_id = request.query_params.get('house')
         branch_id = request.user.branch_id
-        # branch_id = 1
-        print("Branch ID from user context:", branch_id)
-        print("Received parameters:", classroom_id, att_type, date_str)
         # Validate parameters
         if not (classroom_id or house_id )or not date_str:
-            return Response({"detail": "classroom and date query parameters are required."},
-                            status=status.HTTP_400_BAD_REQUEST)
+            return None, Response({"detail": "classroom and date query parameters are required."},
+                                  status=status.HTTP_400_BAD_REQUEST)
         
         field_name = self.ATT_TYPE_FIELD_MAP.get(att_type)
         if not field_name:
-            return Response({"detail": f"Invalid att_type: {att_type}"},
-                            status=status.HTTP_400_BAD_REQUEST)
+            return None, Response({"detail": f"Invalid att_type: {att_type}"},
+                                  status=status.HTTP_400_BAD_REQUEST)
         
         try:
             query_date = datetime.strptime(date_str, '%Y-%m-%d').date()
         except ValueError:
-            return Response({"detail": "Invalid date format. Use YYYY-MM-DD."},
-                            status=status.HTTP_400_BAD_REQUEST)
+            return None, Response({"detail": "Invalid date format. Use YYYY-MM-DD."},
+                                  status=status.HTTP_400_BAD_REQUEST)
 
-        # Get students of this classroom for mapping convenience
         if house_id:
-            students = Student.objects.filter(house_id=house_id,branch_id=branch_id)
-        elif classroom_id:
-            students = Student.objects.filter(classroom_id=classroom_id, branch_id=branch_id)
+            return (branch_id, 'house', house_id, field_name, query_date), None
+        return (branch_id, 'class', classroom_id, field_name, query_date), None
 
-        # Fetch attendance for those students and date
-        attendance_qs = Attendance.objects.filter(student__in=students, date=query_date)
+    @staticmethod
+    def invalid_scope():
+        return Response({"detail": "classroom and house must be ids."},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    @staticmethod
+    def marks(branch_id, scope_type, scope_id, field_name, query_date):
+        scope_field = 'student__house_id' if scope_type == 'house' else 'student__classroom_id'
+        return Attendance.objects.filter(
+            student__branch_id=branch_id, date=query_date, **{scope_field: scope_id}
+        ).values_list('student_id', field_name)
 
+    @staticmethod
+    def roster_marks(roster, att_map):
         # Build response list with student id and the attendance status for the requested att_type field
         response_data = []
-
-        # Build a map student_id -> attendance object for quicker lookup
-        att_map = {att.student_id: att for att in attendance_qs}
-
-        for student in students:
-            att_obj = att_map.get(student.id)
-            status_value = getattr(att_obj, field_name) if att_obj else None
+        for student_id, name, *_ in roster:
             # If no attendance record found, send null or you can default to 'present' if you want in frontend
             response_data.append({
-                'student': student.id,
-                'student_name': student.name,
-                'status': status_value,
+                'student': student_id,
+                'student_name': name,
+                'status': att_map.get(student_id),
             })
-
-        return Response(response_data, status=status.HTTP_200_OK)
+        return response_data
 
     def post(self, request, *args, **kwargs):
         data = request.data
         if not isinstance(data, list):
             return Response({"detail": "Expected a list of attendance records."},
                             status=status.HTTP_400_BAD_REQUEST)
-        
+
+        pending, errors = self.validate_records(data)
+        # One query to check that all referenced students exist (and learn their branch)
+        student_branches = dict(self.student_branches(pending)) if pending else {}
+        successes = self.save_marks(pending, student_branches, errors)
+        return self.post_response(successes, errors)
+
+    def validate_records(self, data):
+        """Validate every record in Python first; the DB is only touched once per step afterwards."""
         errors = []
-        successes = []
+        pending = []
         for index, record in enumerate(data):
             student_id = record.get('student')
             date_str = record.get('date')
@@ -165,9 +315,9 @@ class AttendanceAPIView(APIView):
                 errors.append({"index": index, "detail": f"Invalid att_type: {att_type}"})
                 continue
             
-            # if status_value not in dict(AttendanceTypes).keys():
-            #     errors.append({"index": index, "detail": f"Invalid status value: {status_value}"})
-            #     continue
+            if status_value not in ATTENDANCE_STATUS_CODES:
+                errors.append({"index": index, "detail": f"Invalid status value: {status_value}"})
+                continue
 
             try:
                 att_date = datetime.strptime(date_str, '%Y-%m-%d').date()
@@ -176,28 +326,83 @@ class AttendanceAPIView(APIView):
                 continue
 
             try:
-                student = Student.objects.get(pk=student_id)
-            except Student.DoesNotExist:
+                pk = int(student_id)
+            except (TypeError, ValueError):
                 errors.append({"index": index, "detail": f"Student id {student_id} not found"})
                 continue
 
-            attendance_obj, created = Attendance.objects.get_or_create(
-                student=student,
-                date=att_date,
-                defaults={
-                    field_name: status_value,
-                })
+            pending.append((index, student_id, pk, att_date, field_name, status_value))
+        return pending, errors
 
-            setattr(attendance_obj, field_name, status_value)
+    @staticmethod
+    def student_branches(pending):
+        return Student.objects.filter(pk__in={row[2] for row in pending}).values_list('id', 'branch_id')
+
+    def save_marks(self, pending, student_branches, errors):
+        """Upsert the validated records together with their summary counts; returns the successes."""
+        successes = []
+        # Group by session column: each group becomes one INSERT ... ON CONFLICT statement.
+        # Later records for the same (student, date) win, as they did with sequential saves.
+        sessions = {}
+        for index, student_id, pk, att_date, field_name, status_value in pending:
+            if pk not in student_branches:
+                errors.append({"index": index, "detail": f"Student id {student_id} not found"})
+                continue
+            marks, indexes = sessions.setdefault(field_name, ({}, []))
+            marks[(pk, att_date)] = status_value
+            indexes.append((index, student_id))
+
+        for field_name, (marks, indexes) in sessions.items():
             try:
-                attendance_obj.save()
-                successes.append({"index": index, "detail": f"Attendance saved for student {student_id}"})
+                record_marks(field_name, marks, student_branches)
             except Exception as e:
-                errors.append({"index": index, "detail": f"DB error: {str(e)}"})
+                errors.extend({"index": index, "detail": f"DB error: {str(e)}"} for index, _ in indexes)
+                continue
+            successes.extend(
+                {"index": index, "detail": f"Attendance saved for student {student_id}"}
+                for index, student_id in indexes
+            )
+        return successes
+
+    @staticmethod
+    def post_response(successes, errors):
+        successes.sort(key=lambda item: item["index"])
+        errors.sort(key=lambda item: item["index"])
         
         response_status = status.HTTP_200_OK if not errors else status.HTTP_207_MULTI_STATUS
         return Response({"successes": successes, "errors": errors}, status=response_status)
-    
+
+
+class AsyncAttendanceAPIView(AsyncAPIView, AttendanceAPIView):
+    """AttendanceAPIView for the ASGI deployment: reads use the async ORM, the upserts run in a thread."""
+
+    async def get(self, request, *args, **kwargs):
+        params, error = self.parse_query(request)
+        if error:
+            return error
+        branch_id, scope_type, scope_id, field_name, query_date = params
+        try:
+            roster = await roster_cache.aget(branch_id, scope_type, scope_id)
+        except ValueError:
+            return self.invalid_scope()
+        att_map = {
+            student_id: value
+            async for student_id, value in self.marks(branch_id, scope_type, scope_id, field_name, query_date)
+        }
+        return Response(self.roster_marks(roster, att_map), status=status.HTTP_200_OK)
+
+    async def post(self, request, *args, **kwargs):
+        data = request.data
+        if not isinstance(data, list):
+            return Response({"detail": "Expected a list of attendance records."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        pending, errors = self.validate_records(data)
+        student_branches = {
+            pk: branch_id async for pk, branch_id in self.student_branches(pending)
+        } if pending else {}
+        successes = await sync_to_async(self.save_marks)(pending, student_branches, errors)
+        return self.post_response(successes, errors)
 
 
 class DashboardAPIView(APIView):
@@ -210,51 +415,40 @@ class DashboardAPIView(APIView):
         branch_id = request.user.branch_id
         # branch_id = 1
         date = request.query_params.get('date')
+        if not date:
+            return self.missing_date()
         
-        students = Student.objects.filter(branch_id=branch_id)
-        total_students = students.count()   
-        # Fetch attendance for those students and date
-        attendance_qs = Attendance.objects.filter(student__in=students, date=date)
-        
-        # Handle missing attendance records
-        if total_students != attendance_qs.count() and date > '2025-08-01':
-            attendance_missed = total_students - attendance_qs.count()
-            print(f"Adding attendance for {attendance_missed} students who missed marking on {date}")
-            
-            # Get students who don't have attendance records for this date
-            existing_student_ids = attendance_qs.values_list('student_id', flat=True)
-            missing_students = students.exclude(id__in=existing_student_ids)
-
-            # Create attendance entries for students who missed marking
-            if missing_students.exists():
-                Attendance.objects.bulk_create([
-                    Attendance(student=student, date=date)
-                    for student in missing_students
-                ], ignore_conflicts=True)
-                
-                # Refresh the queryset after adding missing records
-                attendance_qs = Attendance.objects.filter(student__in=students, date=date)
-            
-        attendance_fields = [
-            'morning_attendance',
-            'evening_class_attendance', 
-            'morning_pt_attendance',
-            'games_attendance',
-            'night_dorm_attendance'
-        ]
+        total_students = Student.objects.filter(branch_id=branch_id).count()
+        summary_rows = self.summary_rows(branch_id, date)
+        return Response(self.dashboard(branch_id, date, total_students, summary_rows), status=status.HTTP_200_OK)
+
+    @staticmethod
+    def missing_date():
+        return Response({"detail": "date query parameter is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+    @staticmethod
+    def summary_rows(branch_id, date):
+        # Counts come from the summary table maintained by attendance writes
+        return AttendanceDailySummary.objects.filter(
+            branch_id=branch_id, date=date
+        ).values_list('session', 'status', 'count')
+
+    @staticmethod
+    def dashboard(branch_id, date, total_students, summary_rows):
+        attendance_fields = ATTENDANCE_FIELDS
 
         attendance_types = ['present', 'absent', 'leave', 'on_duty', 'leave_sw', 'NOT_MARKED']
-        
-        # Build aggregation dictionary for all fields and types at once
-        aggregation_dict = {}
-        for field in attendance_fields:
-            for att_type in attendance_types:
-                key = f"{field}_{att_type}"
-                aggregation_dict[key] = Count('id', filter=Q(**{field: att_type}))
-        
-        # Single database query to get all counts
-        attendance_counts = attendance_qs.aggregate(**aggregation_dict)
-        
+
+        attendance_counts = {}
+        rows_per_field = dict.fromkeys(attendance_fields, 0)
+        for session, status_value, count in summary_rows:
+            attendance_counts[f"{session}_{status_value}"] = count
+            rows_per_field[session] = rows_per_field.get(session, 0) + count
+
+        # Students without an attendance row count as NOT_MARKED (previously these
+        # rows were bulk-created here as a side effect of the GET)
+        count_missing = date > '2025-08-01'
+
         # Restructure the data for response
         att_dict = {}
         for field in attendance_fields:
@@ -262,17 +456,116 @@ class DashboardAPIView(APIView):
             for att_type in attendance_types:
                 key = f"{field}_{att_type}"
                 field_counts[key] = attendance_counts.get(key, 0)
+            if count_missing:
+                field_counts[f"{field}_NOT_MARKED"] += max(total_students - rows_per_field[field], 0)
             att_dict[field] = field_counts
         
         # Prepare the response data
-        response_data = {
+        return {
             'total_students': total_students,
             'attendance_counts': att_dict,
             'date': date,
             'branch_id': branch_id
         }
-        return Response(response_data, status=status.HTTP_200_OK)
+
+
+class AsyncDashboardAPIView(AsyncAPIView, DashboardAPIView):
+    """DashboardAPIView for the ASGI deployment, on the async ORM."""
+
+    async def get(self, request, *args, **kwargs):
+        branch_id = request.user.branch_id
+        date = request.query_params.get('date')
+        if not date:
+            return self.missing_date()
+
+        total_students = await Student.objects.filter(branch_id=branch_id).acount()
+        summary_rows = [row async for row in self.summary_rows(branch_id, date)]
+        return Response(self.dashboard(branch_id, date, total_students, summary_rows), status=status.HTTP_200_OK)
         
+class AttendanceTrendAPIView(APIView):
+    """
+    GET: Per-day counts of every status for every session over a date range.
+    Query params: from, to (YYYY-MM-DD, at most MAX_DAYS apart), optional classroom or house.
+    Returns a columnar series: `dates` plus, per session and status, a list of counts aligned with `dates`.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    MAX_DAYS = 366
+
+    def get(self, request, *args, **kwargs):
+        branch_id = request.user.branch_id
+        params, error = parse_range_params(request, self.MAX_DAYS)
+        if error:
+            return error
+        date_from, date_to, classroom_id, house_id = params
+
+        counts = daily_counts(branch_id, date_from, date_to, classroom_id, house_id)
+
+        students = Student.objects.filter(branch_id=branch_id)
+        if classroom_id is not None:
+            students = students.filter(classroom_id=classroom_id)
+        if house_id is not None:
+            students = students.filter(house_id=house_id)
+        total_students = students.count()
+
+        dates = [date_from + timedelta(days=offset) for offset in range((date_to - date_from).days + 1)]
+        date_index = {day: idx for idx, day in enumerate(dates)}
+        statuses = ['present', 'absent', 'leave', 'on_duty', 'leave_sw', 'NOT_MARKED']
+        statuses += sorted({key[2] for key in counts} - set(statuses))
+
+        series = {field: {s: [0] * len(dates) for s in statuses} for field in ATTENDANCE_FIELDS}
+        rows_per_day = {field: [0] * len(dates) for field in ATTENDANCE_FIELDS}
+        for (day, field, status_value), count in counts.items():
+            if field in series:
+                series[field][status_value][date_index[day]] = count
+                rows_per_day[field][date_index[day]] += count
+
+        # Same rule as DashboardAPIView: students without a row are NOT_MARKED
+        for field in ATTENDANCE_FIELDS:
+            not_marked = series[field]['NOT_MARKED']
+            for idx, day in enumerate(dates):
+                if day.isoformat() > '2025-08-01':
+                    not_marked[idx] += max(total_students - rows_per_day[field][idx], 0)
+
+        return Response({
+            'branch_id': branch_id,
+            'classroom': classroom_id,
+            'house': house_id,
+            'total_students': total_students,
+            'dates': [day.isoformat() for day in dates],
+            'statuses': statuses,
+            'series': series,
+        }, status=status.HTTP_200_OK)
+
+
+class AttendanceExportAPIView(APIView):
+    """
+    GET: Stream the attendance register of the branch for a date range.
+    Query params: from, to (YYYY-MM-DD), optional classroom or house, output=csv|ndjson (default csv).
+    One row per student per day with student, classroom and house names and all five sessions.
+    Rows are streamed from the database in chunks, so memory stays flat for any range;
+    under ASGI the lines go through an async iterator so Django does not buffer them.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        params, error = parse_range_params(request)
+        if error:
+            return error
+        date_from, date_to, classroom_id, house_id = params
+        output = request.query_params.get('output', 'csv')
+        if output not in ('csv', 'ndjson'):
+            return Response({"detail": "output must be csv or ndjson."}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = register_rows(export_queryset(request.user.branch_id, date_from, date_to, classroom_id, house_id))
+        lines = stream_csv(rows) if output == 'csv' else stream_ndjson(rows)
+        if settings.ASYNC_VIEWS:
+            lines = stream_async(lines)
+        content_type = 'text/csv' if output == 'csv' else 'application/x-ndjson'
+        response = StreamingHttpResponse(lines, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="attendance_{date_from}_{date_to}.{output}"'
+        return response
+
+
 class AllStudentAttendanceAPIView(APIView):
     """
     GET: Fetch attendance for all students with filtering, searching, and sorting.
@@ -307,30 +600,39 @@ class AllStudentAttendanceAPIView(APIView):
         # Build base queryset with JOIN to attendance
         students = Student.objects.filter(branch_id=branch_id)
         
-        attendance = Attendance.objects.filter(
-                Q(student__in=students) &
-                Q(date=date)&
-                Q(**{field_name: status_value})
-            ).values('student_id')
-        
-        students = students.filter(id__in=attendance)
+        day_attendance = Attendance.objects.filter(Q(student__in=students) & Q(date=date))
+        if status_value == AttendanceTypes.NOT_MARKED and date > '2025-08-01':
+            # Students without a row for the day are unmarked as well (the dashboard counts them the same way)
+            marked = day_attendance.exclude(**{field_name: status_value}).values('student_id')
+            students = students.exclude(id__in=marked)
+        else:
+            attendance = day_attendance.filter(**{field_name: status_value}).values('student_id')
+            students = students.filter(id__in=attendance)
         if search_query:
-            students = students.filter(Q(name__icontains=search_query) | Q(id__icontains=search_query))
+            # Rank over a wide candidate set, then keep the best matches that pass the attendance filter
+            students = ranked_search(students, request, branch_id, search_query, CANDIDATE_LIMIT)
         valid_sort_fields = ['name','id']
-        if sort_field in valid_sort_fields:
+        if sort_field in valid_sort_fields and (not search_query or 'sort_field' in request.query_params):
             ordering = sort_field
             if sort_order == 'desc':
                 ordering = f'-{ordering}'
             students = students.order_by(ordering)
-
-        result = students.values('roll_number', 'name', 'classroom__name', 'house__name')
+        if search_query:
+            students = students[:search_limit(request)]
+        elif wants_pagination(request):
+            return paginated_students(
+                request, students, sort_field, sort_order,
+                ['roll_number', 'name', 'classroom__name', 'house__name'],
+                {'date': date, 'branch_id': branch_id},
+            )
+
+        result = list(students.values('roll_number', 'name', 'classroom__name', 'house__name'))
         final_response = {
-            'total_students': students.count(),
+            'total_students': len(result),
             'date': date,
-            'branch_id': branch_id
+            'branch_id': branch_id,
+            'students': result,
         }
-        result = list(result)
-        final_response['students'] = result
         return Response(final_response, status=status.HTTP_200_OK)
         
         
@@ -350,20 +652,27 @@ class StudentAPIView(APIView):
         students = Student.objects.filter(branch_id=branch_id)
 
         if search_query:
-            students = students.filter(Q(name__icontains=search_query) | Q(id__icontains=search_query))
+            students = ranked_search(students, request, branch_id, search_query)
 
         valid_sort_fields = ['name', 'id']
-        if sort_field in valid_sort_fields:
+        if sort_field in valid_sort_fields and (not search_query or 'sort_field' in request.query_params):
             ordering = sort_field
             if sort_order == 'desc':
                 ordering = f'-{ordering}'
             students = students.order_by(ordering)
 
-        result = students.values('id', 'name', 'roll_number', 'classroom__name', 'house__name')
+        if not search_query and wants_pagination(request):
+            return paginated_students(
+                request, students, sort_field, sort_order,
+                ['id', 'name', 'roll_number', 'classroom__name', 'house__name'],
+                {'branch_id': branch_id},
+            )
+
+        result = list(students.values('id', 'name', 'roll_number', 'classroom__name', 'house__name'))
         final_response = {
-            'total_students': students.count(),
+            'total_students': len(result),
             'branch_id': branch_id,
-            'students': list(result)
+            'students': result
         }
         return Response(final_response, status=status.HTTP_200_OK)
     
@@ -450,7 +759,16 @@ class BulkAddStudentsAPIView(APIView):
         if to_create:
             Student.objects.bulk_create(to_create)
         if to_update:
-            Student.objects.bulk_update(to_update, fields=['name', 'house', 'course', 'classroom'])
+            Student.objects.bulk_update(to_update, fields=['name', 'house', 'course', 'classroom', 'parent_name', 'parent_phone'])
+
+        # bulk_create/bulk_update skip model signals, so invalidate the touched rosters
+        # and refresh the search index here
+        touched_scopes = set()
+        for student in to_create + to_update:
+            touched_scopes |= student_scopes(student.branch_id, student.classroom_id, student.house_id)
+            touched_scopes |= getattr(student, '_loaded_roster_scopes', set())
+        bump_roster_versions(touched_scopes)
+        index_students(to_create + to_update)
 
         return Response({
             "created": len(to_create),
@@ -458,6 +776,16 @@ class BulkAddStudentsAPIView(APIView):
         }, status=status.HTTP_200_OK)
 
 
+class RosterCacheStatsAPIView(APIView):
+    """
+    GET: Hit/miss counters of this worker's roster cache.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response({'pid': os.getpid(), **roster_cache.stats()}, status=status.HTTP_200_OK)
+
+
 class SavePushSubscriptionAPIView(APIView):
     permission_classes = [IsAuthenticated]
     parser_classes = [JSONParser]
@@ -515,6 +843,24 @@ class TriggerUnmarkedPushAPIView(APIView):
     ATT_TYPE_FIELD_MAP = AttendanceAPIView.ATT_TYPE_FIELD_MAP
 
     def post(self, request, *args, **kwargs):
+        params, error = self.parse(request)
+        if error:
+            return error
+        day, att_type, field_name, scope_types, only_id = params
+
+        pending = unmarked_scopes(day, field_name, att_type, scope_types, only_id)
+
+        classrooms, houses, subscription_rows = self.scope_queries(pending)
+        class_names = dict(classrooms)
+        house_names = {house.id: house.get_name_display() for house in houses}
+        subscriptions = self.group_subscriptions(subscription_rows)
+
+        notified, jobs, logs = self.notifications(pending, class_names, house_names, subscriptions, day, att_type)
+        self.queue(logs, jobs)
+        return Response({"ok": True, "notified": notified, "queued": len(jobs)})
+
+    def parse(self, request):
+        """((day, att_type, field_name, scope_types, scope_id), None) or (None, error Response)."""
         date_str = request.data.get('date')
         att_type = request.data.get('attendance_type', 'morning')
         scope = request.data.get('scope')
@@ -522,94 +868,105 @@ class TriggerUnmarkedPushAPIView(APIView):
         scope_only = request.data.get('scope_only')  # optional: 'class' | 'house'
 
         if att_type not in self.ATT_TYPE_FIELD_MAP:
-            return Response({"detail": "valid attendance_type is required"}, status=400)
+            return None, Response({"detail": "valid attendance_type is required"}, status=400)
 
         if date_str:
             try:
                 day = datetime.strptime(date_str, '%Y-%m-%d').date()
             except ValueError:
-                return Response({"detail": "Invalid date format"}, status=400)
+                return None, Response({"detail": "Invalid date format"}, status=400)
         else:
             day = timezone.localdate()
 
         field_name = self.ATT_TYPE_FIELD_MAP[att_type]
 
-        scopes = []
-        if scope == 'class' and scope_id:
-            scopes = [('class', int(scope_id))]
-        elif scope == 'house' and scope_id:
-            scopes = [('house', int(scope_id))]
+        if scope in ('class', 'house') and scope_id:
+            scope_types, only_id = (scope,), int(scope_id)
+        elif scope_only in ('class', 'house'):
+            scope_types, only_id = (scope_only,), None
         else:
-            class_ids = list(Classroom.objects.values_list('id', flat=True))
-            house_ids = list(Houses.objects.values_list('id', flat=True))
-            if scope_only == 'class':
-                scopes = [('class', cid) for cid in class_ids]
-            elif scope_only == 'house':
-                scopes = [('house', hid) for hid in house_ids]
-            else:
-                scopes = [('class', cid) for cid in class_ids] + [('house', hid) for hid in house_ids]
+            scope_types, only_id = ('class', 'house'), None
+        return (day, att_type, field_name, scope_types, only_id), None
 
-        notified = []
-        for scope_type, sid in scopes:
-            # across all branches
-            if scope_type == 'class':
-                students_base = Student.objects.filter(classroom_id=sid)
-            else:
-                students_base = Student.objects.filter(house_id=sid)
+    @staticmethod
+    def scope_queries(pending):
+        """Names of the pending classrooms and houses, and (branch_id, subscription id) of their branches' admins."""
+        classrooms = Classroom.objects.filter(
+            id__in={sid for _, st, sid, _ in pending if st == 'class'}
+        ).values_list('id', 'name')
+        houses = Houses.objects.filter(id__in={sid for _, st, sid, _ in pending if st == 'house'})
+        subscriptions = branch_admin_subscriptions(
+            {branch_id for branch_id, _, _, _ in pending}
+        ).values_list('branch_id', 'id')
+        return classrooms, houses, subscriptions
 
-            if not students_base.exists():
-                continue
+    @staticmethod
+    def group_subscriptions(rows):
+        subscriptions = {}
+        for branch_id, sub_id in rows:
+            subscriptions.setdefault(branch_id, []).append(sub_id)
+        return subscriptions
 
-            # Notify per-branch within this scope
-            branch_ids = list(students_base.values_list('branch_id', flat=True).distinct())
-            for branch_id in branch_ids:
-                students = students_base.filter(branch_id=branch_id)
-                if not students.exists():
-                    continue
-
-                if NotificationLog.objects.filter(branch_id=branch_id, date=day, session_key=att_type, scope_type=scope_type, scope_id=sid).exists():
-                    continue
-
-                has_unmarked = Attendance.objects.filter(
-                    student__in=students,
-                    date=day,
-                    **{field_name: 'NOT_MARKED'}
-                ).exists()
-                if has_unmarked:
-                    if scope_type == 'class':
-                        class_name = Classroom.objects.filter(id=sid).values_list('name', flat=True).first() or str(sid)
-                        scope_label = f"{class_name}"
-                    elif scope_type == 'house':
-                        house_obj = Houses.objects.filter(id=sid).first()
-                        house_name = house_obj.get_name_display() if house_obj else str(sid)
-                        scope_label = f"{house_name}"
-
-                    self._send_push_to_branch(
-                        branch_id,
-                        title=f"Notice: {att_type.replace('_', ' ')} attendance",
-                        body=f"Unmarked entries detected for {day} in {scope_label}.",
-                    )
-                    NotificationLog.objects.create(branch_id=branch_id, date=day, session_key=att_type, scope_type=scope_type, scope_id=sid)
-                    notified.append({"scope": scope_type, "id": sid})
-
-        return Response({"ok": True, "notified": notified})
+    @staticmethod
+    def notifications(pending, class_names, house_names, subscriptions, day, att_type):
+        notified = []
+        jobs = []
+        logs = []
+        title = f"Notice: {att_type.replace('_', ' ')} attendance"
+        for branch_id, scope_type, sid, unmarked_count in pending:
+            names = class_names if scope_type == 'class' else house_names
+            body = f"Unmarked entries detected for {day} in {names.get(sid, str(sid))}."
+            log = NotificationLog(branch_id=branch_id, date=day, session_key=att_type, scope_type=scope_type, scope_id=sid)
+            # Notify only admins in this branch
+            jobs.extend(
+                PushOutbox(subscription_id=sub_id, log=log, title=title, body=body)
+                for sub_id in subscriptions.get(branch_id, [])
+            )
+            logs.append(log)
+            notified.append({"scope": scope_type, "id": sid, "branch": branch_id, "unmarked": unmarked_count})
+        return notified, jobs, logs
 
     @staticmethod
-    def _send_push_to_branch(branch_id: int, title: str, body: str) -> None:
-
-        # Notify only admins in this branch
-        subs = PushSubscription.objects.filter(branch_id=branch_id, user__role='admin', user__is_active=True)
-        vapid_private = os.environ.get('VAPID_PRIVATE_KEY', 'IrPD0MjfOewL70dJrICeQLY4h_JVdJPKwC-4SbM3vA8')
-        vapid_email = os.environ.get('VAPID_EMAIL', 'mailto:gautam@superadmin.com')
-        if not vapid_private:
-            logger.warning("VAPID_PRIVATE_KEY not set; skipping push send")
+    def queue(logs, jobs):
+        # Pushes are delivered by the push_worker command; the log and its jobs commit together
+        if not logs:
             return
-        payload = json.dumps({"title": title, "body": body})
-        for sub in subs:
-            try:
-                webpush(subscription_info=sub.as_webpush_dict(), data=payload, vapid_private_key=vapid_private, vapid_claims={"sub": vapid_email})
-                logger.info("Push sent to %s", sub.endpoint)
-                logger.info("Push payload: %s", payload)
-                
-            except WebPushException as e:
-                logger.warning("Push send failed for %s: %s", sub.endpoint, str(e))
+        with transaction.atomic():
+            # A concurrent tick may have logged the same scope; the unique key keeps one row
+            NotificationLog.objects.bulk_create(logs, ignore_conflicts=True)
+            key = lambda log: (log.branch_id, log.scope_type, log.scope_id)
+            ids = {
+                key(log): log.pk for log in NotificationLog.objects.filter(
+                    date=logs[0].date, session_key=logs[0].session_key,
+                    branch_id__in={log.branch_id for log in logs}, scope_id__in={log.scope_id for log in logs},
+                ).only('id', 'branch_id', 'scope_type', 'scope_id')
+            }
+            for log in logs:
+                log.pk = ids[key(log)]
+            # ...and queued its pushes; (log, subscription) is unique, so each is sent once
+            PushOutbox.objects.bulk_create(jobs, ignore_conflicts=True)
+
+
+class AsyncTriggerUnmarkedPushAPIView(AsyncAPIView, TriggerUnmarkedPushAPIView):
+    """
+    TriggerUnmarkedPushAPIView for the ASGI deployment. The sweep is one grouped query
+    and the queueing one transaction, both run in a thread (Django has no async
+    transactions); the lookups in between use the async ORM.
+    """
+
+    async def post(self, request, *args, **kwargs):
+        params, error = self.parse(request)
+        if error:
+            return error
+        day, att_type, field_name, scope_types, only_id = params
+
+        pending = await sync_to_async(unmarked_scopes)(day, field_name, att_type, scope_types, only_id)
+
+        classrooms, houses, subscription_rows = self.scope_queries(pending)
+        class_names = {pk: name async for pk, name in classrooms}
+        house_names = {house.id: house.get_name_display() async for house in houses}
+        subscriptions = self.group_subscriptions([row async for row in subscription_rows])
+
+        notified, jobs, logs = self.notifications(pending, class_names, house_names, subscriptions, day, att_type)
+        await sync_to_async(self.queue)(logs, jobs)
+        return Response({"ok": True, "notified": notified, "queued": len(jobs)})
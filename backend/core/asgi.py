@@ -3,6 +3,20 @@ ASGI config for core project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Served this way, the I/O-bound attendance endpoints (marking, dashboard, the unmarked
+push sweep) run as async views (see core.async_views), and one worker process keeps
+hundreds of requests in flight instead of GUNICORN_THREADS. The web service in
+render.yaml runs it with uvicorn workers (uvicorn and uvicorn-worker in requirements.txt):
+
+    gunicorn core.asgi:application -k uvicorn_worker.UvicornWorker
+
+which keeps gunicorn's process management and gunicorn.conf.py (the thread setting
+does not apply); `uvicorn core.asgi:application --workers 4` also works on its own.
+`gunicorn core.wsgi:application` still serves the sync views. The
+database is reached through the psycopg connection pool (`psycopg[binary,pool]` in
+requirements.txt): see core.db_pool for why persistent connections are turned off under
+ASGI. Compare both deployments with `manage.py bench_serving`.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -12,5 +26,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+# Read by settings: route the hot endpoints to their async views
+os.environ.setdefault('DJANGO_ASYNC_VIEWS', 'true')
 
 application = get_asgi_application()
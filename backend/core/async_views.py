@@ -0,0 +1,44 @@
+"""
+Async DRF views for the ASGI deployment (see core.asgi).
+
+DRF's APIView only dispatches to sync handlers. AsyncAPIView keeps its request
+wrapping, authentication, permissions, exception handling and rendering, but awaits
+`async def` handlers, so Django runs the view on the event loop instead of holding a
+worker thread for the whole request. Authentication and permission checks run in a
+thread because the JWT deny list may refresh from the database; handlers use the
+async ORM (aget, acount, `async for`) and wrap anything else that touches the
+database in sync_to_async.
+"""
+from inspect import isawaitable
+from asgiref.sync import sync_to_async
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    """APIView whose handlers (get, post, ...) are coroutines."""
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            # options() and http_method_not_allowed() are APIView's sync ones
+            response = handler(request, *args, **kwargs)
+            if isawaitable(response):
+                response = await response
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
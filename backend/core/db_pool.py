@@ -0,0 +1,141 @@
+"""
+Database settings from DATABASE_URL, with a connection pooling mode for a remote
+serverless Postgres (Neon), where opening a connection costs a TLS handshake across
+regions. Imported by settings, so only plain Python here.
+
+DATABASE_POOL picks the mode for PostgreSQL:
+  psycopg     psycopg 3's native pool (needs `psycopg[pool]`): every worker process
+              keeps DATABASE_POOL_MIN_SIZE..DATABASE_POOL_MAX_SIZE connections open.
+  pgbouncer   through PgBouncer in transaction mode, e.g. Neon's `-pooler` host:
+              persistent connections to the bouncer and no server-side cursors.
+  persistent  one connection per worker thread, reused for DATABASE_CONN_MAX_AGE seconds.
+  auto        (default) under ASGI always psycopg; otherwise pgbouncer for a `-pooler`
+              host, psycopg when psycopg_pool is installed, persistent otherwise.
+
+Pool size follows the gunicorn worker model (gunicorn.conf.py): a worker serves
+GUNICORN_THREADS requests at once, so that is the default DATABASE_POOL_MAX_SIZE, and
+the app holds at most WEB_CONCURRENCY x max size server connections.
+
+Under ASGI (core.asgi sets DJANGO_ASYNC_VIEWS) a worker serves any number of requests
+at once, and Django runs each request's queries on a thread of its own that ends with
+the request. A connection kept open past the request would be orphaned with its
+thread, so persistent and pgbouncer modes would connect, with a TLS handshake, on
+every request (CONN_MAX_AGE=0). Auto mode therefore requires the psycopg pool
+(requirements.txt installs it), also in front of a `-pooler` host, whose default size
+is then ASYNC_POOL_MAX_SIZE; requests beyond it wait up to DATABASE_POOL_TIMEOUT for a
+connection. Only choose DATABASE_POOL=pgbouncer or persistent explicitly under ASGI
+for a database next to the app.
+
+Server-side prepared statements (psycopg 3's server-side binding plus its
+prepare_threshold) are opt-in, as in Django: with server-side binding some ORM queries
+fail, e.g. parameters in GROUP BY or a literal Value() in a UNION such as
+push.unmarked_scopes. DATABASE_PREPARED_STATEMENTS=true enables them where the server
+session belongs to one client: psycopg and persistent modes. Behind PgBouncer they
+also need PgBouncer >= 1.21 with max_prepared_statements and
+PGBOUNCER_PREPARED_STATEMENTS=true.
+"""
+import os
+from urllib.parse import urlsplit
+import dj_database_url
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import psycopg  # noqa: F401
+    IS_PSYCOPG3 = True
+except ImportError:
+    IS_PSYCOPG3 = False
+
+try:
+    import psycopg_pool  # noqa: F401
+    HAS_PSYCOPG_POOL = True
+except ImportError:
+    HAS_PSYCOPG_POOL = False
+
+POOL_MODES = ('auto', 'psycopg', 'pgbouncer', 'persistent')
+ASYNC_POOL_MAX_SIZE = 20
+
+
+def _env_flag(name, default):
+    return os.environ.get(name, str(default)).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def worker_threads():
+    """Requests one gunicorn worker serves at once (gunicorn.conf.py reads the same variable)."""
+    return max(int(os.environ.get('GUNICORN_THREADS', 1)), 1)
+
+
+def async_serving():
+    """Served by core.asgi, with the async views."""
+    return _env_flag('DJANGO_ASYNC_VIEWS', False)
+
+
+def behind_pgbouncer(host):
+    """Neon's pooled endpoints are PgBouncer in transaction mode."""
+    return '-pooler.' in (host or '')
+
+
+def pool_mode(host):
+    mode = os.environ.get('DATABASE_POOL', 'auto').strip().lower()
+    if mode not in POOL_MODES:
+        raise ImproperlyConfigured(f"DATABASE_POOL must be one of {', '.join(POOL_MODES)}, not {mode!r}")
+    if mode != 'auto':
+        return mode
+    if async_serving():
+        if not HAS_PSYCOPG_POOL:
+            raise ImproperlyConfigured(
+                'Serving through core.asgi needs the psycopg pool: pip install "psycopg[binary,pool]", '
+                'or set DATABASE_POOL to accept a new connection per request'
+            )
+        return 'psycopg'
+    if behind_pgbouncer(host):
+        return 'pgbouncer'
+    return 'psycopg' if HAS_PSYCOPG_POOL else 'persistent'
+
+
+def database_config(url=None, default=None):
+    """
+    A DATABASES entry from `url` (DATABASE_URL), or from `default` when there is none,
+    configured for the pooling mode. Non-PostgreSQL databases only get persistent
+    connections. The chosen mode is kept in the entry as POOL_MODE.
+    """
+    config = dj_database_url.parse(url) if url else {**default, 'OPTIONS': dict(default.get('OPTIONS', {}))}
+    # Under ASGI a connection would outlive the per-request thread that opened it
+    max_age = 0 if async_serving() else int(os.environ.get('DATABASE_CONN_MAX_AGE', 300))
+    if config['ENGINE'] != 'django.db.backends.postgresql':
+        config.update(CONN_MAX_AGE=max_age, POOL_MODE='persistent')
+        return config
+
+    options = config.setdefault('OPTIONS', {})
+    options.setdefault('connect_timeout', 10)
+    options.setdefault('application_name', 'attendance_app')
+    host = config.get('HOST') or urlsplit(url or '').hostname
+    mode = pool_mode(host)
+    config['POOL_MODE'] = mode
+    prepared = _env_flag('DATABASE_PREPARED_STATEMENTS', False)
+
+    if mode == 'psycopg':
+        if not HAS_PSYCOPG_POOL:
+            raise ImproperlyConfigured('DATABASE_POOL=psycopg needs psycopg 3 with its pool: pip install "psycopg[binary,pool]"')
+        # Django requires CONN_MAX_AGE = 0 with a pool; connections go back to it after each request
+        max_size = int(os.environ.get(
+            'DATABASE_POOL_MAX_SIZE', ASYNC_POOL_MAX_SIZE if async_serving() else worker_threads()
+        ))
+        config.update(CONN_MAX_AGE=0, CONN_HEALTH_CHECKS=True)
+        options['pool'] = {
+            'min_size': min(int(os.environ.get('DATABASE_POOL_MIN_SIZE', 1)), max_size),
+            'max_size': max_size,
+            'timeout': float(os.environ.get('DATABASE_POOL_TIMEOUT', 10)),  # wait for a free connection
+            'max_idle': 300,  # close connections above min_size idle this long
+            'max_lifetime': 1800,  # recycle, e.g. across Neon compute restarts
+        }
+    else:
+        config.update(CONN_MAX_AGE=max_age, CONN_HEALTH_CHECKS=True)
+    if mode == 'pgbouncer' or behind_pgbouncer(host):
+        # Each transaction may run on another server connection: no cursors across transactions
+        config['DISABLE_SERVER_SIDE_CURSORS'] = True
+        prepared = prepared and _env_flag('PGBOUNCER_PREPARED_STATEMENTS', False)
+
+    if IS_PSYCOPG3 and prepared:
+        options.setdefault('server_side_binding', True)
+        options.setdefault('prepare_threshold', int(os.environ.get('DATABASE_PREPARE_THRESHOLD', 5)))
+    return config
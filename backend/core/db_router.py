@@ -0,0 +1,83 @@
+"""
+Primary/replica database routing with read-your-writes stickiness.
+
+When settings.REPLICA_DATABASE names a database alias (settings sets it from
+DATABASE_REPLICA_URL), ReplicaRoutingMiddleware sends the reads of GET/HEAD/OPTIONS
+requests to that replica; writes and every other request use `default`. A request
+that writes, even a GET that materializes something, reads from the primary from then
+on, and its client is pinned to the primary for REPLICA_PIN_SECONDS so it does not
+read a lagging replica right after its own write. Clients are told apart by their
+bearer token, or by address when anonymous.
+
+Pins live in Django's cache. The default local-memory cache pins per worker process;
+configure a shared CACHES backend when running several workers.
+"""
+import hashlib
+import math
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+_routing = ContextVar('db_routing', default=None)
+
+
+class RequestRouting:
+    """Where the current request reads, and whether it has written."""
+    __slots__ = ('read_db', 'wrote')
+
+    def __init__(self, read_db):
+        self.read_db = read_db
+        self.wrote = False
+
+
+@contextmanager
+def routing(read_db):
+    state = RequestRouting(read_db)
+    token = _routing.set(state)
+    try:
+        yield state
+    finally:
+        _routing.reset(token)
+
+
+def replica_alias():
+    return getattr(settings, 'REPLICA_DATABASE', None)
+
+
+def client_key(request):
+    identity = request.META.get('HTTP_AUTHORIZATION') or request.META.get('REMOTE_ADDR', '')
+    return 'db-pin:' + hashlib.sha256(identity.encode()).hexdigest()[:32]
+
+
+def is_pinned(key):
+    return (cache.get(key) or 0) > time.time()
+
+
+def pin(key):
+    seconds = settings.REPLICA_PIN_SECONDS
+    cache.set(key, time.time() + seconds, timeout=math.ceil(seconds))
+
+
+class PrimaryReplicaRouter:
+    """Reads go where the current request routes them; writes always go to the primary."""
+
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        return state.read_db if state is not None else None
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            # Later reads of this request must see the write
+            state.read_db = DEFAULT_DB_ALIAS
+            state.wrote = True
+        # Explicit, or an instance read from the replica would be saved back to it
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
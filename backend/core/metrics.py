@@ -0,0 +1,104 @@
+"""
+Prometheus metrics for the API. Under gunicorn, set PROMETHEUS_MULTIPROC_DIR
+(gunicorn.conf.py does) so every worker writes its samples to that directory and
+/metrics aggregates all of them.
+"""
+import hmac
+import os
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Request latency by route',
+    ['method', 'route'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0),
+)
+REQUESTS = Counter('http_requests_total', 'Requests by route and status code', ['method', 'route', 'status'])
+ERRORS = Counter('http_request_errors_total', 'Requests answered with a 5xx or an unhandled exception', ['method', 'route'])
+DB_QUERIES = Histogram(
+    'db_queries_per_request', 'Database queries issued per request', ['route'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, 233),
+)
+DB_TIME = Histogram(
+    'db_time_seconds_per_request', 'Time spent in database queries per request', ['route'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+# Connection setup: new connections, or checkouts when the alias uses a psycopg pool
+DB_CONNECTS = Counter('db_connects_total', 'Database connections set up by Django', ['alias'])
+# psycopg pools (DATABASE_POOL=psycopg), summed over worker processes
+DB_POOL_CONNECTIONS = Gauge(
+    'db_pool_connections', 'Connections held by the pool', ['alias'], multiprocess_mode='livesum')
+DB_POOL_AVAILABLE = Gauge(
+    'db_pool_available_connections', 'Idle connections in the pool', ['alias'], multiprocess_mode='livesum')
+DB_POOL_WAITING = Gauge(
+    'db_pool_requests_waiting', 'Requests waiting for a pooled connection', ['alias'], multiprocess_mode='livesum')
+DB_POOL_REQUESTS = Counter('db_pool_requests_total', 'Connections handed out by the pool', ['alias'])
+DB_POOL_WAIT = Counter('db_pool_wait_seconds_total', 'Time spent waiting for a pooled connection', ['alias'])
+DB_POOL_TIMEOUTS = Counter('db_pool_timeouts_total', 'Requests that timed out waiting for a connection', ['alias'])
+DB_POOL_OPENED = Counter('db_pool_connections_opened_total', 'Server connections opened by the pool', ['alias'])
+DB_POOL_CONNECT_TIME = Counter('db_pool_connect_seconds_total', 'Time spent opening server connections', ['alias'])
+
+
+@receiver(connection_created)
+def count_connect(sender, connection, **kwargs):
+    DB_CONNECTS.labels(connection.alias).inc()
+
+
+def pools():
+    """(alias, psycopg pool) of every database configured with DATABASE_POOL=psycopg."""
+    return [
+        (alias, connections[alias].pool)
+        for alias, config in settings.DATABASES.items() if config.get('OPTIONS', {}).get('pool')
+    ]
+
+
+def record_pool_stats():
+    """Move the pools' counters into the metrics; called after every request."""
+    for alias, pool in pools():
+        stats = pool.pop_stats()
+        DB_POOL_CONNECTIONS.labels(alias).set(stats.get('pool_size', 0))
+        DB_POOL_AVAILABLE.labels(alias).set(stats.get('pool_available', 0))
+        DB_POOL_WAITING.labels(alias).set(stats.get('requests_waiting', 0))
+        DB_POOL_REQUESTS.labels(alias).inc(stats.get('requests_num', 0))
+        DB_POOL_WAIT.labels(alias).inc(stats.get('requests_wait_ms', 0) / 1000)
+        DB_POOL_TIMEOUTS.labels(alias).inc(stats.get('requests_errors', 0))
+        DB_POOL_OPENED.labels(alias).inc(stats.get('connections_num', 0))
+        DB_POOL_CONNECT_TIME.labels(alias).inc(stats.get('connections_ms', 0) / 1000)
+
+
+def route_label(request):
+    """URL name of the resolved view (e.g. attendance-dashboard), never the raw path."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.url_name or match.route or 'unnamed'
+
+
+def observe(request, route, status_code, duration, queries, db_time):
+    REQUEST_LATENCY.labels(request.method, route).observe(duration)
+    REQUESTS.labels(request.method, route, str(status_code)).inc()
+    if status_code >= 500:
+        ERRORS.labels(request.method, route).inc()
+    DB_QUERIES.labels(route).observe(queries)
+    DB_TIME.labels(route).observe(db_time)
+
+
+def metrics_view(request):
+    """Prometheus text exposition; requires `Authorization: Bearer <METRICS_TOKEN>`."""
+    expected = os.environ.get('METRICS_TOKEN')
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not (expected and supplied and hmac.compare_digest(supplied, expected)):
+        return HttpResponse(status=403)
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
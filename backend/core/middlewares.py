@@ -1,76 +1,148 @@
-from rest_framework_simplejwt.tokens import AccessToken
-from django.utils.deprecation import MiddlewareMixin
-from django.contrib.auth.models import AnonymousUser
+from contextlib import ExitStack
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 from django.conf import settings
+from django.db import connections
+from django.db import DEFAULT_DB_ALIAS
+from core.db_router import SAFE_METHODS, client_key, is_pinned, pin, replica_alias, routing
+from core.metrics import observe, record_pool_stats, route_label
 import logging
 import time
 
 logger = logging.getLogger(__name__)
 
-class ResponseTimeMiddleware(MiddlewareMixin):
-    def process_request(self, request):
+class QueryTimer:
+    """connection.execute_wrapper that counts queries and sums their time."""
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class ResponseTimeMiddleware:
+    """
+    Times every request and records per-route Prometheus metrics (latency, status,
+    DB query count and DB time), adds a Server-Timing header and logs slow requests.
+    Sync and async: under ASGI each request's queries run on a thread of its own
+    (asgiref's per-request ThreadSensitiveContext), so the query timer is installed on
+    that thread's connections.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
         request.start_time = time.time()
+        start = time.perf_counter()
+        timer = QueryTimer()
+        with ExitStack() as stack:
+            self._time_queries(stack, timer)
+            try:
+                response = self.get_response(request)
+            except Exception:
+                observe(request, route_label(request), 500, time.perf_counter() - start, timer.count, timer.duration)
+                raise
+        return self._finish(request, response, start, timer)
+
+    async def __acall__(self, request):
+        request.start_time = time.time()
+        start = time.perf_counter()
+        timer = QueryTimer()
+        stack = ExitStack()
+        await sync_to_async(self._time_queries)(stack, timer)
+        try:
+            response = await self.get_response(request)
+        except Exception:
+            observe(request, route_label(request), 500, time.perf_counter() - start, timer.count, timer.duration)
+            raise
+        finally:
+            await sync_to_async(stack.close)()
+        return self._finish(request, response, start, timer)
+
+    @staticmethod
+    def _time_queries(stack, timer):
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(timer))
 
-    def process_response(self, request, response):
-        if hasattr(request, 'start_time'):
-            duration = time.time() - request.start_time
-            if duration > 1.0:  # Log slow requests (>1 second)
-                logger.warning(
-                    "Slow API response: %s %s took %.2f seconds",
-                    request.method,
-                    request.path,
-                    duration
-                )
-            elif hasattr(settings, 'DEBUG') and settings.DEBUG:
-                logger.debug(
-                    "API response: %s %s took %.3f seconds",
-                    request.method,
-                    request.path,
-                    duration
-                )
+    def _finish(self, request, response, start, timer):
+        duration = time.perf_counter() - start
+
+        observe(request, route_label(request), response.status_code, duration, timer.count, timer.duration)
+        record_pool_stats()
+        response['Server-Timing'] = (
+            f'app;dur={duration * 1000:.1f}, db;dur={timer.duration * 1000:.1f};desc="{timer.count} queries"'
+        )
+        if duration > 1.0:  # Log slow requests (>1 second)
+            logger.warning(
+                "Slow API response: %s %s took %.2f seconds",
+                request.method,
+                request.path,
+                duration
+            )
+        elif hasattr(settings, 'DEBUG') and settings.DEBUG:
+            logger.debug(
+                "API response: %s %s took %.3f seconds",
+                request.method,
+                request.path,
+                duration
+            )
         return response
 
-class UserContextMiddleware(MiddlewareMixin):
-    def process_request(self, request):
-        # Initialize with a default user context to avoid AttributeError
-        default_user = type('User', (), {
-            'id': None,
-            'branch_id': 1,  # Default branch_id
-            'role': 'guest',
-            'is_authenticated': False
-        })()
-        
-        authorization_header = request.headers.get('Authorization')
-
-        if authorization_header and authorization_header.startswith('Bearer '):
-            token = authorization_header.split(' ')[1]
-            try:
-                access_token = AccessToken(token)
-                payload = access_token.payload
-                user_id = payload.get('user_id')
-                branch_id = payload.get('branch_id', 1)  # Default to 1 if not found
-                role = payload.get('role', 'user')
-                
-                # Set the user context in the request
-                request.user = type('User', (), {
-                    'id': user_id,
-                    'branch_id': branch_id,
-                    'role': role,
-                    'is_authenticated': True
-                })()
-                
-                # Only log in DEBUG mode to reduce overhead
-                from django.conf import settings
-                if settings.DEBUG:
-                    logger.debug("User context set: ID=%s, Branch=%s, Role=%s", user_id, branch_id, role)
-                    
-            except Exception as e:
-                # Handle invalid token or missing claims
-                if hasattr(settings, 'DEBUG') and settings.DEBUG:
-                    logger.warning("Token validation failed: %s", str(e))
-                request.user = default_user
-        else:
-            # No authorization header, set default user
-            request.user = default_user
-
-        return None
\ No newline at end of file
+
+class ReplicaRoutingMiddleware:
+    """
+    Reads of safe requests go to the read replica (settings.REPLICA_DATABASE) unless the
+    client wrote within REPLICA_PIN_SECONDS; a request that writes pins its client to
+    the primary. A no-op without a replica. See core.db_router.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        replica = replica_alias()
+        if not replica:
+            return self.get_response(request)
+        key, read_db = self._route(request, replica)
+        with routing(read_db) as state:
+            response = self.get_response(request)
+        if state.wrote:
+            pin(key)
+        return response
+
+    async def __acall__(self, request):
+        replica = replica_alias()
+        if not replica:
+            return await self.get_response(request)
+        key, read_db = self._route(request, replica)
+        # sync_to_async copies the context into the ORM's thread, so the router sees this state
+        with routing(read_db) as state:
+            response = await self.get_response(request)
+        if state.wrote:
+            pin(key)
+        return response
+
+    @staticmethod
+    def _route(request, replica):
+        key = client_key(request)
+        return key, replica if request.method in SAFE_METHODS and not is_pinned(key) else DEFAULT_DB_ALIAS
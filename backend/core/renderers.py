@@ -0,0 +1,61 @@
+"""
+Fast JSON renderer and parser for DRF, backed by orjson.
+
+Drop-in replacements for rest_framework's JSONRenderer / JSONParser, registered in
+REST_FRAMEWORK (see settings). Output matches the stdlib renderer byte for byte: orjson
+writes dates, times and datetimes in the same ISO 8601 form (UTC as `Z`), and Decimals,
+lazy translation strings, querysets and other types it does not know go through DRF's
+JSONEncoder.default. Without orjson installed, or for anything orjson cannot encode
+(indented or ASCII-only output, integers beyond 64 bits, timezone-aware times), both
+classes fall back to the stdlib implementation. One difference: NaN and Infinity, which
+the stdlib renderer refuses under STRICT_JSON, are written as null.
+
+Measure with `manage.py bench_json`.
+"""
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z) if orjson else 0
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer using orjson for compact, unicode output (DRF's defaults)."""
+
+    _default = staticmethod(JSONEncoder().default)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or data is None or self.ensure_ascii or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self._default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same JavaScript-safe escaping of U+2028 / U+2029 as JSONRenderer
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser using orjson for UTF-8 bodies; NaN and Infinity are rejected like STRICT_JSON."""
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8' or not self.strict:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -12,7 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from datetime import timedelta
 from pathlib import Path
-import dj_database_url
+from core.db_pool import async_serving, database_config
 import os
 import logging
 
@@ -51,7 +51,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'core.middlewares.ResponseTimeMiddleware',  # Add response time tracking
-    'core.middlewares.UserContextMiddleware',  # Re-enabled for JWT authentication
+    'core.middlewares.ReplicaRoutingMiddleware',  # Safe requests read from the replica, if any
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -86,13 +86,18 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'core.wsgi.application'
+ASGI_APPLICATION = 'core.asgi.application'
+# Set by core.asgi: the hot attendance endpoints are served by their async views
+ASYNC_VIEWS = async_serving()
 
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# DATABASE_URL when set (Render provides it), else the Neon database below; the pooling
+# mode and pool size come from the environment (see core.db_pool)
 DATABASES = {
-    'default': {
+    'default': database_config(os.environ.get('DATABASE_URL'), default={
         'ENGINE': 'django.db.backends.postgresql',
         'NAME': 'jnv_db',
         'USER': 'neondb_owner',
@@ -101,24 +106,29 @@ DATABASES = {
         'PORT': '5432',
         'OPTIONS': {
             'sslmode': 'require',
-            'connect_timeout': 10,  # Correct parameter name for psycopg2
+            'connect_timeout': 10,  # libpq parameter, seconds
             'application_name': 'attendance_app',
         },
-        'CONN_MAX_AGE': 300,  # Persistent connections for performance
-        'CONN_HEALTH_CHECKS': True,
-    }
+    }),
 }
 
+# Optional read replica: GET requests read from it, writes and the client's reads for
+# REPLICA_PIN_SECONDS after a write use the primary (see core.db_router)
+DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+if DATABASE_REPLICA_URL:
+    DATABASES['replica'] = database_config(DATABASE_REPLICA_URL)
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+REPLICA_DATABASE = 'replica' if DATABASE_REPLICA_URL else None
+REPLICA_PIN_SECONDS = float(os.environ.get('REPLICA_PIN_SECONDS', 5))
+DATABASE_ROUTERS = ['core.db_router.PrimaryReplicaRouter']
+
 # Performance optimizations for development
 if DEBUG:
     # Faster password hashing for development
     PASSWORD_HASHERS = [
         'django.contrib.auth.hashers.MD5PasswordHasher',
     ]
-    
-    # Reduce database connection pooling in development for faster startup
-    DATABASES['default']['CONN_MAX_AGE'] = 0
-    
+
 else:
     # Production password hashers
     PASSWORD_HASHERS = [
@@ -218,11 +228,24 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 STATIC_URL = '/static/'
 AUTH_USER_MODEL = 'accounts.User'
+# Whole-exam JSON result uploads (tens of thousands of rows) exceed the 2.5 MB default
+DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+        # Verifies each token once and builds request.user from its claims (no User query)
+        'accounts.authentication.CachedJWTAuthentication',
+    ),
+    # orjson-backed JSON; falls back to the stdlib codec when orjson is not installed
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
 CORS_ALLOW_ALL_ORIGINS = True  # For development only
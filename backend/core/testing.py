@@ -0,0 +1,186 @@
+"""
+Query-count budget harness for the API tests.
+
+QueryBudgetTestCase.assertConstantQueries runs a request against a small and a
+large fixture (see make_school) and fails when the number of queries grows with
+the data, or exceeds an absolute budget. Failures list the offending SQL with the
+application stack that issued it.
+"""
+import re
+import traceback
+from collections import Counter
+from datetime import date, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase
+from rest_framework.test import APIClient
+from accounts.authentication import deny_list, token_cache
+from accounts.models import Branch, User
+from accounts.serialiser import CustomTokenObtainPairSerializer
+from attendance.models import Attendance, Classroom, Houses, Student
+from attendance.roster import bump_roster_versions, roster_cache, student_scopes
+from attendance.search import index_students
+from attendance.summary import ATTENDANCE_FIELDS, refresh_summary
+from students.models import Exam, Results
+from students.stats import refresh_classrooms
+
+SMALL, LARGE = 3, 30
+FIXTURE_DAY = date(2025, 9, 10)
+FIXTURE_SUBJECTS = ['MATHS', 'ENGLISH']
+_STATUS_CYCLE = ['present', 'absent', 'present', 'leave', 'present', 'NOT_MARKED', 'on_duty']
+_APP_DIR = str(Path(settings.BASE_DIR))
+# Normalisations that make the same statement compare equal whatever its values or row count
+_SHAPE_RULES = [
+    (re.compile(r"'[^']*'|\b\d+\b|%s"), '?'),
+    (re.compile(r'SAVEPOINT "[^"]+"'), 'SAVEPOINT ?'),
+    (re.compile(r'\((?:\?, )*\?\)(?:, \((?:\?, )*\?\))+'), '(?), ...'),
+    (re.compile(r'(?:WHEN \([^()]+ = \?\) THEN \? )+'), 'WHEN ... '),
+    (re.compile(r'\?(?:, \?)+'), '?, ...'),
+]
+
+
+def make_school(size, classrooms=2, days=3, role='admin'):
+    """
+    A fresh branch with `classrooms` classrooms of `size` students each, two houses,
+    `days` days of attendance ending FIXTURE_DAY, results in FIXTURE_SUBJECTS for
+    the first seeded exam, and an API client authenticated as the branch's `role` user.
+    """
+    branch = Branch.objects.create(name=f'Budget {Branch.objects.count()} x{size}', location='test')
+    user = User.objects.create(username=f'{role}-{branch.id}', role=role, branch=branch)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {CustomTokenObtainPairSerializer.get_token(user).access_token}')
+
+    rooms = [Classroom.objects.create(name=f'Class {branch.id}-{i}') for i in range(classrooms)]
+    houses = [Houses.objects.create(name=name) for name in ('ARAVALI_JR', 'NILGIRI_JR')]
+    students = Student.objects.bulk_create([
+        Student(
+            name=f'Student {room.id} {roll}', roll_number=roll, classroom=room, house=houses[roll % 2],
+            branch=branch, parent_phone=f'98{roll:08d}',
+        )
+        for room in rooms for roll in range(1, size + 1)
+    ])
+    index_students(students)
+    bump_roster_versions(set().union(*(student_scopes(branch.id, s.classroom_id, s.house_id) for s in students)))
+
+    first_day = FIXTURE_DAY - timedelta(days=days - 1)
+    Attendance.objects.bulk_create([
+        Attendance(student=s, date=first_day + timedelta(days=d), **{
+            field: _STATUS_CYCLE[(i + d + k) % len(_STATUS_CYCLE)] for k, field in enumerate(ATTENDANCE_FIELDS)
+        })
+        for i, s in enumerate(students) for d in range(days)
+    ])
+    refresh_summary(first_day, FIXTURE_DAY, branch.id)
+
+    # Exams are seeded by the add_exams migration; the model lags the table, so they are not created here
+    exam = Exam.objects.order_by('id').first()
+    Results.objects.bulk_create([
+        Results(student=s, subject=subject, score=(i * 7 + j * 13) % 101, exam=exam)
+        for i, s in enumerate(students) for j, subject in enumerate(FIXTURE_SUBJECTS)
+    ])
+    refresh_classrooms([room.id for room in rooms])
+    return SimpleNamespace(
+        branch=branch, user=user, client=client, classrooms=rooms, houses=houses,
+        students=students, exam=exam, day=FIXTURE_DAY, first_day=first_day,
+    )
+
+
+class QueryRecorder:
+    """connection.execute_wrapper recording each query with the application frames that issued it."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        stack = [
+            frame for frame in traceback.extract_stack()[:-1]
+            if frame.filename.startswith(_APP_DIR) and 'site-packages' not in frame.filename
+            and not frame.filename.endswith(('core/testing.py', 'core/middlewares.py'))
+        ]
+        self.queries.append((sql, params, stack))
+        return execute(sql, params, many, context)
+
+
+def _shape(sql):
+    """SQL with literals and list lengths removed."""
+    for pattern, replacement in _SHAPE_RULES:
+        sql = pattern.sub(replacement, sql)
+    return sql
+
+
+def _statements(queries):
+    """
+    Fold the batches one bulk_create/bulk_update/IN query is split into by the backend's
+    parameter limit (consecutive, same shape, same caller, multi-row) into one statement.
+    Single-row statements are never folded, so a query in a loop still counts every time.
+    """
+    folded = []
+    for query in queries:
+        sql, _params, stack = query
+        if folded and '...' in _shape(sql):
+            prev_sql, _prev_params, prev_stack = folded[-1]
+            if _shape(prev_sql) == _shape(sql) and prev_stack == stack:
+                continue
+        folded.append(query)
+    return folded
+
+
+def _describe(queries, shapes=None):
+    lines = []
+    for n, (sql, params, stack) in enumerate(queries, 1):
+        if shapes is not None and _shape(sql) not in shapes:
+            continue
+        lines.append(f"  [{n}] {sql}  params={params!r}")
+        lines.extend(f"        {frame.filename}:{frame.lineno} in {frame.name}: {frame.line}" for frame in stack[-6:])
+    return '\n'.join(lines)
+
+
+class QueryBudgetTestCase(TestCase):
+    small, large = SMALL, LARGE
+
+    def setUp(self):
+        # Per-process caches would otherwise carry rows across rolled-back tests
+        roster_cache.clear()
+        token_cache.clear()
+        deny_list.invalidate()
+
+    def record(self, call):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            response = call()
+            if getattr(response, 'streaming', False):
+                b''.join(response.streaming_content)
+        return response, recorder.queries
+
+    def assertConstantQueries(self, call, budget=None, build=make_school):
+        """
+        `call(fixture)` performs one request. It runs once to warm per-process caches,
+        then is measured, on a small and a large fixture from `build(size)`. The measured
+        counts must be equal (and at most `budget` when given).
+        """
+        runs = []
+        for size in (self.small, self.large):
+            fixture = build(size)
+            self.record(lambda: call(fixture))
+            response, queries = self.record(lambda: call(fixture))
+            queries = _statements(queries)
+            self.assertLess(
+                response.status_code, 400,
+                f"Request failed with {response.status_code}: {getattr(response, 'data', response)!r}",
+            )
+            runs.append((size, queries))
+
+        (small_size, small_queries), (large_size, large_queries) = runs
+        if len(large_queries) != len(small_queries):
+            grown = Counter(_shape(q[0]) for q in large_queries) - Counter(_shape(q[0]) for q in small_queries)
+            self.fail(
+                f"Query count grew with the data: {len(small_queries)} queries at size {small_size}, "
+                f"{len(large_queries)} at size {large_size}. Queries that repeat more often:\n"
+                + _describe(large_queries, set(grown))
+            )
+        if budget is not None and len(large_queries) > budget:
+            self.fail(
+                f"{len(large_queries)} queries exceed the budget of {budget}:\n" + _describe(large_queries)
+            )
+        return len(large_queries)
@@ -4,7 +4,8 @@ from django.http import JsonResponse
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from attendance.views import ClassroomViewSet, StudentViewSet, AttendanceViewSet, HouseViewSet, AttendanceAPIView
-from accounts.views import CustomTokenObtainPairView
+from accounts.views import CustomTokenObtainPairView, CustomTokenRefreshView, LogoutAPIView
+from core.metrics import metrics_view
 
 router = DefaultRouter()
 router.register('classrooms', ClassroomViewSet)
@@ -15,13 +16,16 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     # JWT login endpoints
     path('api/login/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
-    # path('api/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/logout/', LogoutAPIView.as_view(), name='logout'),
+    path('api/refresh/', CustomTokenRefreshView.as_view(), name='token_refresh'),
     # Attendance app API
     path('api/attendance/', include('attendance.urls')),  # Include attendance app URLs
     path('api/', include(router.urls)),
 
     # health endpoint
     path('health/', lambda _: JsonResponse({'status': 'ok'})),
+    # Prometheus scrape endpoint
+    path('metrics', metrics_view, name='metrics'),
     # Students app API
     path('api/results/', include('students.urls')), 
 ]
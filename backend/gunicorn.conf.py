@@ -0,0 +1,25 @@
+# Picked up automatically by `gunicorn core.wsgi:application` run from this directory, and by
+# the ASGI deployment `gunicorn core.asgi:application -k uvicorn_worker.UvicornWorker` (see core.asgi).
+import os
+import shutil
+import tempfile
+
+# Every worker writes its metric samples here; /metrics merges them
+multiproc_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'attendance-metrics')
+)
+
+# Requests each worker serves at once (gthread workers when > 1); settings sizes every
+# worker's database pool from the same variable, see core.db_pool. Uvicorn workers ignore it
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+
+
+def on_starting(server):
+    # Samples of a previous run would otherwise be added to the new counters
+    shutil.rmtree(multiproc_dir, ignore_errors=True)
+    os.makedirs(multiproc_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,60 @@
+import io
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from attendance.models import Student
+from students.ingest import ingest_results, parse_results_csv
+from students.models import Exam
+from students.views import ListSubjectsAPI
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure BulkResultsAPI ingestion throughput (rows/s) for a whole-exam upload of every "
+        "student of a branch, as JSON rows and as a CSV file. Runs in a rolled-back transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--branch', type=int, required=True)
+        parser.add_argument('--exam', type=int, help="Exam id (default: the first exam)")
+        parser.add_argument('--subjects', type=int, default=7, help="Subjects per student")
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        exam = Exam.objects.filter(id=options['exam']) if options['exam'] else Exam.objects.order_by('id')
+        exam = exam.first()
+        students = list(Student.objects.filter(branch_id=options['branch']).values_list('roll_number', 'classroom_id'))
+        if exam is None or not students:
+            raise CommandError("Need an exam and a branch with students; run manage.py generate_dataset")
+        subjects = ListSubjectsAPI.subject_mappings['Secondary'][:options['subjects']]
+        # Existing subjects exercise ON CONFLICT DO UPDATE, new ones plain inserts
+        cases = [('update', subjects), ('insert', [f'BENCH {i}' for i in range(len(subjects))])]
+
+        self.stdout.write(f"{len(students)} students x {len(subjects)} subjects, exam {exam.id}, {connection.vendor}")
+        for name, case_subjects in cases:
+            rows = [
+                {'student_roll': roll, 'classroom_id': classroom_id, 'subject': subject,
+                 'score': (roll * 7 + i) % 101, 'exam': exam.id}
+                for roll, classroom_id in students for i, subject in enumerate(case_subjects)
+            ]
+            csv_text = 'student_roll,classroom_id,' + ','.join(case_subjects) + '\n' + ''.join(
+                f"{roll},{classroom_id}," + ','.join(str((roll * 7 + i) % 101) for i in range(len(case_subjects))) + '\n'
+                for roll, classroom_id in students
+            )
+            for source in ('json', 'csv'):
+                best = None
+                for _ in range(options['repeat']):
+                    with transaction.atomic():
+                        start = time.perf_counter()
+                        if source == 'csv':
+                            batch = parse_results_csv(io.BytesIO(csv_text.encode()), {'exam': exam.id}, case_subjects)
+                            report = ingest_results(batch, branch_id=options['branch'], coerce_scores=True)
+                        else:
+                            report = ingest_results(rows, branch_id=options['branch'])
+                        elapsed = time.perf_counter() - start
+                        transaction.set_rollback(True)
+                    best = elapsed if best is None else min(best, elapsed)
+                self.stdout.write(
+                    f"{name:<7}{source:<5}{len(rows):>7} rows  {best * 1000:>8.1f} ms  {len(rows) / best:>9,.0f} rows/s"
+                    f"  (created {report.created}, updated {report.updated}, failed {len(report.errors)})"
+                )
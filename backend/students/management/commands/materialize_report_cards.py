@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from students.models import Results
+from students.report_cards import materialize, materialize_stale
+
+
+class Command(BaseCommand):
+    help = (
+        "Materialize ReportCard rows. By default rebuilds every (exam, branch) whose results "
+        "changed since its cards were built; --all rebuilds every pair that has results."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--exam', type=int, help="Only this exam id")
+        parser.add_argument('--branch', type=int, help="Only this branch id")
+        parser.add_argument('--all', action='store_true', help="Rebuild even if current")
+
+    def handle(self, *args, **options):
+        if options['all']:
+            pairs = Results.objects.filter(student__branch__isnull=False)
+            if options['exam']:
+                pairs = pairs.filter(exam_id=options['exam'])
+            if options['branch']:
+                pairs = pairs.filter(student__branch_id=options['branch'])
+            pairs = pairs.values_list('exam_id', 'student__branch_id').distinct().order_by()
+            built = [(exam, branch, materialize(exam, branch)) for exam, branch in pairs]
+        else:
+            built = materialize_stale(options['exam'], options['branch'])
+        for exam, branch, count in built:
+            self.stdout.write(f"exam={exam} branch={branch}: {count} report cards")
+        self.stdout.write(self.style.SUCCESS(f"Materialized {len(built)} exam/branch pairs"))
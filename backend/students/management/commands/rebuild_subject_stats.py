@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from students.stats import classroom_keys, refresh_stats, verify_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute SubjectResultStats from Results, or verify it with --verify."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--exam', type=int, action='append', help="Only this exam id (repeatable)")
+        parser.add_argument('--classroom', type=int, action='append', help="Only this classroom id (repeatable)")
+        parser.add_argument('--verify', action='store_true', help="Report mismatches without writing")
+
+    def handle(self, *args, **options):
+        classroom_ids, exam_ids = options['classroom'], options['exam']
+
+        if options['verify']:
+            mismatches = verify_stats(classroom_ids, exam_ids)
+            for (exam_id, classroom_id, subject), expected, stored in mismatches:
+                self.stdout.write(
+                    f"exam={exam_id} classroom={classroom_id} subject={subject}: expected {expected}, stored {stored}"
+                )
+            if mismatches:
+                raise CommandError(f"{len(mismatches)} subject stats rows out of date")
+            self.stdout.write(self.style.SUCCESS("Subject stats match Results"))
+            return
+
+        upserted, deleted = refresh_stats(classroom_keys(classroom_ids, exam_ids))
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt subject stats: {upserted} rows written, {deleted} stale rows removed"
+        ))
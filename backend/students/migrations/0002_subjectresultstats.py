@@ -0,0 +1,90 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Frozen copy of students.stats.summarize at the time of this migration
+PERFORMERS = 5
+HISTOGRAM_BUCKETS = 10
+
+
+def percentile(sorted_scores, pct):
+    position = (len(sorted_scores) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_scores) - 1)
+    return sorted_scores[lower] + (sorted_scores[upper] - sorted_scores[lower]) * (position - lower)
+
+
+def summarize(rows):
+    scores = sorted(score for _, _, score in rows)
+    histogram = [0] * HISTOGRAM_BUCKETS
+    for score in scores:
+        histogram[min(max(score, 0) // 10, HISTOGRAM_BUCKETS - 1)] += 1
+    top = sorted(rows, key=lambda row: (-row[2], row[1], row[0]))[:PERFORMERS]
+    bottom = sorted(rows, key=lambda row: (row[2], row[1], row[0]))[:PERFORMERS]
+    return {
+        'count': len(scores),
+        'mean': sum(scores) / len(scores),
+        'min_score': scores[0],
+        'max_score': scores[-1],
+        'median': percentile(scores, 50),
+        'p25': percentile(scores, 25),
+        'p75': percentile(scores, 75),
+        'p90': percentile(scores, 90),
+        'histogram': histogram,
+        'top_student_ids': [student_id for student_id, _, _ in top],
+        'bottom_student_ids': [student_id for student_id, _, _ in bottom],
+    }
+
+
+def backfill_stats(apps, schema_editor):
+    Results = apps.get_model('students', 'Results')
+    SubjectResultStats = apps.get_model('students', 'SubjectResultStats')
+    groups = {}
+    for row in Results.objects.filter(student__classroom__isnull=False).values_list(
+        'exam_id', 'student__classroom_id', 'subject', 'student_id', 'student__name', 'score',
+    ).iterator():
+        groups.setdefault(row[:3], []).append(row[3:])
+    SubjectResultStats.objects.bulk_create(
+        (
+            SubjectResultStats(exam_id=exam_id, classroom_id=classroom_id, subject=subject, **summarize(rows))
+            for (exam_id, classroom_id, subject), rows in groups.items()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0022_absentee_sms'),
+        ('students', 'add_exams'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubjectResultStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=100)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('mean', models.FloatField()),
+                ('min_score', models.IntegerField()),
+                ('max_score', models.IntegerField()),
+                ('median', models.FloatField()),
+                ('p25', models.FloatField()),
+                ('p75', models.FloatField()),
+                ('p90', models.FloatField()),
+                ('histogram', models.JSONField(default=list)),
+                ('top_student_ids', models.JSONField(default=list)),
+                ('bottom_student_ids', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('classroom', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subject_stats', to='attendance.classroom')),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subject_stats', to='students.exam')),
+            ],
+            options={
+                'unique_together': {('exam', 'classroom', 'subject')},
+            },
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
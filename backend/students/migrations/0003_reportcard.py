@@ -0,0 +1,54 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_revokedtoken'),
+        ('attendance', '0022_absentee_sms'),
+        ('students', '0002_subjectresultstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportCard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scores', models.JSONField(default=dict)),
+                ('total', models.IntegerField()),
+                ('max_total', models.IntegerField()),
+                ('percentage', models.FloatField()),
+                ('class_rank', models.PositiveIntegerField()),
+                ('class_size', models.PositiveIntegerField()),
+                ('branch_rank', models.PositiveIntegerField()),
+                ('branch_size', models.PositiveIntegerField()),
+                ('percentile', models.FloatField()),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_cards', to='accounts.branch')),
+                ('classroom', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_cards', to='attendance.classroom')),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_cards', to='students.exam')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_cards', to='attendance.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['exam', 'classroom', 'class_rank'], name='reportcard_class_rank_index')],
+                'unique_together': {('student', 'exam')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ReportCardState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('results_version', models.PositiveIntegerField(default=1)),
+                ('materialized_version', models.PositiveIntegerField(default=0)),
+                ('computed_at', models.DateTimeField(blank=True, null=True)),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_card_states', to='accounts.branch')),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_card_states', to='students.exam')),
+            ],
+            options={
+                'unique_together': {('exam', 'branch')},
+            },
+        ),
+    ]
@@ -1,6 +1,12 @@
 from django.db import models
 from attendance.models import Student
 
+# Subjects taught per class type (served by ListSubjectsAPI)
+SUBJECT_MAPPINGS = {
+    'Primary': ['ENGLISH','MATHS','SCIENCE','SOCIAL SCIENCE', 'HINDI', 'IT'],
+    'Secondary': ['ENGLISH','MATHS','PHYSICS','CHEMISTRY', 'BIOLOGY', 'IT', 'COMPUTER SCIENCE'],
+}
+
 class Exam(models.Model):
     """
     Model for storing exam/assessment information.
@@ -25,4 +31,70 @@ class Results(models.Model):
         unique_together = ('student', 'subject', 'exam')  # Ensure unique results per student, subject, and exam
 
     def __str__(self):
-        return f"{self.student.name} - {self.subject} - {self.score} on {self.exam.name}"
\ No newline at end of file
+        return f"{self.student.name} - {self.subject} - {self.score} on {self.exam.name}"
+
+class SubjectResultStats(models.Model):
+    """
+    Score statistics of one subject for one classroom in one exam.
+    Kept up to date by result writes (see students.stats) so the subject dashboard
+    reads one row instead of aggregating every result of the class.
+    """
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='subject_stats')
+    classroom = models.ForeignKey('attendance.Classroom', on_delete=models.CASCADE, related_name='subject_stats')
+    subject = models.CharField(max_length=100)
+    count = models.PositiveIntegerField(default=0)
+    mean = models.FloatField()
+    min_score = models.IntegerField()
+    max_score = models.IntegerField()
+    median = models.FloatField()
+    p25 = models.FloatField()
+    p75 = models.FloatField()
+    p90 = models.FloatField()
+    histogram = models.JSONField(default=list)  # counts of scores 0-9, 10-19, ..., 90-100
+    top_student_ids = models.JSONField(default=list)  # highest score first
+    bottom_student_ids = models.JSONField(default=list)  # lowest score first
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('exam', 'classroom', 'subject')
+
+
+class ReportCard(models.Model):
+    """
+    One student's report card for one exam: subject scores, total, percentage, class and
+    branch rank and percentile. Materialized per exam and branch by students.report_cards
+    so serving a report card is one indexed read.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='report_cards')
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='report_cards')
+    branch = models.ForeignKey('accounts.Branch', on_delete=models.CASCADE, related_name='report_cards')
+    classroom = models.ForeignKey('attendance.Classroom', on_delete=models.CASCADE, related_name='report_cards')
+    scores = models.JSONField(default=dict)  # {subject: score}
+    total = models.IntegerField()
+    max_total = models.IntegerField()
+    percentage = models.FloatField()
+    class_rank = models.PositiveIntegerField()
+    class_size = models.PositiveIntegerField()
+    branch_rank = models.PositiveIntegerField()
+    branch_size = models.PositiveIntegerField()
+    percentile = models.FloatField()
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('student', 'exam')
+        indexes = [models.Index(fields=['exam', 'classroom', 'class_rank'], name='reportcard_class_rank_index')]
+
+
+class ReportCardState(models.Model):
+    """
+    Whether an exam's report cards in a branch are current: result writes bump
+    results_version, materialization records the version it was built from.
+    """
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='report_card_states')
+    branch = models.ForeignKey('accounts.Branch', on_delete=models.CASCADE, related_name='report_card_states')
+    results_version = models.PositiveIntegerField(default=1)
+    materialized_version = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('exam', 'branch')
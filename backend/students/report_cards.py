@@ -0,0 +1,154 @@
+import operator
+from functools import reduce
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+from .models import ReportCard, ReportCardState, Results
+
+MAX_SCORE = 100  # per subject
+CARD_FIELDS = [
+    'branch', 'classroom', 'scores', 'total', 'max_total', 'percentage',
+    'class_rank', 'class_size', 'branch_rank', 'branch_size', 'percentile',
+]
+
+
+def _ranks(values):
+    """RANK() of each value, highest first: ties share a rank and leave a gap after."""
+    ordered = sorted(values, reverse=True)
+    first_position = {}
+    for position, value in enumerate(ordered, 1):
+        first_position.setdefault(value, position)
+    return [first_position[value] for value in values]
+
+
+def build_cards(rows):
+    """
+    Report-card field values of one exam and branch from [(student_id, classroom_id, subject, score)],
+    in one pass. Students are ranked by percentage. The percentile is the share of the other
+    students of the branch with a lower percentage (100 for a student alone).
+    """
+    students = {}
+    for student_id, classroom_id, subject, score in rows:
+        card = students.setdefault(student_id, {'classroom_id': classroom_id, 'scores': {}})
+        card['scores'][subject] = score
+
+    cards = {}
+    for student_id, card in students.items():
+        total = sum(card['scores'].values())
+        max_total = MAX_SCORE * len(card['scores'])
+        cards[student_id] = {
+            'classroom_id': card['classroom_id'],
+            'scores': card['scores'],
+            'total': total,
+            'max_total': max_total,
+            'percentage': round(100 * total / max_total, 2),
+        }
+
+    ids = list(cards)
+    percentages = [cards[student_id]['percentage'] for student_id in ids]
+    below = {value: index for index, value in reversed(list(enumerate(sorted(percentages))))}
+    for student_id, rank in zip(ids, _ranks(percentages)):
+        card = cards[student_id]
+        card['branch_rank'] = rank
+        card['branch_size'] = len(ids)
+        card['percentile'] = round(100 * below[card['percentage']] / (len(ids) - 1), 2) if len(ids) > 1 else 100.0
+
+    classrooms = {}
+    for student_id in ids:
+        classrooms.setdefault(cards[student_id]['classroom_id'], []).append(student_id)
+    for members in classrooms.values():
+        for student_id, rank in zip(members, _ranks([cards[m]['percentage'] for m in members])):
+            cards[student_id]['class_rank'] = rank
+            cards[student_id]['class_size'] = len(members)
+    return cards
+
+
+def mark_stale(exam_branches):
+    """Write-path hook: the results of these (exam_id, branch_id) pairs changed."""
+    pairs = {(int(exam_id), int(branch_id)) for exam_id, branch_id in exam_branches if branch_id is not None}
+    if not pairs:
+        return
+    ReportCardState.objects.bulk_create(
+        [ReportCardState(exam_id=exam_id, branch_id=branch_id) for exam_id, branch_id in pairs],
+        ignore_conflicts=True,
+    )
+    ReportCardState.objects.filter(reduce(operator.or_, (
+        Q(exam_id=exam_id, branch_id=branch_id) for exam_id, branch_id in pairs
+    ))).update(results_version=F('results_version') + 1)
+
+
+def mark_branch_stale(branch_ids):
+    """Every exam of some branches, e.g. after students move classroom or leave."""
+    ReportCardState.objects.filter(branch_id__in=[b for b in branch_ids if b is not None]).update(
+        results_version=F('results_version') + 1,
+    )
+
+
+def materialize(exam_id, branch_id):
+    """
+    Rebuild the report cards of one exam in one branch from a single read of its results.
+    The state row stays locked from that read until the cards are written, so rebuilds
+    of the same exam and branch take turns and an older one cannot overwrite a newer one.
+    Returns the number of cards written; 0 when another rebuild already covered them.
+    """
+    ReportCardState.objects.get_or_create(exam_id=exam_id, branch_id=branch_id)
+    with transaction.atomic():
+        state = ReportCardState.objects.select_for_update().get(exam_id=exam_id, branch_id=branch_id)
+        version = state.results_version
+        if state.materialized_version >= version:
+            return 0
+        rows = Results.objects.filter(exam_id=exam_id, student__branch_id=branch_id).values_list(
+            'student_id', 'student__classroom_id', 'subject', 'score',
+        )
+        cards = build_cards(rows)
+        ReportCard.objects.filter(exam_id=exam_id, branch_id=branch_id).exclude(student_id__in=list(cards)).delete()
+        ReportCard.objects.bulk_create(
+            [
+                ReportCard(student_id=student_id, exam_id=exam_id, branch_id=branch_id, **card)
+                for student_id, card in cards.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['student', 'exam'],
+            update_fields=CARD_FIELDS + ['computed_at'],
+            batch_size=1000,
+        )
+        # Result writes bump results_version on the locked row, so they wait for this commit
+        ReportCardState.objects.filter(id=state.id).update(materialized_version=version, computed_at=timezone.now())
+    return len(cards)
+
+
+def stale_states(exam_id=None, branch_id=None):
+    states = ReportCardState.objects.filter(results_version__gt=F('materialized_version'))
+    if exam_id is not None:
+        states = states.filter(exam_id=exam_id)
+    if branch_id is not None:
+        states = states.filter(branch_id=branch_id)
+    return states
+
+
+def materialize_stale(exam_id=None, branch_id=None):
+    """Rebuild every out-of-date (exam, branch); returns [(exam_id, branch_id, cards)]."""
+    return [
+        (exam, branch, materialize(exam, branch))
+        for exam, branch in stale_states(exam_id, branch_id).values_list('exam_id', 'branch_id')
+    ]
+
+
+def report_cards(**filters):
+    """ReportCard queryset with an `is_stale` flag, read in the same statement."""
+    return ReportCard.objects.filter(**filters).select_related('student', 'exam').annotate(
+        is_stale=Exists(ReportCardState.objects.filter(
+            exam_id=OuterRef('exam_id'), branch_id=OuterRef('branch_id'),
+            results_version__gt=F('materialized_version'),
+        )),
+    )
+
+
+def ensure_current(exam_id, branch_id):
+    """Materialize the exam's cards in the branch unless they are current; True when rebuilt."""
+    if ReportCardState.objects.filter(
+        exam_id=exam_id, branch_id=branch_id, results_version__lte=F('materialized_version'),
+    ).exists():
+        return False
+    materialize(exam_id, branch_id)
+    return True
@@ -0,0 +1,38 @@
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from attendance.conditional import bump_table_versions
+from attendance.models import Student
+from .models import Exam
+from .report_cards import mark_branch_stale
+from .stats import refresh_classrooms
+
+
+@receiver(post_init, sender=Student)
+def remember_classroom(sender, instance, **kwargs):
+    # Classroom and branch as loaded, so moving a student refreshes both sides
+    instance._loaded_classroom_id = instance.__dict__.get('classroom_id')
+    instance._loaded_branch_id = instance.__dict__.get('branch_id')
+
+
+@receiver(post_save, sender=Student)
+def student_saved(sender, instance, created, **kwargs):
+    previous_classroom = getattr(instance, '_loaded_classroom_id', None)
+    previous_branch = getattr(instance, '_loaded_branch_id', None)
+    if not created and (previous_classroom, previous_branch) != (instance.classroom_id, instance.branch_id):
+        refresh_classrooms([previous_classroom, instance.classroom_id])
+        mark_branch_stale([previous_branch, instance.branch_id])
+    instance._loaded_classroom_id = instance.classroom_id
+    instance._loaded_branch_id = instance.branch_id
+
+
+@receiver(post_delete, sender=Student)
+def student_deleted(sender, instance, **kwargs):
+    # The student's results are gone with it
+    refresh_classrooms([instance.classroom_id])
+    mark_branch_stale([instance.branch_id])
+
+
+@receiver(post_save, sender=Exam)
+@receiver(post_delete, sender=Exam)
+def exam_changed(sender, **kwargs):
+    bump_table_versions(['exams'])
@@ -0,0 +1,155 @@
+import operator
+from functools import reduce
+from django.db import transaction
+from django.db.models import Q
+from attendance.models import Classroom
+from .models import Results, SubjectResultStats
+
+PERFORMERS = 5
+HISTOGRAM_BUCKETS = 10  # 0-9, 10-19, ..., 90-100
+STAT_FIELDS = [
+    'count', 'mean', 'min_score', 'max_score', 'median', 'p25', 'p75', 'p90',
+    'histogram', 'top_student_ids', 'bottom_student_ids',
+]
+
+
+def percentile(sorted_scores, pct):
+    """Linearly interpolated percentile of an already sorted, non-empty list."""
+    position = (len(sorted_scores) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_scores) - 1)
+    return sorted_scores[lower] + (sorted_scores[upper] - sorted_scores[lower]) * (position - lower)
+
+
+def summarize(rows):
+    """
+    SubjectResultStats field values for one group of [(student_id, student_name, score)].
+    Performers are ordered like the dashboard always did: by score, then student name.
+    """
+    scores = sorted(score for _, _, score in rows)
+    histogram = [0] * HISTOGRAM_BUCKETS
+    for score in scores:
+        histogram[min(max(score, 0) // 10, HISTOGRAM_BUCKETS - 1)] += 1
+    top = sorted(rows, key=lambda row: (-row[2], row[1], row[0]))[:PERFORMERS]
+    bottom = sorted(rows, key=lambda row: (row[2], row[1], row[0]))[:PERFORMERS]
+    return {
+        'count': len(scores),
+        'mean': sum(scores) / len(scores),
+        'min_score': scores[0],
+        'max_score': scores[-1],
+        'median': percentile(scores, 50),
+        'p25': percentile(scores, 25),
+        'p75': percentile(scores, 75),
+        'p90': percentile(scores, 90),
+        'histogram': histogram,
+        'top_student_ids': [student_id for student_id, _, _ in top],
+        'bottom_student_ids': [student_id for student_id, _, _ in bottom],
+    }
+
+
+def compute_stats(keys):
+    """
+    Summaries of the given (exam_id, classroom_id, subject) groups straight from Results,
+    in one query. Groups without any result are left out.
+    """
+    keys = set(keys)
+    if not keys:
+        return {}
+    results_qs = Results.objects.filter(
+        exam_id__in={exam_id for exam_id, _, _ in keys},
+        student__classroom_id__in={classroom_id for _, classroom_id, _ in keys},
+        subject__in={subject for _, _, subject in keys},
+    )
+    groups = {}
+    for exam_id, classroom_id, subject, student_id, name, score in results_qs.values_list(
+        'exam_id', 'student__classroom_id', 'subject', 'student_id', 'student__name', 'score',
+    ):
+        if (exam_id, classroom_id, subject) in keys:
+            groups.setdefault((exam_id, classroom_id, subject), []).append((student_id, name, score))
+    return {key: summarize(rows) for key, rows in groups.items()}
+
+
+def lock_classrooms(classroom_ids):
+    """
+    Row-lock the given classrooms in id order until the end of the transaction. Stats
+    writers hold their classrooms' locks while they read Results and write, so a slower
+    writer cannot overwrite a group with stats from an older snapshot. FOR NO KEY UPDATE
+    leaves students free to be added to or moved between the locked classrooms.
+    """
+    list(Classroom.objects.select_for_update(no_key=True).filter(id__in=classroom_ids).order_by('id').values_list('id', flat=True))
+
+
+def refresh_stats(keys):
+    """
+    Write-path hook: recompute the (exam_id, classroom_id, subject) groups a write touched.
+    Medians, percentiles and performers cannot be updated from a delta, so each touched
+    group is re-read, under its classroom's lock; untouched groups are not.
+    Returns (upserted, deleted).
+    """
+    keys = {
+        (int(exam_id), int(classroom_id), subject)
+        for exam_id, classroom_id, subject in keys if classroom_id is not None
+    }
+    if not keys:
+        return 0, 0
+    with transaction.atomic():
+        lock_classrooms({classroom_id for _, classroom_id, _ in keys})
+        stats = compute_stats(keys)
+        deleted = 0
+        emptied = keys - set(stats)
+        if emptied:
+            deleted = SubjectResultStats.objects.filter(reduce(operator.or_, (
+                Q(exam_id=exam_id, classroom_id=classroom_id, subject=subject)
+                for exam_id, classroom_id, subject in emptied
+            ))).delete()[0]
+        if stats:
+            SubjectResultStats.objects.bulk_create(
+                [
+                    SubjectResultStats(exam_id=exam_id, classroom_id=classroom_id, subject=subject, **fields)
+                    for (exam_id, classroom_id, subject), fields in stats.items()
+                ],
+                update_conflicts=True,
+                unique_fields=['exam', 'classroom', 'subject'],
+                update_fields=STAT_FIELDS + ['updated_at'],
+                batch_size=1000,
+            )
+    return len(stats), deleted
+
+
+def classroom_keys(classroom_ids=None, exam_ids=None):
+    """Every group with results or stored stats, optionally for some classrooms / exams."""
+    results_qs = Results.objects.filter(student__classroom__isnull=False)
+    stats_qs = SubjectResultStats.objects.all()
+    if classroom_ids is not None:
+        results_qs = results_qs.filter(student__classroom_id__in=classroom_ids)
+        stats_qs = stats_qs.filter(classroom_id__in=classroom_ids)
+    if exam_ids is not None:
+        results_qs = results_qs.filter(exam_id__in=exam_ids)
+        stats_qs = stats_qs.filter(exam_id__in=exam_ids)
+    keys = set(results_qs.values_list('exam_id', 'student__classroom_id', 'subject').distinct())
+    return keys | set(stats_qs.values_list('exam_id', 'classroom_id', 'subject'))
+
+
+def refresh_classrooms(classroom_ids):
+    """Recompute every exam and subject of some classrooms, e.g. after students move or leave."""
+    classroom_ids = [classroom_id for classroom_id in classroom_ids if classroom_id is not None]
+    if not classroom_ids:
+        return 0, 0
+    return refresh_stats(classroom_keys(classroom_ids))
+
+
+def verify_stats(classroom_ids=None, exam_ids=None):
+    """Return [(key, expected, stored)] for every stats row that disagrees with Results."""
+    keys = classroom_keys(classroom_ids, exam_ids)
+    expected = compute_stats(keys)
+    stored = {
+        (row['exam_id'], row['classroom_id'], row['subject']): {field: row[field] for field in STAT_FIELDS}
+        for row in SubjectResultStats.objects.filter(
+            exam_id__in={key[0] for key in keys}, classroom_id__in={key[1] for key in keys},
+        ).values('exam_id', 'classroom_id', 'subject', *STAT_FIELDS)
+    }
+    return [
+        (key, expected.get(key), stored.get(key))
+        for key in sorted(keys, key=str)
+        if expected.get(key) != stored.get(key)
+    ]
@@ -1,3 +1,234 @@
-from django.test import TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from attendance.models import Student
+from rest_framework.test import APIClient
+from core.testing import FIXTURE_SUBJECTS, QueryBudgetTestCase, make_school
+from students.models import Results, SubjectResultStats
+from students.report_cards import mark_stale, materialize
+from students.stats import verify_stats
 
-# Create your tests here.
+
+class StudentsQueryBudgetTests(QueryBudgetTestCase):
+    """Every results API view issues the same number of queries for 3 or 30 students per class."""
+
+    def test_class_results(self):
+        self.assertConstantQueries(lambda f: f.client.get(reverse('class-results'), {
+            'classroom_id': f.classrooms[0].id, 'exam_id': f.exam.id, 'branch_id': f.branch.id,
+        }), budget=2)
+
+    def test_student_results(self):
+        self.assertConstantQueries(lambda f: f.client.get(
+            reverse('student-results', args=[f.students[0].id]), {'exam_id': f.exam.id}), budget=1)
+
+    def test_subject_results(self):
+        self.assertConstantQueries(lambda f: f.client.get(reverse('subject-results'), {
+            'subject': FIXTURE_SUBJECTS[0], 'classroom_id': f.classrooms[0].id, 'exam_id': f.exam.id,
+        }), budget=2)
+
+    def test_subject_results_detail(self):
+        self.assertConstantQueries(
+            lambda f: f.client.get(reverse('subject-results-detail'), {'exam_id': f.exam.id}), budget=1)
+
+    def test_list_subjects(self):
+        self.assertConstantQueries(
+            lambda f: f.client.get(reverse('list-subjects'), {'class_type': 'Primary'}), budget=0)
+
+    def test_list_exams(self):
+        self.assertConstantQueries(lambda f: f.client.get(reverse('list-exams')), budget=2)
+
+    def test_list_students(self):
+        self.assertConstantQueries(lambda f: f.client.get(reverse('list-students'), {
+            'subject': FIXTURE_SUBJECTS[0], 'classroom_id': f.classrooms[0].id, 'exam_id': f.exam.id,
+        }), budget=2)
+
+    def test_result_upsert(self):
+        self.assertConstantQueries(lambda f: f.client.post(reverse('results-list'), {
+            'student_roll': f.students[0].roll_number, 'classroom_id': f.classrooms[0].id,
+            'exam': f.exam.id, 'subject': FIXTURE_SUBJECTS[0], 'score': 75,
+        }, format='json'), budget=14)
+
+    def test_report_cards(self):
+        self.assertConstantQueries(lambda f: f.client.get(reverse('report-cards'), {
+            'exam_id': f.exam.id, 'classroom_id': f.classrooms[0].id,
+        }), budget=1)
+
+    def test_report_card(self):
+        self.assertConstantQueries(lambda f: f.client.get(
+            reverse('report-card', args=[f.students[0].id]), {'exam_id': f.exam.id}), budget=1)
+
+    def test_bulk_results(self):
+        self.assertConstantQueries(lambda f: f.client.post(reverse('bulk-results'), {'results': [
+            {'student_roll': s.roll_number, 'classroom_id': s.classroom_id, 'subject': subject,
+             'score': 50, 'exam': f.exam.id}
+            for s in f.students for subject in FIXTURE_SUBJECTS + ['SCIENCE']
+        ]}, format='json'), budget=14)
+
+
+class SubjectStatsTests(QueryBudgetTestCase):
+    """SubjectResultStats follows every kind of result write."""
+
+    def test_stats_follow_writes(self):
+        f = make_school(4)
+        self.assertEqual(verify_stats(), [])
+
+        f.client.post(reverse('bulk-results'), {'results': [
+            {'student_roll': s.roll_number, 'classroom_id': s.classroom_id, 'subject': 'SCIENCE',
+             'score': 10 * s.roll_number, 'exam': f.exam.id}
+            for s in f.students
+        ]}, format='json')
+        f.client.post(reverse('results-list'), {
+            'student_roll': 1, 'classroom_id': f.classrooms[0].id, 'exam': f.exam.id, 'subject': 'MATHS', 'score': 99,
+        }, format='json')
+        moved = f.students[0]
+        moved.classroom = f.classrooms[1]
+        moved.roll_number = 99
+        moved.save()
+        f.students[-1].delete()
+        self.assertEqual(verify_stats(), [])
+
+        stats = SubjectResultStats.objects.get(exam=f.exam, classroom=f.classrooms[0], subject='SCIENCE')
+        self.assertEqual((stats.count, stats.min_score, stats.max_score, stats.median), (3, 20, 40, 30))
+        self.assertEqual(stats.histogram, [0, 0, 1, 1, 1, 0, 0, 0, 0, 0])
+        self.assertEqual(stats.top_student_ids, [f.students[3].id, f.students[2].id, f.students[1].id])
+
+
+class BulkResultsIngestTests(QueryBudgetTestCase):
+    """BulkResultsAPI saves valid rows, reports invalid ones and accepts CSV uploads."""
+
+    def test_per_row_errors(self):
+        f = make_school(3)
+        student = f.students[0]
+        response = f.client.post(reverse('bulk-results'), {'results': [
+            {'student_roll': student.roll_number, 'classroom_id': student.classroom_id,
+             'subject': 'MATHS', 'score': 91, 'exam': f.exam.id},
+            {'student_roll': student.roll_number, 'classroom_id': student.classroom_id,
+             'subject': 'SCIENCE', 'score': 40, 'exam': f.exam.id},
+            {'student_roll': 99, 'classroom_id': student.classroom_id, 'subject': 'MATHS', 'score': 50, 'exam': f.exam.id},
+            {'student_roll': student.roll_number, 'classroom_id': student.classroom_id, 'subject': 'MATHS', 'score': 101, 'exam': f.exam.id},
+            {'student_roll': student.roll_number, 'classroom_id': student.classroom_id, 'subject': 'MATHS', 'score': 50, 'exam': 0},
+            {'student_roll': student.roll_number, 'subject': 'MATHS', 'score': 50, 'exam': f.exam.id},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['failed']), (1, 1, 4))
+        self.assertEqual([error['row'] for error in response.data['errors']], [3, 4, 5, 6])
+        self.assertEqual(Results.objects.get(student=student, exam=f.exam, subject='MATHS').score, 91)
+        self.assertEqual(verify_stats(), [])
+
+    def test_rolls_resolve_within_the_callers_branch(self):
+        f = make_school(3)
+        other = make_school(3)
+        # Same classroom and roll number in another branch
+        twin = f.students[0]
+        Student.objects.filter(id=other.students[0].id).update(classroom_id=twin.classroom_id)
+        response = f.client.post(reverse('bulk-results'), {'results': [
+            {'student_roll': twin.roll_number, 'classroom_id': twin.classroom_id, 'subject': 'HINDI', 'score': 60, 'exam': f.exam.id},
+        ]}, format='json')
+        self.assertEqual(response.data['created'], 1)
+        self.assertTrue(Results.objects.filter(student=twin, subject='HINDI').exists())
+
+    def test_csv_upload(self):
+        f = make_school(3)
+        room = f.classrooms[0]
+        wide = SimpleUploadedFile('exam.csv', b'Roll Number,MATHS,SCIENCE\n1,80,70\n2,,65\n3,abc,60\n', content_type='text/csv')
+        response = f.client.post(reverse('bulk-results'), {
+            'file': wide, 'exam': f.exam.id, 'classroom_id': room.id,
+        }, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['failed']), (3, 1, 1))
+        self.assertEqual(response.data['errors'], [{'row': 4, 'error': 'Missing or invalid fields: score.'}])
+
+        long = SimpleUploadedFile('exam.csv', (
+            f'student_roll,classroom_id,exam,subject,score\n1,{room.id},{f.exam.id},MATHS,55\n'
+        ).encode(), content_type='text/csv')
+        response = f.client.post(reverse('bulk-results'), {'file': long}, format='multipart')
+        self.assertEqual((response.data['created'], response.data['updated']), (0, 1))
+        self.assertEqual(Results.objects.get(student__classroom=room, student__roll_number=1, subject='MATHS').score, 55)
+
+        # Wide subject columns are matched to the known subjects; anything else rejects the file
+        wide = SimpleUploadedFile('exam.csv', b'roll,Social  Science,maths\n1,40,41\n', content_type='text/csv')
+        response = f.client.post(reverse('bulk-results'), {
+            'file': wide, 'exam': f.exam.id, 'classroom_id': room.id,
+        }, format='multipart')
+        self.assertEqual((response.data['created'], response.data['updated']), (1, 1))
+        self.assertEqual(Results.objects.get(student__classroom=room, student__roll_number=1, subject='SOCIAL SCIENCE').score, 40)
+        stray = SimpleUploadedFile('exam.csv', b'roll,MATHS,remarks\n1,80,good\n', content_type='text/csv')
+        response = f.client.post(reverse('bulk-results'), {
+            'file': stray, 'exam': f.exam.id, 'classroom_id': room.id,
+        }, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('unknown subject columns remarks', response.data['error'])
+        self.assertFalse(Results.objects.filter(subject='remarks').exists())
+
+
+class ReportCardTests(QueryBudgetTestCase):
+    """Report cards rank students with ties and are rebuilt only after their exam's results change."""
+
+    def card(self, f, student):
+        response = f.client.get(reverse('report-card', args=[student.id]), {'exam_id': f.exam.id})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_ranks_and_rebuild(self):
+        f = make_school(2)
+        # Scores: see make_school; set them explicitly so the ranks are known
+        scores = {f.students[0]: (90, 70), f.students[1]: (80, 80), f.students[2]: (60, 60), f.students[3]: (100, 100)}
+        for student, (maths, english) in scores.items():
+            Results.objects.filter(student=student, subject='MATHS').update(score=maths)
+            Results.objects.filter(student=student, subject='ENGLISH').update(score=english)
+
+        first = self.card(f, f.students[0])
+        self.assertEqual((first['total'], first['max_total'], first['percentage']), (160, 200, 80.0))
+        self.assertEqual((first['class_rank'], first['class_size']), (1, 2))
+        # Tied with students[1] at 80%, behind students[3]
+        self.assertEqual((first['branch_rank'], self.card(f, f.students[1])['branch_rank']), (2, 2))
+        self.assertEqual(self.card(f, f.students[2])['branch_rank'], 4)
+        self.assertEqual((first['percentile'], self.card(f, f.students[3])['percentile']), (33.33, 100.0))
+
+        # Current cards are served without recomputing
+        with self.assertNumQueries(1):
+            self.card(f, f.students[0])
+
+        f.client.post(reverse('results-list'), {
+            'student_roll': f.students[0].roll_number, 'classroom_id': f.students[0].classroom_id,
+            'exam': f.exam.id, 'subject': 'MATHS', 'score': 100,
+        }, format='json')
+        self.assertEqual(self.card(f, f.students[0])['percentage'], 85.0)
+        self.assertEqual((self.card(f, f.students[0])['branch_rank'], self.card(f, f.students[1])['branch_rank']), (2, 3))
+
+        response = f.client.get(reverse('report-cards'), {'exam_id': f.exam.id, 'classroom_id': f.classrooms[1].id})
+        self.assertEqual([card['student_id'] for card in response.data['report_cards']], [f.students[3].id, f.students[2].id])
+
+    def test_rebuild_skips_current_cards(self):
+        f = make_school(2)
+        self.assertEqual(materialize(f.exam.id, f.branch.id), len(f.students))
+        # A rebuild that waited for the lock behind an up-to-date one has nothing to do
+        self.assertEqual(materialize(f.exam.id, f.branch.id), 0)
+        mark_stale([(f.exam.id, f.branch.id)])
+        self.assertEqual(materialize(f.exam.id, f.branch.id), len(f.students))
+
+    def test_access(self):
+        f = make_school(2)
+        teacher = make_school(2, role='teacher')
+        params = {'exam_id': f.exam.id, 'classroom_id': f.classrooms[0].id}
+        self.assertEqual(APIClient().get(reverse('report-cards'), params).status_code, 401)
+        self.assertEqual(APIClient().get(reverse('report-card', args=[f.students[0].id]), params).status_code, 401)
+        self.assertEqual(APIClient().post(reverse('report-cards'), {'exam_id': f.exam.id}).status_code, 401)
+        self.assertEqual(teacher.client.post(reverse('report-cards'), {'exam_id': f.exam.id}).status_code, 403)
+        self.assertEqual(teacher.client.get(reverse('report-cards'), params).status_code, 200)
+        self.assertEqual(f.client.post(reverse('report-cards'), {'exam_id': f.exam.id}).status_code, 200)
+
+
+class ConditionalGetTests(QueryBudgetTestCase):
+    """Exam and subject lists answer a current If-None-Match with 304 without reading their tables."""
+
+    def test_exams_and_subjects(self):
+        f = make_school(2)
+        exams = f.client.get(reverse('list-exams'))
+        with self.assertNumQueries(1):
+            self.assertEqual(f.client.get(reverse('list-exams'), HTTP_IF_NONE_MATCH=exams['ETag']).status_code, 304)
+
+        subjects = f.client.get(reverse('list-subjects'), {'class_type': 'Primary'})
+        with self.assertNumQueries(0):
+            response = f.client.get(reverse('list-subjects'), {'class_type': 'Primary'}, HTTP_IF_NONE_MATCH=subjects['ETag'])
+        self.assertEqual(response.status_code, 304)
@@ -10,7 +10,9 @@ from .views import (
     ListSubjectsAPI,
     ListExamsAPI,
     StudentResultListAPIView,
-    BulkResultsAPI
+    BulkResultsAPI,
+    ReportCardAPI,
+    ReportCardsAPI,
 )
 
 urlpatterns = [
@@ -22,5 +24,7 @@ urlpatterns = [
     path('subjects/', ListSubjectsAPI.as_view(), name='list-subjects'),
     path('exams/', ListExamsAPI.as_view(), name='list-exams'),
     path('students-list/', StudentResultListAPIView.as_view(), name='list-students'),
-    path('bulk-results/', BulkResultsAPI.as_view(), name='bulk-results')
+    path('bulk-results/', BulkResultsAPI.as_view(), name='bulk-results'),
+    path('report-cards/', ReportCardsAPI.as_view(), name='report-cards'),
+    path('report-cards/<int:student_id>/', ReportCardAPI.as_view(), name='report-card'),
 ]
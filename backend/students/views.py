@@ -1,13 +1,24 @@
+import csv
+import hashlib
+import json
 from datetime import time
 from django.shortcuts import get_object_or_404
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
+from accounts.permisions import IsAdminUser
 from .serializers import ResultSerializer
+from attendance.conditional import conditional
 from attendance.models import Student
-from .models import Results, Exam
+from attendance.roster import roster_cache
+from .models import SUBJECT_MAPPINGS, Results, Exam, SubjectResultStats
+from .stats import STAT_FIELDS, refresh_stats, summarize
+from .ingest import ingest_results, parse_results_csv
+from .report_cards import ensure_current, mark_stale, materialize, materialize_stale, report_cards
 import time
+from django.db.models import Avg, Count, F, Q, Window
+from django.db.models.functions import Rank, RowNumber
 from core.settings import logger
 class ResultsAPI(APIView):
     # permission_classes = [IsAuthenticated]
@@ -22,7 +33,12 @@ class ResultsAPI(APIView):
         classroom_id = request.data.get('classroom_id')
         if not student_roll:
             return Response({"error": "Student roll number is required."}, status=status.HTTP_400_BAD_REQUEST)
-        student = get_object_or_404(Student, roll_number=student_roll, classroom_id=classroom_id)
+        students = Student.objects.filter(roll_number=student_roll, classroom_id=classroom_id)
+        branch_id = getattr(request.user, 'branch_id', None) or request.data.get('branch_id')
+        if branch_id:
+            # The same roll number exists in the same classroom of every branch
+            students = students.filter(branch_id=branch_id)
+        student = get_object_or_404(students)
         # create or update result
         request.data['student'] = student.id
         # Validate and save the result
@@ -49,7 +65,9 @@ class ResultsAPI(APIView):
         else:
             serializer = ResultSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            result = serializer.save()
+            refresh_stats([(result.exam_id, student.classroom_id, result.subject)])
+            mark_stale([(result.exam_id, student.branch_id)])
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
@@ -58,128 +76,43 @@ class BulkResultsAPI(APIView):
 
     def post(self, request, *args, **kwargs):
         """
-        Bulk create or update results for multiple students using bulk operations.
-        Expects a list of results in the request data.
+        Bulk create or update results, e.g. a whole exam (see students.ingest).
+        Expects {"results": [{student_roll, classroom_id, subject, score, exam}, ...]}, or a
+        multipart CSV upload in `file` with optional `exam` / `classroom_id` fields for all rows.
+        Students are looked up in the caller's branch (or `branch_id`). Invalid rows are
+        reported in `errors` by row number; the other rows are still saved.
         """
-        results_data = request.data.get('results', [])
+        branch_id = (
+            getattr(request.user, 'branch_id', None)
+            or request.data.get('branch_id') or request.query_params.get('branch_id')
+        )
+        upload = request.FILES.get('file')
+        if upload is not None:
+            defaults = {key: request.data.get(key) or request.query_params.get(key) for key in ('exam', 'classroom_id')}
+            try:
+                results_data = parse_results_csv(upload, defaults)
+            except (UnicodeDecodeError, csv.Error) as e:
+                return Response({"error": f"Could not read the CSV file: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            results_data = request.data.get('results', [])
         if not results_data:
             return Response({"error": "Results data is required."}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Validate all data first
-        validated_data = []
-        student_dict = {}
+        if not isinstance(results_data, list):
+            return Response({"error": "Results must be a list."}, status=status.HTTP_400_BAD_REQUEST)
 
-        for idx, result_data in enumerate(results_data):
-            try:
-                # Validate required fields
-                student_roll = result_data.get('student_roll')
-                classroom_id = result_data.get('classroom_id')
-                subject = result_data.get('subject')
-                score = result_data.get('score')
-                exam_id = result_data.get('exam')
-                
-                if not all([student_roll, classroom_id, subject, score is not None, exam_id]):
-                    return Response({
-                        "error": f"Missing required fields in result {idx + 1}. Required: student_roll, classroom_id, subject, score, exam"
-                    }, status=status.HTTP_400_BAD_REQUEST)
-                
-                # Validate score
-                if not isinstance(score, int) or score < 0 or score > 100:
-                    return Response({
-                        "error": f"Invalid score in result {idx + 1}. Score must be an integer between 0 and 100."
-                    }, status=status.HTTP_400_BAD_REQUEST)
-                
-                # Get student (use cache to avoid repeated queries)
-                student_key = f"{student_roll}_{classroom_id}"
-                if student_key not in student_dict:
-                    try:
-                        student = Student.objects.get(roll_number=student_roll, classroom_id=classroom_id)
-                        student_dict[student_key] = student
-                    except Student.DoesNotExist:
-                        return Response({
-                            "error": f"Student with roll number {student_roll} in classroom {classroom_id} not found."
-                        }, status=status.HTTP_400_BAD_REQUEST)
-
-                student = student_dict[student_key]
-
-                validated_data.append({
-                    'student': student,
-                    'student_id': student.id,
-                    'subject': subject,
-                    'score': score,
-                    'exam_id': exam_id,
-                    'original_data': result_data
-                })
-                
-            except Exception as e:
-                return Response({
-                    "error": f"Validation error in result {idx + 1}: {str(e)}"
-                }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Get existing results for bulk operations
-        student_ids = [data['student_id'] for data in validated_data]
-        subjects = list(set(data['subject'] for data in validated_data))
-        exam_ids = list(set(data['exam_id'] for data in validated_data))
-        
-        existing_results = Results.objects.filter(
-            student_id__in=student_ids,
-            subject__in=subjects,
-            exam_id__in=exam_ids
+        start_time = time.perf_counter()
+        report = ingest_results(results_data, branch_id=branch_id, coerce_scores=upload is not None)
+        elapsed = time.perf_counter() - start_time
+        logger.info(
+            "Bulk results: %d rows (%d failed) in %.2fs, %.0f rows/s",
+            report.total, len(report.errors), elapsed, report.total / elapsed if elapsed else 0,
         )
-        # print("Existing results:", existing_results)
-        # Create lookup dictionary for existing results
-        existing_lookup = {
-            (result.student_id, result.subject, result.exam_id): result
-            for result in existing_results
-        }
-        
-        # print("Existing results lookup:", existing_lookup)
-        # Separate data into create and update lists
-        to_create = []
-        to_update = []
-        
-        for data in validated_data:
-            key = (data['student_id'], data['subject'], data['exam_id'])
-            # print("Processing data:", data, "Key:", key)
-            if key in existing_lookup:
-                # Update existing result
-                existing_result = existing_lookup[key]
-                existing_result.score = data['score']
-                to_update.append(existing_result)
-            else:
-                # Create new result
-                new_result = Results(
-                    student=data['student'],
-                    subject=data['subject'],
-                    score=data['score'],
-                    exam_id=data['exam_id']
-                )
-                to_create.append(new_result)
-        
-        # Perform bulk operations
-        created_count = 0
-        updated_count = 0
-        
-        try:
-            if to_create:
-                Results.objects.bulk_create(to_create, batch_size=100)
-                created_count = len(to_create)
-            
-            if to_update:
-                Results.objects.bulk_update(to_update, ['score'], batch_size=100)
-                updated_count = len(to_update)
-            
-            return Response({
-                "message": "Bulk operation completed successfully",
-                "created": created_count,
-                "updated": updated_count,
-                "total_processed": len(validated_data)
-            }, status=status.HTTP_200_OK)
-            
-        except Exception as e:
-            return Response({
-                "error": f"Database operation failed: {str(e)}"
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        if not report.created and not report.updated:
+            return Response({"error": "No valid results to save.", **report.as_dict()}, status=status.HTTP_400_BAD_REQUEST)
+        message = "Bulk operation completed successfully"
+        if report.errors:
+            message = f"Bulk operation completed with {len(report.errors)} invalid rows"
+        return Response({"message": message, **report.as_dict()}, status=status.HTTP_200_OK)
     
 class StudentResultsDetailAPI(APIView):
     # permission_classes = [IsAuthenticated]
@@ -209,10 +142,12 @@ class SubjectResultsAPI(APIView):
     
 class ClassResultDashBoardAPI(APIView):
     # permission_classes = [IsAuthenticated]
+    performers_count = 5
 
     def get(self, request, *args, **kwargs):
         """
         Retrieve results for a specific classroom with top and bottom performers across all subjects.
+        Two queries whatever the class size: the class statistics, then the ranked top and bottom performers.
         """
         classroom_id = request.query_params.get('classroom_id')
         exam_id = request.query_params.get('exam_id')
@@ -221,122 +156,75 @@ class ClassResultDashBoardAPI(APIView):
             return Response({"error": "Classroom ID is required."}, status=status.HTTP_400_BAD_REQUEST)
         
         # Base query for classroom results
-        base_query = Results.objects.filter(student__classroom_id=classroom_id, student__branch_id=branch_id)
-        logger.info("base query: ", base_query)
-        # Filter by exam if provided
-        
-        base_query = base_query.filter(exam__id=exam_id)
-        
-        if not base_query.exists():
+        base_query = Results.objects.filter(
+            student__classroom_id=classroom_id, student__branch_id=branch_id, exam__id=exam_id,
+        )
+        class_stats = base_query.aggregate(
+            entries=Count('id'),
+            subjects=Count('subject', distinct=True),
+            average=Avg('score'),
+        )
+        if not class_stats['entries']:
             return Response({"error": "No results found for this classroom."}, status=status.HTTP_200_OK)
         
-        # Get all unique subjects for this classroom
-        subjects = base_query.values_list('subject', flat=True).distinct()
-        
         classroom_performance = {
             'classroom_id': classroom_id,
             'exam_id': exam_id,
             'subject_performance': []
         }
-        
-        # for subject in subjects:
-        #     subject_results = base_query.filter(subject=subject).select_related('student')
-            
-        #     if subject_results.exists():
-        #         # Get top 5 performers (highest scores)
-        #         top_performers = subject_results.order_by('-score', 'student__name')[:5]
-                
-        #         # Get bottom 5 performers (lowest scores)
-        #         bottom_performers = subject_results.order_by('score', 'student__name')[:5]
-                
-        #         # Calculate subject statistics
-        #         scores = list(subject_results.values_list('score', flat=True))
-        #         avg_score = sum(scores) / len(scores) if scores else 0
-                
-        #         subject_data = {
-        #             'subject': subject,
-        #             'total_students': subject_results.count(),
-        #             'average_score': round(avg_score, 2),
-        #             'highest_score': max(scores) if scores else None,
-        #             'lowest_score': min(scores) if scores else None,
-        #             'top_5_performers': [
-        #                 {
-        #                     'student_id': performer.student.roll_number,
-        #                     'student_name': performer.student.name,
-        #                     'score': performer.score,
-        #                     'rank': idx + 1
-        #                 } for idx, performer in enumerate(top_performers)
-        #             ],
-        #             'bottom_5_performers': [
-        #                 {
-        #                     'student_id': performer.student.roll_number,
-        #                     'student_name': performer.student.name,
-        #                     'score': performer.score,
-        #                     'rank': subject_results.count() - len(bottom_performers) + idx + 1
-        #                 } for idx, performer in enumerate(bottom_performers)
-        #             ]
-        #         }
-                
-        #         classroom_performance['subject_performance'].append(subject_data)
-        # Calculate classroom top and bottom performers based on overall percentage across all subjects
-        from django.db.models import Avg, Count
-        
-        # Get students with their average scores across all subjects for this exam
-        student_averages = base_query.values('student__id', 'student__name', 'student__roll_number') \
-                                   .annotate(
-                                       avg_score=Avg('score'),
-                                       subject_count=Count('subject', distinct=True)
-                                   ) \
-                                   .order_by('-avg_score', 'student__name')
-        
-        # Filter students who have results in multiple subjects (more comprehensive evaluation)
-        min_subjects_required = max(1, len(subjects) // 2)  # At least half the subjects
-        qualified_students = [
-            student for student in student_averages 
-            if student['subject_count'] >= min_subjects_required
-        ]
-        
-        # Get top 5 and bottom 5 overall performers
-        top_class_performers = qualified_students[:5]
-        # For bottom performers, get the last 5 and reverse them to show lowest first
-        bottom_class_performers = qualified_students[-5:]
-        bottom_class_performers.reverse()  # Reverse to show lowest scores first
-        
+
+        # Students qualify with results in at least half the subjects (more comprehensive evaluation)
+        min_subjects_required = max(1, class_stats['subjects'] // 2)
+        k = self.performers_count
+        performers = list(
+            base_query.values('student__id', 'student__name', 'student__roll_number')
+            .annotate(avg_score=Avg('score'), subject_count=Count('subject', distinct=True))
+            .filter(subject_count__gte=min_subjects_required)
+            .annotate(
+                rank=Window(Rank(), order_by=F('avg_score').desc()),
+                top_position=Window(RowNumber(), order_by=[
+                    F('avg_score').desc(), F('student__name').asc(), F('student__id').asc(),
+                ]),
+                bottom_position=Window(RowNumber(), order_by=[
+                    F('avg_score').asc(), F('student__name').desc(), F('student__id').desc(),
+                ]),
+                qualified=Window(Count('student__id')),
+            )
+            .filter(Q(top_position__lte=k) | Q(bottom_position__lte=k))
+        )
+        top_class_performers = sorted(
+            (p for p in performers if p['top_position'] <= k), key=lambda p: p['top_position'])
+        # Lowest scores first
+        bottom_class_performers = sorted(
+            (p for p in performers if p['bottom_position'] <= k), key=lambda p: p['bottom_position'])
+
         classroom_performance['top_class_performers'] = [
-            {
-                'student_id': performer['student__roll_number'],
-                'student_name': performer['student__name'],
-                'average_percentage': round(performer['avg_score'], 2),
-                'subjects_appeared': performer['subject_count'],
-                'rank': idx + 1
-            } for idx, performer in enumerate(top_class_performers)
+            self._performer(performer) for performer in top_class_performers
         ]
-
-        # Calculate bottom performers with correct ranking (from lowest to highest)
-        total_students = len(qualified_students)
         classroom_performance['bottom_class_performers'] = [
-            {
-                'student_id': performer['student__roll_number'],
-                'student_name': performer['student__name'],
-                'average_percentage': round(performer['avg_score'], 2),
-                'subjects_appeared': performer['subject_count'],
-                'rank': total_students - len(bottom_class_performers) + idx + 1
-            } for idx, performer in enumerate(bottom_class_performers)
+            self._performer(performer) for performer in bottom_class_performers
         ]
         
-        # Calculate overall classroom statistics
-        overall_scores = list(base_query.values_list('score', flat=True))   
-        overall_avg_score = sum(overall_scores) / len(overall_scores) if overall_scores else 0
-        
         classroom_performance['overall_statistics'] = {
-            'total_students_with_results': len(qualified_students),
-            'total_result_entries': base_query.count(),
-            'subjects_covered': len(subjects),
-            'average_score_all_results': round(overall_avg_score, 2),
+            'total_students_with_results': performers[0]['qualified'] if performers else 0,
+            'total_result_entries': class_stats['entries'],
+            'subjects_covered': class_stats['subjects'],
+            'average_score_all_results': round(class_stats['average'], 2),
             }
-        logger.info("classroom_performance: ", classroom_performance)
+        logger.info("classroom_performance: %s", classroom_performance)
         # Return the classroom performance data
         return Response(classroom_performance, status=status.HTTP_200_OK)
+
+    @staticmethod
+    def _performer(performer):
+        return {
+            'student_id': performer['student__roll_number'],
+            'student_name': performer['student__name'],
+            'average_percentage': round(performer['avg_score'], 2),
+            'subjects_appeared': performer['subject_count'],
+            # RANK(): students with the same average share a rank
+            'rank': performer['rank'],
+        }
     
 class SubjectResultsDashboardAPI(APIView):
     # permission_classes = [IsAuthenticated]
@@ -344,6 +232,7 @@ class SubjectResultsDashboardAPI(APIView):
     def get(self, request, *args, **kwargs):
         """
         Retrieve results for a specific subject across all students of a classroom with top 5 and bottom 5 performers.
+        For one exam the statistics come from SubjectResultStats (see students.stats).
         """
         subject = request.query_params.get('subject')
         classroom_id = request.query_params.get('classroom_id')
@@ -352,46 +241,55 @@ class SubjectResultsDashboardAPI(APIView):
         if not subject or not classroom_id:
             return Response({"error": "Subject and Classroom ID are required."}, status=status.HTTP_400_BAD_REQUEST)
         
-        results = Results.objects.filter(subject=subject, student__classroom__id=classroom_id)
-
+        performer_fields = ('student_id', 'student__roll_number', 'student__name', 'score')
         if exam_id:
-            results = results.filter(exam__id=exam_id)
+            stats = SubjectResultStats.objects.filter(
+                exam_id=exam_id, classroom_id=classroom_id, subject=subject,
+            ).values(*STAT_FIELDS).first()
+            if stats is not None:
+                rows = {
+                    row['student_id']: row for row in Results.objects.filter(
+                        exam_id=exam_id, subject=subject,
+                        student_id__in=stats['top_student_ids'] + stats['bottom_student_ids'],
+                    ).values(*performer_fields)
+                }
+        else:
+            # Across all exams a student has several rows: summarise them live, keyed by position
+            results = Results.objects.filter(subject=subject, student__classroom__id=classroom_id)
+            rows = dict(enumerate(results.values(*performer_fields)))
+            stats = summarize([(key, row['student__name'], row['score']) for key, row in rows.items()]) if rows else None
 
-        if not results.exists():
+        if stats is None:
             return Response({"error": "No results found for this subject in the specified classroom."}, status=status.HTTP_200_OK)
         
-        # Get top 5 performers (highest scores)
-        top_performers = results.order_by('-score', 'student__name')[:5]
-        
-        # Get bottom 5 performers (lowest scores)
-        bottom_performers = results.order_by('score', 'student__name')[:5]
-        
-        # Calculate subject statistics
-        scores = list(results.values_list('score', flat=True))
-        avg_score = sum(scores) / len(scores) if scores else 0
+        top_performers = [rows[key] for key in stats['top_student_ids'] if key in rows]
+        bottom_performers = [rows[key] for key in stats['bottom_student_ids'] if key in rows]
         
         subject_data = {
             'subject': subject,
             'classroom_id': classroom_id,
             'exam_id': exam_id,
-            'total_students': results.count(),
-            'average_score': round(avg_score, 2),
-            'highest_score': max(scores) if scores else None,
-            'lowest_score': min(scores) if scores else None,
+            'total_students': stats['count'],
+            'average_score': round(stats['mean'], 2),
+            'highest_score': stats['max_score'],
+            'lowest_score': stats['min_score'],
+            'median_score': stats['median'],
+            'percentiles': {'p25': stats['p25'], 'p75': stats['p75'], 'p90': stats['p90']},
+            'score_histogram': stats['histogram'],
             'top_5_performers': [
                 {
-                    'student_id': performer.student.roll_number,
-                    'student_name': performer.student.name,
-                    'score': performer.score,
+                    'student_id': performer['student__roll_number'],
+                    'student_name': performer['student__name'],
+                    'score': performer['score'],
                     'rank': idx + 1
                 } for idx, performer in enumerate(top_performers)
             ],
             'bottom_5_performers': [
                 {
-                    'student_id': performer.student.roll_number,
-                    'student_name': performer.student.name,
-                    'score': performer.score,
-                    'rank': results.count() - len(bottom_performers) + idx + 1
+                    'student_id': performer['student__roll_number'],
+                    'student_name': performer['student__name'],
+                    'score': performer['score'],
+                    'rank': stats['count'] - len(bottom_performers) + idx + 1
                 } for idx, performer in enumerate(bottom_performers)
             ]
         }
@@ -402,11 +300,12 @@ class SubjectResultsDashboardAPI(APIView):
 class ListSubjectsAPI(APIView):
     # permission_classes = [IsAuthenticated]
 
-    # Constant map of classroom_id to subject list
-    subject_mappings = {
-        'Primary': ['ENGLISH','MATHS','SCIENCE','SOCIAL SCIENCE', 'HINDI', 'IT'],
-        'Secondary': ['ENGLISH','MATHS','PHYSICS','CHEMISTRY', 'BIOLOGY', 'IT', 'COMPUTER SCIENCE'],
-    }
+    # Constant map of class type to subject list
+    subject_mappings = SUBJECT_MAPPINGS
+    # The map only changes with a deploy, so its ETag is fixed per process
+    subjects_etag = 'W/"subjects-%s"' % hashlib.sha1(json.dumps(subject_mappings, sort_keys=True).encode()).hexdigest()[:16]
+
+    @conditional(state=lambda view, request, *args, **kwargs: (view.subjects_etag, None))
     def get(self, request, *args, **kwargs):
         """
         List all subjects based on class and branch.
@@ -424,6 +323,7 @@ class ListExamsAPI(APIView):
 
     # permission_classes = [IsAuthenticated]
 
+    @conditional('exams')
     def get(self, request, *args, **kwargs):
         """
         List all tests based on class and subject.
@@ -454,21 +354,19 @@ class StudentResultListAPIView(APIView):
         if classroom_id and int(classroom_id) in [11, 13]:
             check_course = True
         
-        # Get all students in the classroom
-        students_list = Student.objects.filter(
-            classroom_id=classroom_id, 
-            branch_id=1
-        ).order_by('roll_number', 'name')
+        # Get all students in the classroom (cached roster, ordered by roll number and name)
+        # of the caller's branch; unauthenticated callers keep the original branch 1
+        students_list = roster_cache.get(getattr(request.user, 'branch_id', None) or 1, 'class', classroom_id)
         
         # Apply course filtering for specific subjects and classrooms
         if check_course and (subject == 'IT' or subject == 'Computer Science'):
-            students_list = students_list.filter(course='PCMC')
+            students_list = [s for s in students_list if s[3] == 'PCMC']
         elif check_course and (subject == 'Biology'):
-            students_list = students_list.filter(course='PCMB')
+            students_list = [s for s in students_list if s[3] == 'PCMB']
 
         # Get existing results for these students and subject
         results_query = Results.objects.filter(
-            student__in=students_list, 
+            student_id__in=[s[0] for s in students_list], 
             subject=subject
         )
         
@@ -477,21 +375,18 @@ class StudentResultListAPIView(APIView):
             results_query = results_query.filter(exam_id=exam_id)
         
         # Create a dictionary for quick lookup of results
-        results_dict = {
-            result.student_id: result.score 
-            for result in results_query
-        }
+        results_dict = dict(results_query.values_list('student_id', 'score'))
 
         # Build response with all students and their scores (or "NA")
         students_with_results = []
-        for student in students_list:
-            score = results_dict.get(student.id, "NA")
+        for student_id, name, roll_number, course, *_ in students_list:
+            score = results_dict.get(student_id, "NA")
             
             students_with_results.append({
-                'student_id': student.id,
-                'roll_number': student.roll_number,
-                'student_name': student.name,
-                'course': getattr(student, 'course', None),
+                'student_id': student_id,
+                'roll_number': roll_number,
+                'student_name': name,
+                'course': course,
                 'score': score,
                 'has_result': score != "NA"
             })
@@ -505,3 +400,103 @@ class StudentResultListAPIView(APIView):
             "students_without_results": len([s for s in students_with_results if not s['has_result']]),
             "students": students_with_results
         }, status=status.HTTP_200_OK)
+
+
+def _report_card(card):
+    return {
+        'student_id': card.student_id,
+        'roll_number': card.student.roll_number,
+        'student_name': card.student.name,
+        'exam_id': card.exam_id,
+        'exam_name': card.exam.name,
+        'classroom_id': card.classroom_id,
+        'scores': card.scores,
+        'total': card.total,
+        'max_total': card.max_total,
+        'percentage': card.percentage,
+        'class_rank': card.class_rank,
+        'class_size': card.class_size,
+        'branch_rank': card.branch_rank,
+        'branch_size': card.branch_size,
+        'percentile': card.percentile,
+        'computed_at': card.computed_at,
+    }
+
+
+class ReportCardAPI(APIView):
+    # Reading may rebuild the exam's cards for the whole branch
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, student_id, *args, **kwargs):
+        """
+        Report card of one student for an exam: one indexed read of ReportCard
+        (see students.report_cards). Cards are rebuilt first when the exam's results changed.
+        """
+        exam_id = request.query_params.get('exam_id')
+        if not exam_id or not exam_id.isdigit():
+            return Response({"error": "Exam ID is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        card = report_cards(student_id=student_id, exam_id=exam_id).first()
+        if card is None or card.is_stale:
+            branch_id = card.branch_id if card else (
+                Student.objects.filter(id=student_id).values_list('branch_id', flat=True).first()
+            )
+            if branch_id is not None and ensure_current(exam_id, branch_id):
+                card = report_cards(student_id=student_id, exam_id=exam_id).first()
+        if card is None:
+            return Response({"error": "No results found for this student and exam."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(_report_card(card), status=status.HTTP_200_OK)
+
+
+class ReportCardsAPI(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get_permissions(self):
+        # Materializing on demand rebuilds whole branches: admins only
+        if self.request.method == 'POST':
+            return [IsAuthenticated(), IsAdminUser()]
+        return super().get_permissions()
+
+    def get(self, request, *args, **kwargs):
+        """
+        Report cards of a classroom for an exam in class-rank order, for printing them all at once.
+        """
+        exam_id = request.query_params.get('exam_id')
+        classroom_id = request.query_params.get('classroom_id')
+        branch_id = getattr(request.user, 'branch_id', None) or request.query_params.get('branch_id')
+        if not (exam_id and classroom_id and branch_id):
+            return Response({"error": "Exam ID, Classroom ID and Branch ID are required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        def read():
+            return list(report_cards(exam_id=exam_id, classroom_id=classroom_id, branch_id=branch_id)
+                        .order_by('class_rank', 'student__roll_number'))
+
+        cards = read()
+        if (not cards or any(card.is_stale for card in cards)) and ensure_current(exam_id, branch_id):
+            cards = read()
+        return Response({
+            'exam_id': exam_id,
+            'classroom_id': classroom_id,
+            'report_cards': [_report_card(card) for card in cards],
+        }, status=status.HTTP_200_OK)
+
+    def post(self, request, *args, **kwargs):
+        """
+        Materialize the report cards of an exam, e.g. once its results are published.
+        Rebuilds the caller's branch (or `branch_id`); without a branch, every out-of-date branch.
+        """
+        exam_id = request.data.get('exam_id')
+        if not exam_id:
+            return Response({"error": "Exam ID is required."}, status=status.HTTP_400_BAD_REQUEST)
+        if not Exam.objects.filter(id=exam_id).exists():
+            return Response({"error": f"Exam {exam_id} not found."}, status=status.HTTP_404_NOT_FOUND)
+        branch_id = getattr(request.user, 'branch_id', None) or request.data.get('branch_id')
+        if branch_id:
+            built = [(int(exam_id), int(branch_id), materialize(exam_id, branch_id))]
+        else:
+            built = materialize_stale(exam_id=exam_id)
+        return Response({
+            'exam_id': exam_id,
+            'materialized': [{'branch_id': branch, 'report_cards': count} for _, branch, count in built],
+        }, status=status.HTTP_200_OK)
+